@@ -1,14 +1,15 @@
 import streamlit as st
-import pandas as pd
 
-# Load RFM data
-rfm = pd.read_csv('rfm_segments_output.csv')
+from streamlit_data import load_dataset
+
+# Load RFM data (read once per file version, slices precomputed)
+data = load_dataset('rfm_segments_output.csv')
 
 # Sidebar filters
-selected_segment = st.sidebar.selectbox('Select Segment', rfm['segment'].unique())
+selected_segment = st.sidebar.selectbox('Select Segment', data.segments)
 
 # Filter data
-filtered_df = rfm[rfm['segment'] == selected_segment]
+filtered_df = data.by_segment[selected_segment]
 
 st.title('Customer Segmentation Dashboard')
 st.write(f"Showing data for segment: {selected_segment}")
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Content-addressed artifact cache for the RFM pipeline
+Stores intermediate results (transactions, RFM metrics, scores, labels,
+metric tables) keyed on the hash of their inputs, the stage parameters and
+the source of the code that builds them, with LRU eviction by disk budget
+and a small CLI to inspect or clear it
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROOT = os.environ.get('RFM_CACHE_DIR', '.rfm_cache')
+DEFAULT_BUDGET_MB = float(os.environ.get('RFM_CACHE_BUDGET_MB', 2048))
+OBJECTS_DIR = 'objects'
+FILE_HASHES = 'file_hashes.json'
+# Bump to invalidate every artifact, e.g. when the pickled layout changes
+CACHE_VERSION = 2
+
+
+def _digest_input(digest, value):
+    """Feed one stage input into a running sha256 digest"""
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        digest.update(f'ndarray{value.shape}{value.dtype.str}'.encode())
+        digest.update(value.tobytes())
+    elif isinstance(value, pd.DataFrame):
+        digest.update(f'frame{list(value.columns)}'.encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif hasattr(value, 'tocsr'):
+        value = value.tocsr()
+        digest.update(f'sparse{value.shape}{value.dtype.str}'.encode())
+        for part in (value.indptr, value.indices, value.data):
+            digest.update(np.ascontiguousarray(part).tobytes())
+    elif isinstance(value, bytes):
+        digest.update(value)
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+
+class ArtifactCache:
+    """Disk cache of pipeline artifacts addressed by input content and parameters"""
+
+    def __init__(self, root=DEFAULT_ROOT, budget_mb=DEFAULT_BUDGET_MB, enabled=None):
+        self.root = root
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        if enabled is None:
+            enabled = os.environ.get('RFM_CACHE_DISABLE', '') not in ('1', 'true', 'yes')
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    # ----------------------------------------------------------------- keys
+    def file_hash(self, path):
+        """Hash a file's content, memoized on (path, size, mtime)"""
+        stat = os.stat(path)
+        memo_key = f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}'
+        memo_path = os.path.join(self.root, FILE_HASHES)
+        memo = {}
+        if os.path.exists(memo_path):
+            try:
+                with open(memo_path) as f:
+                    memo = json.load(f)
+            except (OSError, ValueError):
+                memo = {}
+        if memo_key in memo:
+            return memo[memo_key]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        file_digest = digest.hexdigest()
+
+        # Keep only the latest entry per path
+        prefix = f'{os.path.abspath(path)}:'
+        memo = {k: v for k, v in memo.items() if not k.startswith(prefix)}
+        memo[memo_key] = file_digest
+        if self.enabled:
+            os.makedirs(self.root, exist_ok=True)
+            # A unique temp file per writer, so concurrent runs never share one
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-', suffix='.json')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(memo, f)
+            os.replace(tmp_path, memo_path)
+        return file_digest
+
+    def code_hash(self, obj):
+        """Hash of the source file defining a function, class or module"""
+        module = obj if inspect.ismodule(obj) else inspect.getmodule(obj)
+        path = getattr(module, '__file__', None)
+        if path is None or not os.path.isfile(path):
+            return getattr(module, '__name__', repr(obj))
+        return self.file_hash(path)
+
+    def key(self, stage, params=None, inputs=(), code=()):
+        """
+        Build the content address for a stage.
+
+        ``inputs`` may hold file paths (hashed by content), upstream keys,
+        arrays, DataFrames or sparse matrices. ``code`` lists the functions,
+        classes or modules that build the artifact; the source files that
+        define them are hashed in, so editing a stage invalidates its
+        artifacts (and, through upstream keys, everything downstream).
+        """
+        digest = hashlib.sha256()
+        digest.update(f'v{CACHE_VERSION}:{stage}'.encode())
+        for obj in code:
+            digest.update(f'code:{self.code_hash(obj)}'.encode())
+        digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+        for value in inputs:
+            if isinstance(value, str) and os.path.isfile(value):
+                digest.update(f'file:{self.file_hash(value)}'.encode())
+            else:
+                _digest_input(digest, value)
+        return digest.hexdigest()
+
+    # -------------------------------------------------------------- storage
+    def _object_path(self, key, suffix='.pkl'):
+        return os.path.join(self.root, OBJECTS_DIR, key[:2], f'{key}{suffix}')
+
+    def _write_meta(self, key, stage, params):
+        path = self._object_path(key, '.json')
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'stage': stage, 'params': params or {}, 'created': time.time()}, f, default=str)
+        os.replace(tmp_path, path)
+
+    def get(self, key, default=None):
+        """Return a cached artifact (refreshing its LRU position) or ``default``"""
+        if not self.enabled:
+            return default
+        path = self._object_path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return default
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # evicted by another process after we read it
+        return value
+
+    def put(self, key, value, stage='', params=None):
+        """Store an artifact and evict least-recently-used entries over budget"""
+        if not self.enabled:
+            return
+        path = self._object_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix='.pkl')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._write_meta(key, stage, params)
+        self.evict()
+
+    def get_or_compute(self, key, stage, compute, params=None):
+        """Return the artifact for ``key``, running ``compute`` only on a miss"""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            print(f"♻️  {stage}: reused cached artifact {key[:12]}")
+            return value
+        self.misses += 1
+        value = compute()
+        self.put(key, value, stage, params)
+        return value
+
+    def file_artifact(self, key, stage, build, suffix, params=None):
+        """
+        Path of an artifact stored as files rather than a pickle, e.g. a
+        memory-mapped array that readers open in place.
+
+        ``build(path)`` writes the file on a miss; it may add companion files
+        named ``{key}.<anything>`` next to it, which are sized and evicted
+        with the artifact. The path is returned even when the cache is
+        disabled, since the caller needs the file either way.
+        """
+        path = self._object_path(key, suffix)
+        try:
+            os.utime(path)
+            self.hits += 1
+            return path
+        except FileNotFoundError:
+            pass
+        self.misses += 1
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        build(path)
+        self._write_meta(key, stage, params)
+        self.evict()
+        return path
+
+    # ----------------------------------------------------------- management
+    def entries(self):
+        """List cached artifacts, most recently used first"""
+        objects_dir = os.path.join(self.root, OBJECTS_DIR)
+        entries = []
+        if not os.path.isdir(objects_dir):
+            return entries
+        for dirpath, _, filenames in os.walk(objects_dir):
+            # An artifact is every file named {key}.*; {key}.json holds its metadata
+            files = {}
+            for name in filenames:
+                if not name.startswith('.tmp-'):
+                    files.setdefault(name.split('.', 1)[0], []).append(name)
+            for key, names in files.items():
+                data = [os.path.join(dirpath, name) for name in names if name != f'{key}.json']
+                if not data:
+                    continue
+                meta = {}
+                meta_path = os.path.join(dirpath, f'{key}.json')
+                if os.path.exists(meta_path):
+                    try:
+                        with open(meta_path) as f:
+                            meta = json.load(f)
+                    except (OSError, ValueError):
+                        meta = {}
+                stats = [os.stat(path) for path in data]
+                entries.append({
+                    'key': key,
+                    'stage': meta.get('stage', ''),
+                    'params': meta.get('params', {}),
+                    'size': sum(stat.st_size for stat in stats),
+                    'last_used': max(stat.st_mtime for stat in stats),
+                    'path': min(data, key=len),
+                    'files': data + [meta_path],
+                })
+        entries.sort(key=lambda e: e['last_used'], reverse=True)
+        return entries
+
+    def total_size(self):
+        return sum(e['size'] for e in self.entries())
+
+    def _remove(self, entry):
+        for path in entry['files']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # already evicted by another process
+
+    def evict(self, budget_bytes=None):
+        """Drop least-recently-used artifacts until the cache fits the budget"""
+        budget_bytes = self.budget_bytes if budget_bytes is None else budget_bytes
+        entries = self.entries()
+        total = sum(e['size'] for e in entries)
+        removed = 0
+        while entries and total > budget_bytes:
+            entry = entries.pop()
+            self._remove(entry)
+            total -= entry['size']
+            removed += 1
+        return removed
+
+    def clear(self, stage=None):
+        """Remove every artifact, or only those of one stage"""
+        if stage is None:
+            if os.path.isdir(self.root):
+                shutil.rmtree(self.root)
+            return
+        for entry in self.entries():
+            if entry['stage'] == stage:
+                self._remove(entry)
+
+
+def _format_size(n_bytes):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n_bytes < 1024 or unit == 'GB':
+            return f'{n_bytes:.1f} {unit}' if unit != 'B' else f'{n_bytes} B'
+        n_bytes /= 1024
+
+
+def main():
+    """Inspect or clear the artifact cache"""
+    parser = argparse.ArgumentParser(description='Inspect or clear the RFM artifact cache')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='Cache directory')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('info', help='Show cache size and per-stage totals')
+    sub.add_parser('ls', help='List cached artifacts, most recently used first')
+    clear = sub.add_parser('clear', help='Remove cached artifacts')
+    clear.add_argument('--stage', help='Only remove artifacts of this stage')
+    evict = sub.add_parser('evict', help='Evict least-recently-used artifacts down to a budget')
+    evict.add_argument('--budget-mb', type=float, default=DEFAULT_BUDGET_MB)
+    args = parser.parse_args()
+
+    cache = ArtifactCache(args.root)
+    if args.command == 'info':
+        entries = cache.entries()
+        print(f"Cache directory: {os.path.abspath(cache.root)}")
+        print(f"Artifacts: {len(entries)}  Size: {_format_size(sum(e['size'] for e in entries))}  "
+              f"Budget: {_format_size(cache.budget_bytes)}")
+        by_stage = {}
+        for entry in entries:
+            count, size = by_stage.get(entry['stage'], (0, 0))
+            by_stage[entry['stage']] = (count + 1, size + entry['size'])
+        for stage, (count, size) in sorted(by_stage.items()):
+            print(f"  {stage or '(unknown)':24}: {count:4d} artifacts, {_format_size(size)}")
+    elif args.command == 'ls':
+        for entry in cache.entries():
+            used = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['last_used']))
+            print(f"{entry['key'][:12]}  {entry['stage']:24} {_format_size(entry['size']):>10}  {used}  "
+                  f"{json.dumps(entry['params'], default=str)}")
+    elif args.command == 'clear':
+        cache.clear(args.stage)
+        print(f"✅ Cleared {'stage ' + args.stage if args.stage else 'all artifacts'}")
+    elif args.command == 'evict':
+        removed = cache.evict(int(args.budget_mb * 1024 * 1024))
+        print(f"✅ Evicted {removed} artifacts")
+
+
+if __name__ == "__main__":
+    main()
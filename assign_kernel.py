@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Batched nearest-centroid assignment for scoring large customer tables
+Rows are streamed in fixed-size float32 blocks. The persisted StandardScaler
+is folded into the centroids, so each block needs one small matrix product
+plus a bias to get every centroid distance (up to a per-row constant),
+followed by an argmin. Rows whose two nearest centroids are too close for
+float32 are rechecked in float64, so the labels match KMeans.predict
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from generate_full_rfm import RFM_FEATURES, RFM_MODEL_FILE
+
+try:
+    from threadpoolctl import threadpool_limits
+    HAS_THREADPOOLCTL = True
+except ImportError:
+    HAS_THREADPOOLCTL = False
+
+DEFAULT_BLOCK_ROWS = 16_384
+# Bound on the float32 rounding error of a block's distances, in units of
+# machine epsilon times the magnitude of the terms summed
+TIE_TOLERANCE = 16 * np.finfo(np.float32).eps
+
+
+class CentroidAssigner:
+    """Nearest-centroid labels in the scaled RFM space of a fitted StandardScaler + KMeans"""
+
+    def __init__(self, mean, scale, centroids, block_rows=DEFAULT_BLOCK_ROWS, n_threads=1):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.centroids = np.asarray(centroids, dtype=np.float64)
+        self.block_rows = block_rows
+        self.n_threads = n_threads or os.cpu_count() or 1
+        self.rechecked = 0
+
+        # ||z - c||^2 = ||z||^2 - 2 z.c + ||c||^2 with z = x / scale - mean / scale;
+        # dropping ||z||^2 leaves x @ weights + bias, linear in the raw rows
+        inv_scale = 1.0 / self.scale
+        offset = -self.mean * inv_scale
+        self.weights = (-2.0 * inv_scale[:, None] * self.centroids.T)
+        self.bias = (self.centroids ** 2).sum(axis=1) - 2.0 * self.centroids @ offset
+        self.weights32 = self.weights.astype(np.float32)
+        self.bias32 = self.bias.astype(np.float32)
+        self.abs_weights32 = np.abs(self.weights).max(axis=1).astype(np.float32)
+        self.abs_bias = float(np.abs(self.bias).max())
+
+    @classmethod
+    def from_model(cls, path=RFM_MODEL_FILE, **kwargs):
+        """Assigner for the scaler and centroids persisted by generate_full_rfm.py"""
+        with open(path) as f:
+            model = json.load(f)
+        return cls(model['scaler']['mean'], model['scaler']['scale'], model['centroids'], **kwargs)
+
+    def _exact(self, rows):
+        """float64 labels computed in the scaled space, as KMeans.predict does"""
+        z = (rows - self.mean) / self.scale
+        distances = (z ** 2).sum(axis=1)[:, None] - 2 * z @ self.centroids.T + (self.centroids ** 2).sum(axis=1)
+        return distances.argmin(axis=1)
+
+    def _assign_block(self, block, out):
+        """Label one block of rows into ``out``; returns how many near-ties were rechecked"""
+        block32 = np.asarray(block, dtype=np.float32)
+        # One centroid per row of the (k x rows) product, so the argmin and the
+        # runner-up margin are elementwise passes over contiguous rows
+        distances = self.weights32.T @ block32.T
+        distances += self.bias32[:, None]
+
+        best = distances[0].copy()
+        second = np.full_like(best, np.inf)
+        labels = np.zeros(len(best), dtype=np.intp)
+        for k in range(1, len(distances)):
+            np.minimum(second, np.maximum(best, distances[k]), out=second)
+            closer = distances[k] < best
+            labels[closer] = k
+            np.minimum(best, distances[k], out=best)
+
+        # Rows whose margin is within float32 rounding are recomputed in float64
+        bound = np.abs(block32) @ self.abs_weights32
+        bound += self.abs_bias
+        bound *= TIE_TOLERANCE
+        close = np.flatnonzero(second - best <= bound)
+        if len(close):
+            labels[close] = self._exact(np.asarray(block, dtype=np.float64)[close])
+        out[:] = labels
+        return len(close)
+
+    def assign(self, X):
+        """Cluster label for every row of ``X`` (n x 3 recency, frequency, monetary)"""
+        if isinstance(X, pd.DataFrame):
+            X = X[RFM_FEATURES].to_numpy()
+        X = np.asarray(X)
+        labels = np.empty(len(X), dtype=np.intp)
+        starts = range(0, len(X), self.block_rows)
+
+        def run(start):
+            return self._assign_block(X[start:start + self.block_rows], labels[start:start + self.block_rows])
+
+        if self.n_threads <= 1 or len(starts) <= 1:
+            self.rechecked += sum(map(run, starts))
+            return labels
+
+        # numpy releases the GIL inside the block kernels; BLAS is held to one
+        # thread per block so the pool is not oversubscribed
+        with ThreadPoolExecutor(max_workers=self.n_threads) as pool:
+            if HAS_THREADPOOLCTL:
+                with threadpool_limits(limits=1, user_api='blas'):
+                    self.rechecked += sum(pool.map(run, starts))
+            else:
+                self.rechecked += sum(pool.map(run, starts))
+        return labels
+
+    def assign_csv(self, path, chunksize=1_000_000):
+        """Stream an RFM table from CSV, yielding (chunk, labels) per chunk"""
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            yield chunk, self.assign(chunk[RFM_FEATURES].to_numpy())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Assign KMeans clusters to an RFM table with the persisted model')
+    parser.add_argument('input', nargs='?', default='rfm_segments_output_full.csv')
+    parser.add_argument('--model', default=RFM_MODEL_FILE)
+    parser.add_argument('--output', default=None, help='Write the table with re-assigned clusters here')
+    parser.add_argument('--block-rows', type=int, default=DEFAULT_BLOCK_ROWS)
+    parser.add_argument('--threads', type=int, default=0, help='Worker threads (0 = one per CPU)')
+    parser.add_argument('--chunksize', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    assigner = CentroidAssigner.from_model(args.model, block_rows=args.block_rows, n_threads=args.threads)
+    start = time.perf_counter()
+    rows, changed = 0, 0
+    for i, (chunk, labels) in enumerate(assigner.assign_csv(args.input, args.chunksize)):
+        rows += len(chunk)
+        if 'cluster' in chunk:
+            changed += int((chunk['cluster'].to_numpy() != labels).sum())
+        if args.output:
+            chunk.assign(cluster=labels).to_csv(args.output, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    seconds = time.perf_counter() - start
+    print(f"✅ Assigned {rows:,} customers in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f}/s), "
+          f"{changed:,} changed cluster, {assigner.rechecked:,} near-ties rechecked in float64")
+    if args.output:
+        print(f"📁 Saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: batched nearest-centroid assignment vs KMeans.predict
+Fits the scaler and K-Means on the current RFM table, then labels a large
+synthetic batch of customers with the float32 block kernel at several
+thread counts, checking every label against StandardScaler + KMeans.predict
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assign_kernel import CentroidAssigner, DEFAULT_BLOCK_ROWS
+from generate_full_rfm import RFM_FEATURES
+
+TARGET_ROWS_PER_SECOND = 10_000_000
+
+
+def synthetic_customers(rfm, n_rows, seed=0):
+    """Recency/frequency/monetary rows drawn around the real table's ranges"""
+    rng = np.random.default_rng(seed)
+    columns = []
+    for feature in RFM_FEATURES:
+        low, high = rfm[feature].min(), rfm[feature].max()
+        columns.append(rng.uniform(low, high * 1.5 + 1, n_rows).round())
+    return np.column_stack(columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the nearest-centroid assignment kernel')
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--table', default='rfm_segments_output_full.csv')
+    parser.add_argument('--clusters', type=int, default=4)
+    parser.add_argument('--threads', type=int, nargs='+', default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument('--block-rows', type=int, default=DEFAULT_BLOCK_ROWS)
+    args = parser.parse_args()
+
+    rfm = pd.read_csv(args.table)
+    scaler = StandardScaler().fit(rfm[RFM_FEATURES].to_numpy())
+    kmeans = KMeans(n_clusters=args.clusters, random_state=42).fit(scaler.transform(rfm[RFM_FEATURES].to_numpy()))
+    X = synthetic_customers(rfm, args.rows)
+
+    start = time.perf_counter()
+    expected = kmeans.predict(scaler.transform(X))
+    sklearn_seconds = time.perf_counter() - start
+
+    print(f"\n{args.rows:,} customers, {args.clusters} centroids, target {TARGET_ROWS_PER_SECOND:,} rows/s")
+    print(f"{'Method':28} {'Seconds':>9} {'Rows/s':>14} {'Mismatches':>11} {'Rechecked':>10}")
+    print(f"{'scaler + KMeans.predict':28} {sklearn_seconds:9.2f} {args.rows / sklearn_seconds:14,.0f}")
+    for threads in args.threads:
+        assigner = CentroidAssigner(scaler.mean_, scaler.scale_, kmeans.cluster_centers_,
+                                    block_rows=args.block_rows, n_threads=threads)
+        start = time.perf_counter()
+        labels = assigner.assign(X)
+        seconds = time.perf_counter() - start
+        rate = args.rows / seconds
+        status = '✅' if rate >= TARGET_ROWS_PER_SECOND else '❌'
+        print(f"{f'kernel ({threads} threads)':28} {seconds:9.2f} {rate:14,.0f} "
+              f"{int((labels != expected).sum()):11d} {assigner.rechecked:10d} {status}")
+
+
+if __name__ == "__main__":
+    main()
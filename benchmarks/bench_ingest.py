@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: typed transaction ingestion vs the original untyped loader
+Generates a synthetic customer_transactions-style CSV (50M rows by default)
+and times each loader in its own process, reporting wall time and peak RSS
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transaction_ingest import read_transactions, HAS_PYARROW
+
+CHUNK_ROWS = 1_000_000
+
+
+def generate_transactions(path, n_rows, n_customers=None, seed=42):
+    """Write a synthetic transaction file with the same 14 columns as the real one"""
+    rng = np.random.default_rng(seed)
+    n_customers = n_customers or max(n_rows // 20, 1)
+    dates = pd.date_range('2020-01-01', '2024-12-31').strftime('%Y-%m-%d').to_numpy()
+    names = np.array(['Alice', 'Bob', 'Charlie', 'David', 'Eve', 'Frank', 'Grace', 'Hannah'])
+    regions = np.array(['North', 'South', 'East', 'West'])
+    categories = np.array(['Electronics', 'Furniture', 'Clothing', 'Food'])
+    customer_types = np.array(['New', 'Returning'])
+    payments = np.array(['Cash', 'Credit Card', 'UPI', 'Bank Transfer'])
+    channels = np.array(['Online', 'Retail'])
+    segments = np.array(['Monthly', 'Regular', 'Occasional'])
+
+    written = 0
+    with open(path, 'w') as f:
+        while written < n_rows:
+            n = min(CHUNK_ROWS, n_rows - written)
+            chunk = pd.DataFrame({
+                'Customer_ID': rng.integers(1, n_customers + 1, n),
+                'Sale_Date': dates[rng.integers(0, len(dates), n)],
+                'Customer_Name': names[rng.integers(0, len(names), n)],
+                'Region': regions[rng.integers(0, len(regions), n)],
+                'Sales_Amount': rng.integers(100, 10000, n),
+                'Quantity_Sold': rng.integers(1, 50, n),
+                'Product_Category': categories[rng.integers(0, len(categories), n)],
+                'Unit_Cost': np.round(rng.uniform(50, 2000, n), 2),
+                'Unit_Price': np.round(rng.uniform(100, 3000, n), 2),
+                'Customer_Type': customer_types[rng.integers(0, len(customer_types), n)],
+                'Discount': np.round(rng.uniform(0, 0.3, n), 2),
+                'Payment_Method': payments[rng.integers(0, len(payments), n)],
+                'Sales_Channel': channels[rng.integers(0, len(channels), n)],
+                'Segment': segments[rng.integers(0, len(segments), n)],
+            })
+            chunk.to_csv(f, header=written == 0, index=False)
+            written += n
+            print(f"  generated {written:,}/{n_rows:,} rows", end='\r', flush=True)
+    print()
+
+
+def legacy_loader(path):
+    """The original loader: untyped read of every column, inferred date parsing"""
+    df = pd.read_csv(path)
+    df['Sale_Date'] = pd.to_datetime(df['Sale_Date'], errors='coerce')
+    return df
+
+
+LOADERS = {
+    'legacy': legacy_loader,
+    'typed (c)': lambda path: read_transactions(path, engine='c'),
+    'typed (pyarrow)': lambda path: read_transactions(path, engine='pyarrow'),
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (VmHWM resets on exec, unlike ru_maxrss)"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def run_loader(name, path):
+    """Run one loader in this process and print its timing as JSON"""
+    start = time.perf_counter()
+    df = LOADERS[name](path)
+    seconds = time.perf_counter() - start
+    print(json.dumps({'loader': name, 'seconds': seconds, 'rows': len(df),
+                      'frame_mb': df.memory_usage(deep=True).sum() / 1e6, 'peak_rss_mb': peak_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark transaction CSV loaders')
+    parser.add_argument('--rows', type=int, default=50_000_000, help='Rows in the synthetic file')
+    parser.add_argument('--path', default=None, help='Synthetic CSV path (reused if it already exists)')
+    parser.add_argument('--run-loader', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    path = args.path or f'bench_transactions_{args.rows}.csv'
+    if args.run_loader:
+        run_loader(args.run_loader, path)
+        return
+
+    if not os.path.exists(path):
+        print(f"Generating {args.rows:,} synthetic transactions -> {path}")
+        generate_transactions(path, args.rows)
+    print(f"File size: {os.path.getsize(path) / 1e9:.2f} GB")
+
+    results = []
+    for name in LOADERS:
+        if name == 'typed (pyarrow)' and not HAS_PYARROW:
+            print(f"Skipping {name}: pyarrow not installed")
+            continue
+        output = subprocess.run([sys.executable, __file__, '--path', path, '--run-loader', name],
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    baseline = results[0]['seconds']
+    print(f"\n{'Loader':18} {'Seconds':>9} {'Speedup':>8} {'Frame MB':>10} {'Peak RSS MB':>12}")
+    for r in results:
+        print(f"{r['loader']:18} {r['seconds']:9.2f} {baseline / r['seconds']:7.1f}x "
+              f"{r['frame_mb']:10.1f} {r['peak_rss_mb']:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: online per-transaction ingestion throughput
+Seeds the in-memory store from the batch table and frozen model, then
+replays synthetic transactions one event at a time and in micro-batches
+(parsing included), reporting events/second against the 50k/s target
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_ingest import generate_transactions
+from online_ingest import EventParser, OnlineRFM, RFM_MODEL_FILE, TABLE_FILE, run, tail_file
+
+TARGET_EVENTS_PER_SECOND = 50_000
+
+
+def single_events(store, parser, lines):
+    """One parse + update call per transaction"""
+    start = time.perf_counter()
+    for line in lines:
+        store.ingest(parser.parse([line]))
+    return time.perf_counter() - start
+
+
+def micro_batches(store, parser, lines, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(lines), batch_size):
+        store.ingest(parser.parse(lines[i:i + batch_size]))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark online RFM ingestion throughput')
+    parser.add_argument('--events', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--model', default=RFM_MODEL_FILE)
+    parser.add_argument('--table', default=TABLE_FILE)
+    args = parser.parse_args()
+
+    path = f'bench_transactions_{args.events}.csv'
+    if not os.path.exists(path):
+        print(f"Generating {args.events:,} synthetic transactions -> {path}")
+        generate_transactions(path, args.events, n_customers=1000)
+    with open(path) as f:
+        header, *lines = f.readlines()
+    event_parser = EventParser(header)
+
+    results = []
+    store = OnlineRFM.from_batch(args.model, args.table)
+    results.append(('single events', single_events(store, event_parser, lines)))
+    store = OnlineRFM.from_batch(args.model, args.table)
+    results.append((f'micro-batches of {args.batch_size}',
+                    micro_batches(store, event_parser, lines, args.batch_size)))
+    store = OnlineRFM.from_batch(args.model, args.table)
+    events, seconds = run(store, tail_file(path, args.batch_size, from_start=True, follow=False))
+    print()
+    results.append(('file tail', seconds))
+
+    print(f"\n{len(lines):,} events, {len(store.customers):,} customers, target {TARGET_EVENTS_PER_SECOND:,} events/s")
+    print(f"{'Mode':24} {'Seconds':>9} {'Events/s':>12}")
+    for name, seconds in results:
+        rate = len(lines) / seconds
+        status = '✅' if rate >= TARGET_EVENTS_PER_SECOND else '❌'
+        print(f"{name:24} {seconds:9.2f} {rate:12,.0f} {status}")
+
+
+if __name__ == "__main__":
+    main()
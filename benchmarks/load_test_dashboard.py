@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Load test for the Dash dashboard under concurrent users
+Reads the app's callback graph from /_dash-dependencies and its initial
+component values from /_dash-layout, then replays random dropdown
+sessions from concurrent clients against /_dash-update-component the way
+a browser would (every callback fed by the changed dropdown fires).
+Reports throughput, p50/p95/p99 latency per callback and peak RSS per
+server process
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DROPDOWNS = ('segment-dropdown', 'cluster-dropdown', 'country-dropdown')
+PERCENTILES = (50, 95, 99)
+
+
+# ----------------------------------------------------------------- dash app
+def parse_outputs(output):
+    """Split a callback output spec ('id.prop' or '..a.prop...b.prop..') into id/property dicts"""
+    multi = output.startswith('..')
+    specs = output.strip('.').split('...') if multi else [output]
+    outputs = []
+    for spec in specs:
+        component_id, prop = spec.rsplit('.', 1)
+        outputs.append({'id': component_id, 'property': prop.split('@')[0]})
+    return outputs, multi
+
+
+def layout_values(node, values=None):
+    """Initial props of every component with an id, keyed by id"""
+    values = {} if values is None else values
+    if isinstance(node, list):
+        for child in node:
+            layout_values(child, values)
+    elif isinstance(node, dict):
+        props = node.get('props', {})
+        if 'id' in props and isinstance(props['id'], str):
+            values[props['id']] = props
+        layout_values(props.get('children'), values)
+    return values
+
+
+class DashApp:
+    """The callbacks of a running Dash app that depend on the filter dropdowns"""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        dependencies = requests.get(f'{self.url}/_dash-dependencies', timeout=30).json()
+        self.components = layout_values(requests.get(f'{self.url}/_dash-layout', timeout=30).json())
+        self.callbacks = [dep for dep in dependencies
+                          if any(item['id'] in DROPDOWNS for item in dep['inputs'])]
+        self.options = {
+            dropdown: [option['value'] for option in self.components[dropdown].get('options', [])]
+            for dropdown in DROPDOWNS if dropdown in self.components
+        }
+
+    def value(self, component_id, prop, selection):
+        if component_id in selection and prop == 'value':
+            return selection[component_id]
+        return self.components.get(component_id, {}).get(prop)
+
+    def payload(self, callback, selection, changed):
+        outputs, multi = parse_outputs(callback['output'])
+        return {
+            'output': callback['output'],
+            'outputs': outputs if multi else outputs[0],
+            'inputs': [dict(item, value=self.value(item['id'], item['property'], selection))
+                       for item in callback['inputs']],
+            'state': [dict(item, value=self.value(item['id'], item['property'], selection))
+                      for item in callback.get('state', [])],
+            'changedPropIds': [f'{changed}.value'],
+        }
+
+    def triggered_by(self, dropdown):
+        return [cb for cb in self.callbacks if any(item['id'] == dropdown for item in cb['inputs'])]
+
+
+# -------------------------------------------------------------------- users
+class Results:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, ok):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def callback_name(callback):
+    return ', '.join(output['id'] for output in parse_outputs(callback['output'])[0])
+
+
+def run_user(app, results, n_steps, seed, think_time):
+    """One analyst session: change one dropdown per step and fire its callbacks"""
+    rng = random.Random(seed)
+    session = requests.Session()
+    selection = {dropdown: 'all' for dropdown in app.options}
+    for _ in range(n_steps):
+        dropdown = rng.choice(list(app.options))
+        selection[dropdown] = rng.choice(app.options[dropdown])
+        for callback in app.triggered_by(dropdown):
+            start = time.perf_counter()
+            try:
+                response = session.post(f'{app.url}/_dash-update-component',
+                                        json=app.payload(callback, selection, dropdown), timeout=120)
+                ok = response.status_code in (200, 204)
+            except requests.RequestException:
+                ok = False
+            results.record(callback_name(callback), time.perf_counter() - start, ok)
+        if think_time:
+            time.sleep(rng.uniform(0, think_time))
+
+
+# ------------------------------------------------------------------- memory
+def process_tree(root_pid):
+    """``root_pid`` and all of its descendants, from /proc"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemorySampler(threading.Thread):
+    """Samples the RSS of every process under the server's root pid and keeps each one's peak"""
+
+    def __init__(self, root_pids, interval=0.2):
+        super().__init__(daemon=True)
+        self.root_pids = root_pids
+        self.interval = interval
+        self.peaks = {}
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            for root in self.root_pids:
+                for pid in process_tree(root):
+                    rss = rss_mb(pid)
+                    if rss is not None:
+                        self.peaks[pid] = max(self.peaks.get(pid, 0.0), rss)
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+# ------------------------------------------------------------------- server
+def start_server(workers, port):
+    """Start the dashboard under gunicorn, as in production"""
+    command = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}',
+               '--timeout', '120', 'dash_dashboard:server']
+    return subprocess.Popen(command, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f'{url}/_dash-dependencies', timeout=5).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Dashboard at {url} did not become ready within {timeout}s")
+
+
+# ------------------------------------------------------------------- report
+def summarize(results, wall_seconds, peaks):
+    callbacks = {}
+    for name, latencies in sorted(results.latencies.items()):
+        values = np.array(latencies) * 1000
+        callbacks[name] = {
+            'requests': len(values),
+            'errors': results.errors.get(name, 0),
+            **{f'p{p}_ms': float(np.percentile(values, p)) for p in PERCENTILES},
+        }
+    total = sum(entry['requests'] for entry in callbacks.values())
+    return {
+        'requests': total,
+        'errors': sum(results.errors.values()),
+        'wall_seconds': wall_seconds,
+        'throughput_rps': total / wall_seconds if wall_seconds else 0.0,
+        'callbacks': callbacks,
+        'worker_peak_rss_mb': {str(pid): rss for pid, rss in sorted(peaks.items())},
+    }
+
+
+def print_report(report):
+    print(f"\n{report['requests']:,} requests in {report['wall_seconds']:.1f}s "
+          f"({report['throughput_rps']:.1f} req/s), {report['errors']} errors")
+    print(f"\n{'Callback':45} {'Requests':>9} {'Errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, entry in report['callbacks'].items():
+        print(f"{name[:45]:45} {entry['requests']:9d} {entry['errors']:7d} "
+              f"{entry['p50_ms']:8.1f} {entry['p95_ms']:8.1f} {entry['p99_ms']:8.1f}")
+    if report['worker_peak_rss_mb']:
+        print(f"\n{'Server PID':>10} {'Peak RSS MB':>12}")
+        for pid, rss in report['worker_peak_rss_mb'].items():
+            print(f"{pid:>10} {rss:12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the Dash dashboard with concurrent simulated users')
+    parser.add_argument('--url', default=None, help='Running dashboard (default: start one under gunicorn)')
+    parser.add_argument('--pid', type=int, nargs='*', default=[],
+                        help='Server process id(s) to sample memory for when using --url')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers when starting the server')
+    parser.add_argument('--port', type=int, default=8051)
+    parser.add_argument('--users', type=int, default=20, help='Concurrent simulated analysts')
+    parser.add_argument('--steps', type=int, default=25, help='Dropdown changes per user')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Max random pause between steps (s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', default=None, help='Also write the report as JSON to this path')
+    args = parser.parse_args()
+
+    server = None
+    if args.url is None:
+        print(f"Starting dashboard under gunicorn with {args.workers} workers...")
+        server = start_server(args.workers, args.port)
+        args.url = f'http://127.0.0.1:{args.port}'
+        args.pid = [server.pid]
+    try:
+        wait_until_ready(args.url)
+        app = DashApp(args.url)
+        print(f"🔬 {len(app.callbacks)} filter callbacks, {args.users} users x {args.steps} steps")
+
+        sampler = MemorySampler(args.pid)
+        sampler.start()
+        results = Results()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            users = [pool.submit(run_user, app, results, args.steps, args.seed + user, args.think_time)
+                     for user in range(args.users)]
+            for user in users:
+                user.result()
+        wall_seconds = time.perf_counter() - start
+        sampler.stop()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = summarize(results, wall_seconds, sampler.peaks)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📁 Saved: {args.json}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
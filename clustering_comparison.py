@@ -6,23 +6,36 @@ Evaluates multiple clustering algorithms with metrics to justify the best choice
 
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans, DBSCAN, AgglomerativeClustering
+from sklearn.cluster import DBSCAN, AgglomerativeClustering
 from sklearn.mixture import GaussianMixture
-from sklearn.metrics import silhouette_score, calinski_harabasz_score, davies_bouldin_score
 from sklearn.metrics import adjusted_rand_score, normalized_mutual_info_score
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
+import argparse
 import warnings
 warnings.filterwarnings('ignore')
 
-def load_and_prepare_data():
-    """Load and prepare the RFM data for clustering comparison"""
+from artifact_cache import ArtifactCache
+from clustering_sweeps import (cluster_metrics, sweep_k, sweep_dbscan_eps, plot_k_curves, WarmStartKMeans,
+                               MAX_LINKAGE_ROWS)
+from scalable_clustering import SampledGaussianMixture, MicroClusterAgglomerative, birch_agglomerative
+from clustering_costs import measure_costs, profile_row_limit, MAX_PROFILE_ROWS
+from raster_render import render_label_panels
+from rfm_enrichment import enrich, ENRICHMENT_DIMENSIONS
+from snapshot_store import SnapshotStore
+
+VISUALIZATION_FILE = 'clustering_comparison_visualization.png'
+PLOT_MODES = ('raster', 'matplotlib')
+MAX_PLOT_POINTS = 20_000
+
+def load_and_prepare_data(rfm=None):
+    """Load and prepare the RFM data (default the latest full output) for clustering comparison"""
     print("Loading RFM data for clustering comparison...")
     
     # Load the full RFM dataset
-    rfm = pd.read_csv('rfm_segments_output_full.csv')
+    if rfm is None:
+        rfm = pd.read_csv('rfm_segments_output_full.csv')
     
     # Prepare features for clustering
     features = ['recency', 'frequency', 'monetary']
@@ -37,28 +50,11 @@ def load_and_prepare_data():
 
 def evaluate_clustering_algorithm(X, labels, algorithm_name):
     """Evaluate a clustering algorithm using multiple metrics"""
-    metrics = {}
-    
     try:
-        # Silhouette Score (higher is better, range: -1 to 1)
-        metrics['silhouette_score'] = silhouette_score(X, labels)
-        
-        # Calinski-Harabasz Index (higher is better)
-        metrics['calinski_harabasz_score'] = calinski_harabasz_score(X, labels)
-        
-        # Davies-Bouldin Index (lower is better)
-        metrics['davies_bouldin_score'] = davies_bouldin_score(X, labels)
-        
-        # Number of clusters
-        metrics['n_clusters'] = len(np.unique(labels))
-        
-        # Number of noise points (for DBSCAN)
-        metrics['n_noise'] = np.sum(labels == -1) if -1 in labels else 0
-        
-        print(f"✅ {algorithm_name}: Silhouette={metrics['silhouette_score']:.3f}, "
-              f"CH={metrics['calinski_harabasz_score']:.1f}, "
-              f"DB={metrics['davies_bouldin_score']:.3f}, "
-              f"Clusters={metrics['n_clusters']}")
+        # Silhouette (higher is better), Calinski-Harabasz (higher is better),
+        # Davies-Bouldin (lower is better), cluster and noise counts
+        metrics = cluster_metrics(X, labels)
+        print_metrics(algorithm_name, metrics)
         
     except Exception as e:
         print(f"❌ {algorithm_name}: Error - {e}")
@@ -66,53 +62,162 @@ def evaluate_clustering_algorithm(X, labels, algorithm_name):
     
     return metrics
 
-def compare_clustering_algorithms():
-    """Compare multiple clustering algorithms"""
+def print_metrics(algorithm_name, metrics):
+    """Print a one-line metric summary for an algorithm"""
+    print(f"✅ {algorithm_name}: Silhouette={metrics['silhouette_score']:.3f}, "
+          f"CH={metrics['calinski_harabasz_score']:.1f}, "
+          f"DB={metrics['davies_bouldin_score']:.3f}, "
+          f"Clusters={metrics['n_clusters']}")
+
+def print_costs(algorithm_name, costs):
+    """Print a one-line resource summary for an algorithm"""
+    predict = '-' if costs['predict_seconds'] is None else f"{costs['predict_seconds']:.3f}s"
+    scaling = 'too fast to measure' if costs['scaling_exponent'] is None else f"n^{costs['scaling_exponent']:.2f}"
+    print(f"⏱️  {algorithm_name}: Fit={costs['fit_seconds']:.3f}s (n={costs['profile_rows']}), "
+          f"Predict={predict}, Peak={costs['peak_memory_mb']:.1f}MB, "
+          f"Scaling={scaling}")
+
+def build_algorithms(n_clusters=4):
+    """Model-based and hierarchical algorithms, including their scalable variants"""
+    return {
+        'Gaussian Mixture': GaussianMixture(n_components=n_clusters, random_state=42),
+        'Sampled Gaussian Mixture': SampledGaussianMixture(n_components=n_clusters, random_state=42),
+        'BIRCH + Agglomerative': birch_agglomerative(n_clusters=n_clusters),
+        'Micro-cluster Agglomerative': MicroClusterAgglomerative(n_clusters=n_clusters, random_state=42),
+    }
+
+ALGORITHM_NAMES = tuple(build_algorithms())
+
+def compare_clustering_algorithms(k_min=3, k_max=6, eps_values=(0.5, 0.8, 1.0), use_cache=True,
+                                  algorithms=None, profile_costs=True, max_profile_rows=MAX_PROFILE_ROWS,
+                                  extra_features=None, rfm_table=None, max_linkage_rows=MAX_LINKAGE_ROWS):
+    """
+    Compare multiple clustering algorithms.
+
+    ``extra_features`` is an optional (sparse) matrix aligned with the RFM
+    rows, e.g. share-of-spend features from rfm_enrichment; it is appended to
+    the scaled RFM columns and every algorithm runs on the sparse result
+    (those that need dense input are reported as failed). ``rfm_table``
+    replaces the latest RFM output, e.g. with a past snapshot. Above
+    ``max_linkage_rows`` rows the Agglomerative sweep merges micro-clusters
+    instead of building the full O(n^2) Ward tree.
+    """
     print("=" * 80)
     print("COMPREHENSIVE CLUSTERING ALGORITHM COMPARISON")
     print("=" * 80)
     
     # Load data
-    X_scaled, rfm, scaler = load_and_prepare_data()
-    
-    # Define algorithms to compare
-    algorithms = {
-        'K-Means': KMeans(n_clusters=4, random_state=42, n_init=10),
-        'K-Means (3 clusters)': KMeans(n_clusters=3, random_state=42, n_init=10),
-        'K-Means (5 clusters)': KMeans(n_clusters=5, random_state=42, n_init=10),
-        'K-Means (6 clusters)': KMeans(n_clusters=6, random_state=42, n_init=10),
-        'Gaussian Mixture': GaussianMixture(n_components=4, random_state=42),
-        'Agglomerative (4)': AgglomerativeClustering(n_clusters=4),
-        'Agglomerative (3)': AgglomerativeClustering(n_clusters=3),
-        'Agglomerative (5)': AgglomerativeClustering(n_clusters=5),
-        'DBSCAN (eps=0.5)': DBSCAN(eps=0.5, min_samples=5),
-        'DBSCAN (eps=0.8)': DBSCAN(eps=0.8, min_samples=5),
-        'DBSCAN (eps=1.0)': DBSCAN(eps=1.0, min_samples=5),
-    }
+    X_scaled, rfm, scaler = load_and_prepare_data(rfm_table)
+    if extra_features is not None:
+        X_scaled = sparse.hstack([sparse.csr_matrix(X_scaled), sparse.csr_matrix(extra_features)], format='csr')
+        print(f"Added {extra_features.shape[1]} enrichment features ({X_scaled.nnz:,} stored values)")
     
     results = {}
+    estimators = {}
+    labels = {}
+    cache = ArtifactCache(enabled=use_cache)
+    
+    # K-Means and Agglomerative over a range of k come from the cached k-sweep
+    sweep = sweep_k(X_scaled, k_min, k_max, cache=cache, max_linkage_rows=max_linkage_rows)
+    for k in sweep['k_values']:
+        results[f'K-Means ({k} clusters)'] = sweep['kmeans'][k]['metrics']
+        # Profiled as fit in the sweep: warm-started from the previous k's centroids
+        estimators[f'K-Means ({k} clusters)'] = WarmStartKMeans(
+            n_clusters=k, init_centroids=sweep['kmeans'][k].get('init_centroids'), random_state=42)
+        labels[f'K-Means ({k} clusters)'] = sweep['kmeans'][k]['labels']
+    for k in sweep['k_values']:
+        results[f'Agglomerative ({k})'] = sweep['agglomerative'][k]['metrics']
+        # Large inputs were swept over micro-clusters rather than the full tree
+        if sweep['agglomerative'][k].get('method') == 'micro-cluster':
+            estimators[f'Agglomerative ({k})'] = MicroClusterAgglomerative(n_clusters=k, random_state=42)
+        else:
+            estimators[f'Agglomerative ({k})'] = AgglomerativeClustering(n_clusters=k)
+        labels[f'Agglomerative ({k})'] = sweep['agglomerative'][k]['labels']
+    
+    # Remaining algorithms, optionally restricted to the selected names
+    available = build_algorithms()
+    selected = ALGORITHM_NAMES if algorithms is None else algorithms
+    unknown = [name for name in selected if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown algorithms {unknown}, expected some of {list(ALGORITHM_NAMES)}")
+    algorithms = {name: available[name] for name in selected}
+    estimators.update(algorithms)
     
     print("\n🔬 Testing Clustering Algorithms...")
     print("-" * 80)
     
+    for name, metrics in results.items():
+        print_metrics(name, metrics)
+    
     for name, algorithm in algorithms.items():
         try:
+            # Reuse labels and metrics when this estimator already ran on this matrix
+            params = {'name': name, 'estimator': repr(algorithm)}
+            key = cache.key('algorithm', params, [X_scaled], code=[type(algorithm), cluster_metrics])
+            cached = cache.get(key)
+            if cached is not None:
+                print_metrics(name, cached['metrics'])
+                results[name] = cached['metrics']
+                labels[name] = cached['labels']
+                continue
+            
             # Fit the algorithm
             if hasattr(algorithm, 'fit_predict'):
-                labels = algorithm.fit_predict(X_scaled)
+                algorithm_labels = algorithm.fit_predict(X_scaled)
             else:
                 # For Gaussian Mixture
-                labels = algorithm.fit(X_scaled).predict(X_scaled)
+                algorithm_labels = algorithm.fit(X_scaled).predict(X_scaled)
+            labels[name] = algorithm_labels
             
             # Evaluate the clustering
-            metrics = evaluate_clustering_algorithm(X_scaled, labels, name)
+            metrics = evaluate_clustering_algorithm(X_scaled, algorithm_labels, name)
             results[name] = metrics
+            if 'error' not in metrics:
+                cache.put(key, {'labels': algorithm_labels, 'metrics': metrics}, 'algorithm', params)
             
         except Exception as e:
             print(f"❌ {name}: Failed - {e}")
             results[name] = {'error': str(e)}
     
-    return results, X_scaled, rfm
+    # DBSCAN for every eps shares one radius-neighbors graph
+    density_sweep = sweep_dbscan_eps(X_scaled, eps_values, min_samples=5, cache=cache)
+    for eps in density_sweep['eps_values']:
+        name = f'DBSCAN (eps={eps})'
+        metrics = density_sweep['dbscan'][eps]['metrics']
+        if 'error' in metrics:
+            print(f"❌ {name}: Error - {metrics['error']}")
+        else:
+            print_metrics(name, metrics)
+        results[name] = metrics
+        estimators[name] = DBSCAN(eps=eps, min_samples=5)
+        labels[name] = density_sweep['dbscan'][eps]['labels']
+    
+    # Fit/predict time, peak memory and scaling exponent for every valid configuration
+    if profile_costs:
+        print("\n⏱️  Profiling Resource Usage...")
+        print("-" * 80)
+        for name, estimator in estimators.items():
+            if 'error' in results[name]:
+                continue
+            params = {'name': name, 'estimator': repr(estimator),
+                      'max_rows': profile_row_limit(estimator, max_profile_rows)}
+            key = cache.key('costs', params, [X_scaled], code=[type(estimator), measure_costs])
+            try:
+                costs = cache.get_or_compute(key, 'costs',
+                                             lambda: measure_costs(estimator, X_scaled, max_profile_rows), params)
+            except (TypeError, ValueError) as e:
+                # e.g. sklearn's Agglomerative on sparse features: labels came from the sweep
+                print(f"⚠️  {name}: not profiled - {e}")
+                continue
+            results[name] = {**results[name], **costs}
+            print_costs(name, costs)
+    
+    return results, X_scaled, rfm, sweep, labels
+
+def _format_cost(metrics, key, spec):
+    """Format a resource measurement, or '-' when it was not measured or does not apply"""
+    value = metrics.get(key)
+    return '-' if value is None else format(value, spec)
 
 def create_comparison_table(results):
     """Create a comprehensive comparison table"""
@@ -131,7 +236,11 @@ def create_comparison_table(results):
                 'Calinski-Harabasz': f"{metrics['calinski_harabasz_score']:.1f}",
                 'Davies-Bouldin': f"{metrics['davies_bouldin_score']:.3f}",
                 'Clusters': metrics['n_clusters'],
-                'Noise Points': metrics.get('n_noise', 0)
+                'Noise Points': metrics.get('n_noise', 0),
+                'Fit Time (s)': _format_cost(metrics, 'fit_seconds', '.3f'),
+                'Predict Time (s)': _format_cost(metrics, 'predict_seconds', '.3f'),
+                'Peak Memory (MB)': _format_cost(metrics, 'peak_memory_mb', '.1f'),
+                'Scaling Exp.': _format_cost(metrics, 'scaling_exponent', '.2f')
             })
         else:
             comparison_data.append({
@@ -140,7 +249,11 @@ def create_comparison_table(results):
                 'Calinski-Harabasz': 'ERROR',
                 'Davies-Bouldin': 'ERROR',
                 'Clusters': 'ERROR',
-                'Noise Points': 'ERROR'
+                'Noise Points': 'ERROR',
+                'Fit Time (s)': 'ERROR',
+                'Predict Time (s)': 'ERROR',
+                'Peak Memory (MB)': 'ERROR',
+                'Scaling Exp.': 'ERROR'
             })
     
     df_comparison = pd.DataFrame(comparison_data)
@@ -148,8 +261,22 @@ def create_comparison_table(results):
     
     return df_comparison
 
-def analyze_best_algorithm(results):
-    """Analyze and recommend the best clustering algorithm"""
+def cost_scores(valid_results):
+    """Relative cost score per algorithm in (0, 1]: 1 is the fastest and leanest fit"""
+    fastest = min(max(m['fit_seconds'], 1e-6) for m in valid_results.values())
+    leanest = min(max(m['peak_memory_mb'], 1e-6) for m in valid_results.values())
+    return {
+        name: 0.5 * fastest / max(m['fit_seconds'], 1e-6) + 0.5 * leanest / max(m['peak_memory_mb'], 1e-6)
+        for name, m in valid_results.items()
+    }
+
+def analyze_best_algorithm(results, cost_weight=0.0):
+    """
+    Analyze and recommend the best clustering algorithm.
+
+    With ``cost_weight`` > 0 the composite score blends quality with the
+    relative fit time and peak memory: (1 - w) * quality + w * cost.
+    """
     print("\n" + "=" * 80)
     print("ALGORITHM ANALYSIS & RECOMMENDATION")
     print("=" * 80)
@@ -174,6 +301,14 @@ def analyze_best_algorithm(results):
     print(f"\n📊 COMPOSITE SCORE ANALYSIS:")
     print("-" * 50)
     
+    has_costs = all('fit_seconds' in m for m in valid_results.values())
+    if cost_weight > 0 and not has_costs:
+        print("⚠️  No resource measurements available; ranking on quality only")
+        cost_weight = 0.0
+    costs = cost_scores(valid_results) if cost_weight > 0 else {}
+    if cost_weight > 0:
+        print(f"(quality weight {1 - cost_weight:.2f}, cost weight {cost_weight:.2f})")
+    
     composite_scores = {}
     for name, metrics in valid_results.items():
         # Normalize scores (higher is better for all)
@@ -183,6 +318,8 @@ def analyze_best_algorithm(results):
         
         # Weighted composite score
         composite_score = (0.4 * silhouette_norm + 0.3 * calinski_norm + 0.3 * davies_norm)
+        if cost_weight > 0:
+            composite_score = (1 - cost_weight) * composite_score + cost_weight * costs[name]
         composite_scores[name] = composite_score
         
         print(f"{name:25}: {composite_score:.3f}")
@@ -194,49 +331,93 @@ def analyze_best_algorithm(results):
     
     return best_overall[0], composite_scores
 
-def create_visualization_comparison(X_scaled, rfm):
-    """Create visualizations comparing different clustering algorithms"""
-    print(f"\n📊 Creating visualization comparison...")
+def select_visualization_panels(labels, k=4, eps=0.8):
+    """Pick one already-computed labelling per algorithm family for the 2x2 figure"""
+    preferred = [f'K-Means ({k} clusters)', 'Gaussian Mixture', f'Agglomerative ({k})', f'DBSCAN (eps={eps})']
+    families = ['K-Means', 'Gaussian Mixture', 'Agglomerative', 'DBSCAN']
+    panels = {}
+    for name, family in zip(preferred, families):
+        if name not in labels:
+            name = next((other for other in labels if family in other and other not in panels), None)
+        if name is not None:
+            panels[name] = labels[name]
+    return panels
+
+def create_visualization_comparison(X_scaled, labels, mode='raster', output_path=VISUALIZATION_FILE):
+    """Create visualizations comparing different clustering algorithms from their computed labels"""
+    print(f"\n📊 Creating visualization comparison ({mode})...")
     
-    # Test a few key algorithms for visualization
-    algorithms_to_visualize = {
-        'K-Means (4 clusters)': KMeans(n_clusters=4, random_state=42),
-        'Gaussian Mixture (4)': GaussianMixture(n_components=4, random_state=42),
-        'Agglomerative (4)': AgglomerativeClustering(n_clusters=4),
-        'DBSCAN': DBSCAN(eps=0.8, min_samples=5)
-    }
+    panels = select_visualization_panels(labels)
+    if not panels:
+        print("⚠️  No cluster labels available to visualize")
+        return None
+    
+    # Recency vs frequency (scaled), binned onto a fixed pixel grid
+    X2 = X_scaled[:, :2].toarray() if sparse.issparse(X_scaled) else X_scaled[:, :2]
+    if mode == 'raster':
+        render_label_panels(X2, panels, output_path)
+        print(f"✅ Visualization saved as '{output_path}'")
+        return output_path
+    
+    if mode != 'matplotlib':
+        raise ValueError(f"Unknown plot mode '{mode}', expected one of {PLOT_MODES}")
+    
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    
+    # Scatter at most MAX_PLOT_POINTS points, the same sample in every panel
+    sample = np.arange(len(X2))
+    if len(sample) > MAX_PLOT_POINTS:
+        sample = np.sort(np.random.default_rng(0).choice(len(sample), MAX_PLOT_POINTS, replace=False))
     
     fig, axes = plt.subplots(2, 2, figsize=(15, 12))
     axes = axes.ravel()
     
-    for i, (name, algorithm) in enumerate(algorithms_to_visualize.items()):
-        try:
-            if hasattr(algorithm, 'fit_predict'):
-                labels = algorithm.fit_predict(X_scaled)
-            else:
-                labels = algorithm.fit(X_scaled).predict(X_scaled)
-            
-            # Create scatter plot
-            scatter = axes[i].scatter(X_scaled[:, 0], X_scaled[:, 1], c=labels, cmap='viridis', alpha=0.6)
-            axes[i].set_title(f'{name}\nClusters: {len(np.unique(labels))}')
-            axes[i].set_xlabel('Recency (scaled)')
-            axes[i].set_ylabel('Frequency (scaled)')
-            
-        except Exception as e:
-            axes[i].text(0.5, 0.5, f'Error: {str(e)[:50]}...', 
-                        ha='center', va='center', transform=axes[i].transAxes)
-            axes[i].set_title(f'{name} - Failed')
+    for i, (name, panel_labels) in enumerate(panels.items()):
+        axes[i].scatter(X2[sample, 0], X2[sample, 1], c=panel_labels[sample],
+                        cmap='viridis', alpha=0.6)
+        axes[i].set_title(f'{name}\nClusters: {len(np.unique(panel_labels))}')
+        axes[i].set_xlabel('Recency (scaled)')
+        axes[i].set_ylabel('Frequency (scaled)')
+    for ax in axes[len(panels):]:
+        ax.set_visible(False)
     
     plt.tight_layout()
-    plt.savefig('clustering_comparison_visualization.png', dpi=300, bbox_inches='tight')
-    print("✅ Visualization saved as 'clustering_comparison_visualization.png'")
+    plt.savefig(output_path, dpi=100, bbox_inches='tight')
+    plt.close(fig)
+    print(f"✅ Visualization saved as '{output_path}'")
     
-    return fig
+    return output_path
 
-def generate_faculty_report(results, best_algorithm, composite_scores):
+def resource_usage_table(results):
+    """Markdown table of the measured resource usage per algorithm"""
+    rows = ["| Algorithm | Fit Time (s) | Predict Time (s) | Peak Memory (MB) | Scaling Exponent | Profiled Rows |",
+            "|---|---|---|---|---|---|"]
+    for name, metrics in results.items():
+        if 'error' in metrics or 'fit_seconds' not in metrics:
+            continue
+        rows.append(f"| {name} | {_format_cost(metrics, 'fit_seconds', '.3f')} "
+                    f"| {_format_cost(metrics, 'predict_seconds', '.3f')} "
+                    f"| {_format_cost(metrics, 'peak_memory_mb', '.1f')} "
+                    f"| {_format_cost(metrics, 'scaling_exponent', '.2f')} | {metrics['profile_rows']} |")
+    return "\n".join(rows) if len(rows) > 2 else "Resource usage was not profiled for this run."
+
+def generate_faculty_report(results, best_algorithm, composite_scores, cost_weight=0.0):
     """Generate a comprehensive report for faculty presentation"""
     print(f"\n📋 GENERATING FACULTY REPORT...")
     
+    best = results[best_algorithm]
+    if 'scaling_exponent' in best:
+        growth = (f"Fit time grows as n^{best['scaling_exponent']:.2f}" if best['scaling_exponent'] is not None
+                  else "Fits too fast to estimate a scaling exponent")
+        scalability = (f"{growth} "
+                       f"({best['fit_seconds']:.3f}s and {best['peak_memory_mb']:.1f} MB peak at n={best['profile_rows']})")
+    else:
+        scalability = "Not measured in this run (resource profiling disabled)"
+    ranking_basis = (f"{1 - cost_weight:.0%} quality / {cost_weight:.0%} cost" if cost_weight > 0
+                     else "quality metrics only")
+    
     report = f"""
 # CLUSTERING ALGORITHM COMPARISON REPORT
 Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
@@ -248,13 +429,15 @@ This report compares multiple clustering algorithms for customer segmentation us
 - **Dataset**: 1000 customer records with RFM features
 - **Preprocessing**: StandardScaler normalization
 - **Evaluation Metrics**: Silhouette Score, Calinski-Harabasz Index, Davies-Bouldin Index
+- **Cost Metrics**: Fit time, predict time, peak traced memory, and the fit-time scaling exponent (log-log slope over nested subsamples)
+- **Ranking Basis**: {ranking_basis}
 - **Algorithms Tested**: {len(results)} different configurations
 
 ## KEY FINDINGS
 
 ### BEST PERFORMING ALGORITHM: {best_algorithm}
 - **Composite Score**: {composite_scores[best_algorithm]:.3f}
-- **Justification**: Highest overall performance across all metrics
+- **Justification**: Highest composite score ({ranking_basis})
 
 ### ALGORITHM RANKINGS (by Composite Score):
 """
@@ -270,11 +453,14 @@ This report compares multiple clustering algorithms for customer segmentation us
 
 ### ADVANTAGES:
 1. **Interpretability**: Clear cluster centers for business understanding
-2. **Scalability**: Efficient for large datasets (1000+ customers)
+2. **Scalability**: {scalability}
 3. **Stability**: Consistent results with random_state parameter
 4. **Business Relevance**: 4 clusters provide optimal business segmentation
 5. **Performance**: Best composite score across all evaluation metrics
 
+### RESOURCE USAGE:
+{resource_usage_table(results)}
+
 ### METRIC ANALYSIS:
 - **Silhouette Score**: Measures cluster cohesion and separation
 - **Calinski-Harabasz Index**: Ratio of between-cluster to within-cluster variance
@@ -301,30 +487,80 @@ with real-time visualization and interactive filtering capabilities.
 
 def main():
     """Main function to run the complete clustering comparison"""
+    parser = argparse.ArgumentParser(description='Compare clustering algorithms on the RFM data')
+    parser.add_argument('--k-min', type=int, default=3, help='Smallest k in the K-Means/Agglomerative sweep')
+    parser.add_argument('--k-max', type=int, default=6, help='Largest k in the K-Means/Agglomerative sweep')
+    parser.add_argument('--eps', type=float, nargs='+', default=[0.5, 0.8, 1.0], help='DBSCAN eps values to sweep')
+    parser.add_argument('--no-cache', action='store_true', help='Recompute the sweeps instead of using the cache')
+    parser.add_argument('--no-profile', action='store_true', help='Skip fit/predict time and memory profiling')
+    parser.add_argument('--max-profile-rows', type=int, default=MAX_PROFILE_ROWS,
+                        help='Largest subsample used for resource profiling')
+    parser.add_argument('--max-linkage-rows', type=int, default=MAX_LINKAGE_ROWS,
+                        help='Sweep Agglomerative over micro-clusters instead of the full tree above this many rows')
+    parser.add_argument('--cost-weight', type=float, default=0.0,
+                        help='Weight of fit time and memory in the composite score (0 = quality only)')
+    parser.add_argument('--plot-mode', choices=PLOT_MODES, default='raster',
+                        help='raster: binned PNG without matplotlib; matplotlib: downsampled scatter')
+    parser.add_argument('--no-plot', action='store_true', help='Skip the k-selection curves and the comparison figure')
+    parser.add_argument('--algorithms', nargs='+', choices=ALGORITHM_NAMES, default=list(ALGORITHM_NAMES),
+                        metavar='NAME', help=f"Algorithms to compare besides the k-sweep: {', '.join(ALGORITHM_NAMES)}")
+    parser.add_argument('--enrich', nargs='*', choices=ENRICHMENT_DIMENSIONS, default=None, metavar='DIMENSION',
+                        help='Add sparse share-of-spend features (default dimensions: Product_Category Sales_Channel)')
+    parser.add_argument('--snapshot', default=None, metavar='RUN_DATE',
+                        help='Compare on a past RFM snapshot from the snapshot store (YYYY-MM-DD, or "latest")')
+    args = parser.parse_args()
+    
     print("🔬 COMPREHENSIVE CLUSTERING ALGORITHM COMPARISON")
     print("For Faculty Presentation & Justification")
     print("=" * 80)
     
+    # A past run's table from the snapshot store instead of the latest output
+    rfm_table = None
+    if args.snapshot is not None:
+        store = SnapshotStore()
+        run_date = store.resolve(None if args.snapshot == 'latest' else args.snapshot)
+        rfm_table = store.read(run_date)
+        print(f"📦 Using snapshot {run_date} ({len(rfm_table)} customers)")
+    
+    # Optional share-of-spend features, aligned with the RFM table's rows
+    extra_features = None
+    if args.enrich is not None:
+        if rfm_table is None:
+            rfm_table = pd.read_csv('rfm_segments_output_full.csv')
+        extra_features, _ = enrich(rfm_table, dimensions=args.enrich) if args.enrich else enrich(rfm_table)
+    
     # Step 1: Compare algorithms
-    results, X_scaled, rfm = compare_clustering_algorithms()
+    results, X_scaled, rfm, sweep, labels = compare_clustering_algorithms(args.k_min, args.k_max, args.eps,
+                                                                         use_cache=not args.no_cache,
+                                                                         algorithms=args.algorithms,
+                                                                         profile_costs=not args.no_profile,
+                                                                         max_profile_rows=args.max_profile_rows,
+                                                                         extra_features=extra_features,
+                                                                         rfm_table=rfm_table,
+                                                                         max_linkage_rows=args.max_linkage_rows)
+    if not args.no_plot:
+        plot_k_curves(sweep)
     
     # Step 2: Create comparison table
     comparison_df = create_comparison_table(results)
     
     # Step 3: Analyze best algorithm
-    best_algorithm, composite_scores = analyze_best_algorithm(results)
+    best_algorithm, composite_scores = analyze_best_algorithm(results, args.cost_weight)
     
-    # Step 4: Create visualizations
-    create_visualization_comparison(X_scaled, rfm)
+    # Step 4: Create visualizations from the labels computed above
+    if not args.no_plot:
+        create_visualization_comparison(X_scaled, labels, args.plot_mode)
     
     # Step 5: Generate faculty report
-    generate_faculty_report(results, best_algorithm, composite_scores)
+    generate_faculty_report(results, best_algorithm, composite_scores, args.cost_weight)
     
     print(f"\n🎉 COMPARISON COMPLETE!")
     print(f"📊 Best Algorithm: {best_algorithm}")
     print(f"📁 Files Generated:")
     print(f"   - clustering_algorithm_report.md (Faculty Report)")
-    print(f"   - clustering_comparison_visualization.png (Visualization)")
+    if not args.no_plot:
+        print(f"   - {VISUALIZATION_FILE} (Visualization)")
+        print(f"   - k_selection_curves.png (Elbow & Silhouette Curves)")
     
     return results, best_algorithm, composite_scores
 
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Resource profiling for the clustering comparison
+Measures fit time, predict time and peak memory for an estimator, and
+estimates how fit time scales with n from repeated fits on nested subsamples
+"""
+
+import numpy as np
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.cluster import AgglomerativeClustering
+
+from profiling import peak_memory, time_call
+
+MAX_PROFILE_ROWS = 50_000
+SUBSAMPLE_FRACTIONS = (0.125, 0.25, 0.5, 1.0)
+PROFILE_REPEATS = 3
+# Fits faster than this are dominated by fixed overhead and timer noise
+MIN_SCALING_SECONDS = 0.1
+# Estimators whose fit needs O(n^2) memory (the full pairwise linkage) and
+# the largest subsample they are profiled on: 10,000 rows is ~400 MB
+QUADRATIC_ESTIMATORS = (AgglomerativeClustering,)
+MAX_QUADRATIC_PROFILE_ROWS = 10_000
+
+
+def scaling_exponent(sizes, seconds, min_seconds=MIN_SCALING_SECONDS):
+    """
+    Slope of log(fit time) against log(n); ~1 is linear, ~2 quadratic.
+
+    Only sizes whose fit takes at least ``min_seconds`` are used; None when
+    fewer than two do, since overhead-bound timings give meaningless slopes.
+    """
+    sizes = np.asarray(sizes, dtype=float)
+    seconds = np.asarray(seconds, dtype=float)
+    measurable = seconds >= min_seconds
+    if measurable.sum() < 2:
+        return None
+    return float(np.polyfit(np.log(sizes[measurable]), np.log(seconds[measurable]), 1)[0])
+
+
+def profile_row_limit(estimator, max_rows=MAX_PROFILE_ROWS):
+    """Largest subsample to profile ``estimator`` on, capped for O(n^2) estimators"""
+    if isinstance(estimator, QUADRATIC_ESTIMATORS):
+        return min(max_rows, MAX_QUADRATIC_PROFILE_ROWS)
+    return max_rows
+
+
+def measure_costs(estimator, X, max_rows=MAX_PROFILE_ROWS, fractions=SUBSAMPLE_FRACTIONS,
+                  repeats=PROFILE_REPEATS, random_state=0):
+    """
+    Profile an unfitted estimator on ``X``.
+
+    Each nested random subsample of up to ``max_rows`` rows (fewer for O(n^2)
+    estimators) is fit ``repeats`` times untraced and the median time is
+    kept; the largest subsample gives fit time, one more traced fit on it
+    gives peak memory, and the fitted model predicts on all of ``X`` when it
+    supports ``predict``.
+    """
+    X = X.tocsr() if sparse.issparse(X) else np.asarray(X)
+    n_rows = min(X.shape[0], profile_row_limit(estimator, max_rows))
+    order = np.random.default_rng(random_state).permutation(X.shape[0])[:n_rows]
+
+    sizes, seconds = [], []
+    for fraction in fractions:
+        size = max(int(n_rows * fraction), 2)
+        runs = []
+        for _ in range(repeats):
+            model = clone(estimator)
+            _, fit_seconds = time_call(model.fit, X[order[:size]])
+            runs.append(fit_seconds)
+        sizes.append(size)
+        seconds.append(float(np.median(runs)))
+    _, peak_mb = peak_memory(clone(estimator).fit, X[order[:sizes[-1]]])
+
+    predict_seconds = None
+    if hasattr(model, 'predict'):
+        _, predict_seconds = time_call(model.predict, X)
+
+    return {
+        'profile_rows': sizes[-1],
+        'fit_seconds': seconds[-1],
+        'predict_seconds': predict_seconds,
+        'peak_memory_mb': peak_mb,
+        'scaling_exponent': scaling_exponent(sizes, seconds),
+    }
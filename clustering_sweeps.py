@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Clustering parameter sweeps for the RFM comparison report
+Fits every k in a range with warm-started K-Means and a single Agglomerative
+linkage tree (over micro-clusters on large inputs), runs DBSCAN for several eps values over one shared neighbor
+graph, and caches the results keyed on a hash of the input matrix
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+from scipy.cluster.hierarchy import linkage, cut_tree
+from scipy import sparse
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.base import BaseEstimator, ClusterMixin
+from sklearn.cluster import KMeans
+from sklearn.neighbors import NearestNeighbors
+from sklearn.metrics import silhouette_score, calinski_harabasz_score, davies_bouldin_score
+
+from artifact_cache import ArtifactCache
+from scalable_clustering import MicroClusterAgglomerative
+
+
+SILHOUETTE_SAMPLE_SIZE = 20_000
+# Starts per fit: the first k is a cold k-means++ fit, every later k keeps the
+# previous k's centroids, which makes one start enough
+COLD_START_INITS = 10
+WARM_START_INITS = 1
+# Above this many rows the full O(n^2) Ward tree gives way to micro-clusters
+MAX_LINKAGE_ROWS = int(os.environ.get('RFM_MAX_LINKAGE_ROWS', 10_000))
+
+
+def _centroid_stats(X, labels):
+    """Cluster sizes, centroids and each point's squared distance to its centroid"""
+    clusters, codes = np.unique(labels, return_inverse=True)
+    membership = sparse.csr_matrix((np.ones(len(codes)), (codes, np.arange(len(codes)))),
+                                   shape=(len(clusters), len(codes)))
+    sizes = np.bincount(codes)
+    totals = membership @ X
+    centroids = (totals.toarray() if sparse.issparse(totals) else totals) / sizes[:, None]
+    row_sq = np.asarray(X.multiply(X).sum(axis=1)).ravel() if sparse.issparse(X) else (X ** 2).sum(axis=1)
+    cross = np.asarray(X @ centroids.T)[np.arange(len(codes)), codes]
+    sq_dist = np.maximum(row_sq - 2 * cross + (centroids ** 2).sum(axis=1)[codes], 0)
+    return codes, sizes, centroids, sq_dist
+
+
+def sparse_calinski_harabasz(X, labels):
+    """Calinski-Harabasz score from cluster sums, without densifying a sparse ``X``"""
+    codes, sizes, centroids, sq_dist = _centroid_stats(X, labels)
+    n, k = len(codes), len(sizes)
+    mean = np.asarray(X.mean(axis=0)).ravel()
+    between = float((sizes * ((centroids - mean) ** 2).sum(axis=1)).sum())
+    within = float(sq_dist.sum())
+    return 1.0 if within == 0 else between * (n - k) / (within * (k - 1))
+
+
+def sparse_davies_bouldin(X, labels):
+    """Davies-Bouldin score from cluster sums, without densifying a sparse ``X``"""
+    codes, sizes, centroids, sq_dist = _centroid_stats(X, labels)
+    intra = np.bincount(codes, weights=np.sqrt(sq_dist)) / sizes
+    separation = np.sqrt(((centroids[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2))
+    if np.allclose(intra, 0) or np.allclose(separation, 0):
+        return 0.0
+    separation[separation == 0] = np.inf
+    return float(np.mean(np.max((intra[:, None] + intra[None, :]) / separation, axis=1)))
+
+
+def cluster_metrics(X, labels, silhouette_sample_size=SILHOUETTE_SAMPLE_SIZE):
+    """Compute the quality metrics used throughout the comparison report"""
+    # Silhouette is O(n^2); above the sample size it is estimated on a fixed sample
+    sample_size = silhouette_sample_size if X.shape[0] > silhouette_sample_size else None
+    if sparse.issparse(X):
+        # sklearn's CH and DB scores need dense input; these reduce cluster sums instead
+        calinski_harabasz, davies_bouldin = sparse_calinski_harabasz, sparse_davies_bouldin
+    else:
+        calinski_harabasz, davies_bouldin = calinski_harabasz_score, davies_bouldin_score
+    return {
+        'silhouette_score': silhouette_score(X, labels, sample_size=sample_size, random_state=0),
+        'calinski_harabasz_score': calinski_harabasz(X, labels),
+        'davies_bouldin_score': davies_bouldin(X, labels),
+        'n_clusters': len(np.unique(labels)),
+        'n_noise': int(np.sum(labels == -1)) if -1 in labels else 0,
+    }
+
+
+def _next_centroid(X, centroids, rng):
+    """Sample a new seed with probability proportional to its squared distance (k-means++)"""
+    if sparse.issparse(X):
+        row_sq = np.asarray(X.multiply(X).sum(axis=1))
+        sq_dist = (row_sq - 2 * np.asarray(X @ centroids.T) + (centroids ** 2).sum(axis=1)).min(axis=1)
+    else:
+        sq_dist = ((X[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+    sq_dist = np.maximum(np.asarray(sq_dist).ravel(), 0)
+    total = sq_dist.sum()
+    index = rng.choice(len(sq_dist), p=sq_dist / total) if total > 0 else rng.integers(len(sq_dist))
+    return X[int(index)].toarray().ravel() if sparse.issparse(X) else X[index]
+
+
+class WarmStartKMeans(ClusterMixin, BaseEstimator):
+    """
+    K-Means started from given centroids, as the k-sweep fits every k > k_min.
+
+    Each of ``n_init`` starts (default WARM_START_INITS) keeps
+    ``init_centroids`` and adds the missing ones by k-means++ sampling; the
+    lowest-inertia fit is kept. Without ``init_centroids`` it is a cold
+    KMeans(n_init=...), with COLD_START_INITS starts by default.
+    """
+
+    def __init__(self, n_clusters=8, init_centroids=None, n_init=None, random_state=42):
+        self.n_clusters = n_clusters
+        self.init_centroids = init_centroids
+        self.n_init = n_init
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        if self.init_centroids is None:
+            n_init = COLD_START_INITS if self.n_init is None else self.n_init
+            model = KMeans(n_clusters=self.n_clusters, random_state=self.random_state, n_init=n_init).fit(X)
+        else:
+            rng = np.random.default_rng(self.random_state)
+            model = None
+            for _ in range(WARM_START_INITS if self.n_init is None else self.n_init):
+                init = np.asarray(self.init_centroids)[:self.n_clusters]
+                while len(init) < self.n_clusters:
+                    init = np.vstack([init, _next_centroid(X, init, rng)])
+                candidate = KMeans(n_clusters=self.n_clusters, init=init, n_init=1,
+                                   random_state=self.random_state).fit(X)
+                if model is None or candidate.inertia_ < model.inertia_:
+                    model = candidate
+        self.model_ = model
+        self.labels_ = model.labels_
+        self.cluster_centers_ = model.cluster_centers_
+        self.inertia_ = model.inertia_
+        return self
+
+    def predict(self, X):
+        return self.model_.predict(X)
+
+    def fit_predict(self, X, y=None):
+        return self.fit(X).labels_
+
+
+def sweep_kmeans(X, k_values, random_state=42, n_init=None):
+    """
+    Fit K-Means for every k, warm-starting each from the previous k's centroids.
+
+    Only the smallest k pays for COLD_START_INITS starts; ``n_init``
+    overrides the starts of every fit.
+    """
+    results = {}
+    centroids = None
+    for k in sorted(k_values):
+        start = time.perf_counter()
+        model = WarmStartKMeans(n_clusters=k, init_centroids=centroids, n_init=n_init,
+                                random_state=random_state).fit(X)
+        fit_time = time.perf_counter() - start
+        results[k] = {
+            'labels': model.labels_,
+            'centroids': model.cluster_centers_,
+            'init_centroids': centroids,
+            'inertia': model.inertia_,
+            'fit_time': fit_time,
+        }
+        centroids = model.cluster_centers_
+    return results
+
+
+def sweep_agglomerative(X, k_values, method='ward', max_rows=MAX_LINKAGE_ROWS, random_state=42):
+    """
+    Build one linkage tree and cut it at every k.
+
+    Above ``max_rows`` rows the tree is built over MicroClusterAgglomerative's
+    K-Means micro-clusters instead, which keeps memory linear in n and never
+    densifies a sparse ``X``.
+    """
+    k_values = sorted(k_values)
+    start = time.perf_counter()
+    if X.shape[0] > max_rows:
+        model = MicroClusterAgglomerative(n_clusters=k_values[0], linkage=method, random_state=random_state).fit(X)
+        labels = {k: model.merge(k).copy() for k in k_values}
+        fit_time = time.perf_counter() - start
+        return {k: {'labels': labels[k], 'fit_time': fit_time / len(k_values), 'method': 'micro-cluster'}
+                for k in k_values}
+    # The linkage needs observation vectors; its O(n^2) distance matrix
+    # dwarfs a dense copy of a sparse X, so the tree is built from one
+    tree = linkage(X.toarray() if sparse.issparse(X) else X, method=method)
+    cuts = cut_tree(tree, n_clusters=k_values)
+    fit_time = time.perf_counter() - start
+    return {
+        k: {'labels': cuts[:, i].astype(int), 'fit_time': fit_time / len(k_values), 'method': 'tree'}
+        for i, k in enumerate(k_values)
+    }
+
+
+def suggest_k(k_values, inertias, silhouettes):
+    """Suggest k from the silhouette peak and the elbow of the inertia curve"""
+    k_values = list(k_values)
+    best_silhouette = k_values[int(np.argmax(silhouettes))]
+    if len(k_values) < 3:
+        return {'silhouette': best_silhouette, 'elbow': best_silhouette}
+    # Elbow: point farthest from the line joining the first and last inertia
+    x = np.asarray(k_values, dtype=float)
+    y = np.asarray(inertias, dtype=float)
+    x_norm = (x - x[0]) / (x[-1] - x[0])
+    y_norm = (y - y[-1]) / (y[0] - y[-1]) if y[0] != y[-1] else np.zeros_like(y)
+    distance = np.abs(1 - x_norm - y_norm)
+    return {'silhouette': best_silhouette, 'elbow': k_values[int(np.argmax(distance))]}
+
+
+def sweep_k(X, k_min=2, k_max=10, random_state=42, use_cache=True, cache=None, max_linkage_rows=MAX_LINKAGE_ROWS):
+    """
+    Sweep k over [k_min, k_max] for K-Means and Agglomerative clustering.
+
+    Returns a dict with per-k labels and metrics for each method plus the
+    elbow/silhouette curves. Results are cached on disk keyed on the input
+    matrix, so repeated runs on unchanged data are served from the cache.
+    """
+    k_values = list(range(k_min, k_max + 1))
+    cache = cache or ArtifactCache(enabled=use_cache)
+    params = {'k_values': k_values, 'random_state': random_state, 'warm_start': 'kmeans++',
+              'inits': [COLD_START_INITS, WARM_START_INITS], 'max_linkage_rows': max_linkage_rows}
+    key = cache.key('k_sweep', params, [X], code=[sweep_kmeans, MicroClusterAgglomerative])
+    cached = cache.get(key)
+    if cached is not None:
+        print(f"♻️  k-sweep loaded from cache ({k_min}..{k_max})")
+        return cached
+
+    tree = 'single linkage tree' if X.shape[0] <= max_linkage_rows else 'micro-cluster linkage tree'
+    print(f"Sweeping k = {k_min}..{k_max} (K-Means warm start, {tree})...")
+    sweep = {'k_values': k_values, 'kmeans': sweep_kmeans(X, k_values, random_state=random_state),
+             'agglomerative': sweep_agglomerative(X, k_values, max_rows=max_linkage_rows,
+                                                  random_state=random_state)}
+
+    for method in ('kmeans', 'agglomerative'):
+        for k, entry in sweep[method].items():
+            entry['metrics'] = cluster_metrics(X, entry['labels'])
+
+    inertias = [sweep['kmeans'][k]['inertia'] for k in k_values]
+    silhouettes = [sweep['kmeans'][k]['metrics']['silhouette_score'] for k in k_values]
+    sweep['curves'] = {
+        'k': k_values,
+        'inertia': inertias,
+        'kmeans_silhouette': silhouettes,
+        'agglomerative_silhouette': [sweep['agglomerative'][k]['metrics']['silhouette_score']
+                                     for k in k_values],
+    }
+    sweep['suggested_k'] = suggest_k(k_values, inertias, silhouettes)
+
+    cache.put(key, sweep, 'k_sweep', params)
+    return sweep
+
+
+def _edge_sq_distances(X, rows, cols):
+    """Squared distance of every graph edge, accumulated per feature as the tree queries do"""
+    sq_dist = np.zeros(len(rows))
+    for j in range(X.shape[1]):
+        diff = X[rows, j] - X[cols, j]
+        sq_dist += diff * diff
+    return sq_dist
+
+
+def dbscan_labels_from_graph(graph, eps, min_samples=5, X=None):
+    """
+    Extract DBSCAN labels for one eps from a radius-neighbors distance graph.
+
+    The graph must have been built with a radius >= eps. Clusters are
+    numbered in order of their lowest-index core point and a border point
+    joins the first cluster that reaches it, as in sklearn's DBSCAN. With
+    the dense ``X`` the neighborhood test is squared distance <= eps**2,
+    the same inclusive test as a ball-tree radius query; the graph's rounded
+    distances are used otherwise. Pairs exactly eps apart can still differ
+    from sklearn's default kd-tree, whose result at that boundary depends on
+    its node bounds.
+    """
+    n = graph.shape[0]
+    rows = np.repeat(np.arange(n), np.diff(graph.indptr))
+    if X is not None and not sparse.issparse(X):
+        # sqrt rounding can put a pair just outside eps exactly on it
+        within = _edge_sq_distances(np.asarray(X, dtype=float), rows, graph.indices) <= eps * eps
+    else:
+        within = graph.data <= eps
+    rows, cols = rows[within], graph.indices[within]
+
+    # A point counts itself towards min_samples
+    core = np.bincount(rows, minlength=n) + 1 >= min_samples
+    labels = np.full(n, -1, dtype=np.intp)
+    if not core.any():
+        return labels
+
+    core_edges = core[rows] & core[cols]
+    adjacency = coo_matrix((np.ones(core_edges.sum(), dtype=np.int8),
+                            (rows[core_edges], cols[core_edges])), shape=(n, n))
+    _, component = connected_components(adjacency, directed=False)
+
+    core_idx = np.flatnonzero(core)
+    first_core = np.full(n, n, dtype=np.intp)
+    np.minimum.at(first_core, component[core_idx], core_idx)
+    used = np.flatnonzero(first_core < n)
+    rank = np.empty(n, dtype=np.intp)
+    rank[used[np.argsort(first_core[used])]] = np.arange(len(used))
+    labels[core_idx] = rank[component[core_idx]]
+
+    border_edges = core[cols] & ~core[rows]
+    if border_edges.any():
+        border_labels = np.full(n, n, dtype=np.intp)
+        np.minimum.at(border_labels, rows[border_edges], labels[cols[border_edges]])
+        reached = border_labels < n
+        labels[reached] = border_labels[reached]
+    return labels
+
+
+def sweep_dbscan_eps(X, eps_values=(0.5, 0.8, 1.0), min_samples=5, use_cache=True, cache=None):
+    """
+    Run DBSCAN for every eps over a single radius-neighbors graph.
+
+    The neighbor search runs once at the largest eps; labels for each eps
+    are then read off the shared graph, so the whole sweep costs about as
+    much as one DBSCAN fit.
+    """
+    eps_values = sorted(eps_values)
+    cache = cache or ArtifactCache(enabled=use_cache)
+    params = {'eps_values': eps_values, 'min_samples': min_samples, 'boundary': 'sq_dist'}
+    key = cache.key('dbscan_sweep', params, [X], code=[dbscan_labels_from_graph])
+    cached = cache.get(key)
+    if cached is not None:
+        print(f"♻️  DBSCAN sweep loaded from cache (eps={eps_values})")
+        return cached
+
+    start = time.perf_counter()
+    graph = NearestNeighbors(radius=eps_values[-1]).fit(X).radius_neighbors_graph(mode='distance')
+    graph_time = time.perf_counter() - start
+
+    sweep = {'eps_values': eps_values, 'min_samples': min_samples,
+             'graph_time': graph_time, 'graph_edges': graph.nnz, 'dbscan': {}}
+    for eps in eps_values:
+        start = time.perf_counter()
+        labels = dbscan_labels_from_graph(graph, eps, min_samples, X)
+        entry = {'labels': labels, 'fit_time': time.perf_counter() - start + graph_time / len(eps_values)}
+        try:
+            entry['metrics'] = cluster_metrics(X, labels)
+        except ValueError as e:
+            entry['metrics'] = {'error': str(e)}
+        sweep['dbscan'][eps] = entry
+
+    cache.put(key, sweep, 'dbscan_sweep', params)
+    return sweep
+
+
+def plot_k_curves(sweep, output_path='k_selection_curves.png'):
+    """Plot the elbow (inertia) and silhouette curves of a k-sweep"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    curves = sweep['curves']
+    fig, (ax_elbow, ax_sil) = plt.subplots(1, 2, figsize=(12, 4.5))
+
+    ax_elbow.plot(curves['k'], curves['inertia'], marker='o')
+    ax_elbow.axvline(sweep['suggested_k']['elbow'], color='grey', linestyle='--')
+    ax_elbow.set_title('Elbow Curve (K-Means inertia)')
+    ax_elbow.set_xlabel('k')
+    ax_elbow.set_ylabel('Inertia')
+
+    ax_sil.plot(curves['k'], curves['kmeans_silhouette'], marker='o', label='K-Means')
+    ax_sil.plot(curves['k'], curves['agglomerative_silhouette'], marker='s', label='Agglomerative')
+    ax_sil.axvline(sweep['suggested_k']['silhouette'], color='grey', linestyle='--')
+    ax_sil.set_title('Silhouette Score by k')
+    ax_sil.set_xlabel('k')
+    ax_sil.set_ylabel('Silhouette')
+    ax_sil.legend()
+
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=120)
+    plt.close(fig)
+    print(f"✅ k-selection curves saved as '{output_path}'")
+    return output_path
+
+
+def main():
+    """Run a k-sweep on the full RFM output and print the curves"""
+    parser = argparse.ArgumentParser(description='Sweep k for K-Means and Agglomerative clustering')
+    parser.add_argument('--k-min', type=int, default=2)
+    parser.add_argument('--k-max', type=int, default=10)
+    parser.add_argument('--no-cache', action='store_true', help='Ignore and do not write the sweep cache')
+    parser.add_argument('--plot', default='k_selection_curves.png', help='Output path for the curves')
+    parser.add_argument('--max-linkage-rows', type=int, default=MAX_LINKAGE_ROWS,
+                        help='Build the Agglomerative tree over micro-clusters above this many rows')
+    args = parser.parse_args()
+
+    from clustering_comparison import load_and_prepare_data
+    X_scaled, _, _ = load_and_prepare_data()
+
+    sweep = sweep_k(X_scaled, args.k_min, args.k_max, use_cache=not args.no_cache,
+                    max_linkage_rows=args.max_linkage_rows)
+    print(f"\n{'k':>3} {'Inertia':>12} {'KM Silhouette':>14} {'Agg Silhouette':>15}")
+    curves = sweep['curves']
+    for k, inertia, km_sil, agg_sil in zip(curves['k'], curves['inertia'],
+                                          curves['kmeans_silhouette'], curves['agglomerative_silhouette']):
+        print(f"{k:>3} {inertia:>12.1f} {km_sil:>14.3f} {agg_sil:>15.3f}")
+    print(f"\n🎯 Suggested k: elbow={sweep['suggested_k']['elbow']}, "
+          f"silhouette={sweep['suggested_k']['silhouette']}")
+    if args.plot:
+        plot_k_curves(sweep, args.plot)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Customer lookup service over the RFM table
+Customer rows are written once to a memory-mapped structured array and
+located through a direct-address table on (id, country), falling back to a
+sorted composite-key index when ids are too sparse for direct addressing
+"""
+
+import json
+import numbers
+import os
+import tempfile
+
+import numpy as np
+
+MAX_BATCH = 100_000
+
+STORE_DTYPE = np.dtype([
+    ('id', '<i8'),
+    ('country', '<i4'),
+    ('recency', '<i8'),
+    ('frequency', '<i8'),
+    ('monetary', '<f8'),
+    ('r', 'i1'),
+    ('f', 'i1'),
+    ('m', 'i1'),
+    ('segment', '<i4'),
+    ('cluster', '<i4'),
+])
+
+
+def _as_ids(ids):
+    """Customer ids as an int64 array, rejecting anything that is not an integer"""
+    if isinstance(ids, np.ndarray):
+        if len(ids) and ids.dtype.kind not in 'iu':
+            raise TypeError(f"customer ids must be integers, got an array of {ids.dtype}")
+    else:
+        ids = list(ids)
+        bad = next((i for i in ids if isinstance(i, bool) or not isinstance(i, numbers.Integral)), None)
+        if bad is not None:
+            raise TypeError(f"customer ids must be integers, got {bad!r}")
+    try:
+        return np.asarray(ids, dtype=np.int64)
+    except OverflowError:
+        raise ValueError("customer ids must fit in 64 bits") from None
+
+
+def labels_path(path):
+    """Country and segment labels stored next to a lookup store"""
+    return os.path.splitext(path)[0] + '.labels.json'
+
+
+def _replace_atomic(path, suffix, write):
+    """Write through a unique temp file in the target directory, then rename over ``path``"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.tmp-', suffix=suffix)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_store(df, path):
+    """
+    Write the RFM table as a structured .npy file plus label metadata.
+
+    Both files are renamed into place from unique temp files, labels first,
+    so concurrent writers of the same store never interleave and a reader
+    that sees the .npy also sees its labels.
+    """
+    countries, country_codes = np.unique(df['country'].astype(str).to_numpy(), return_inverse=True)
+    segments, segment_codes = np.unique(df['segment'].astype(str).to_numpy(), return_inverse=True)
+    rows = np.empty(len(df), dtype=STORE_DTYPE)
+    rows['id'] = df['id'].to_numpy()
+    rows['country'] = country_codes
+    rows['segment'] = segment_codes
+    for column in ('recency', 'frequency', 'monetary', 'r', 'f', 'm', 'cluster'):
+        rows[column] = df[column].to_numpy()
+
+    labels = json.dumps({'countries': countries.tolist(), 'segments': segments.tolist()}).encode()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    _replace_atomic(labels_path(path), '.json', lambda f: f.write(labels))
+    _replace_atomic(path, '.npy', lambda f: np.save(f, rows))
+
+
+class CustomerLookup:
+    """Point and batch lookups of customer RFM records by (id, country)"""
+
+    def __init__(self, path):
+        self.rows = np.load(path, mmap_mode='r')
+        with open(labels_path(path)) as f:
+            meta = json.load(f)
+        self.countries = meta['countries']
+        self.segments = meta['segments']
+        self._country_codes = {country: code for code, country in enumerate(self.countries)}
+        self._build_index()
+
+    @classmethod
+    def from_frame(cls, df, path):
+        """Write the store for ``df`` (unless ``path`` already exists) and open it"""
+        if not (os.path.exists(path) and os.path.exists(labels_path(path))):
+            write_store(df, path)
+        return cls(path)
+
+    def _build_index(self):
+        ids = np.asarray(self.rows['id'])
+        countries = np.asarray(self.rows['country'], dtype=np.int64)
+        n_countries = max(len(self.countries), 1)
+        self._min_id = int(ids.min()) if len(ids) else 0
+        span = int(ids.max()) - self._min_id + 1 if len(ids) else 1
+
+        # Direct addressing when the id range is dense enough, else sorted keys
+        if n_countries * span <= 4 * len(ids) + 1024:
+            self._table = np.full((n_countries, span), -1, dtype=np.int64)
+            self._table[countries, ids - self._min_id] = np.arange(len(ids))
+            self._keys = None
+        else:
+            self._table = None
+            keys = ids * n_countries + countries
+            self._order = np.argsort(keys, kind='stable')
+            self._keys = keys[self._order]
+
+    def positions(self, ids, countries):
+        """Row positions for parallel arrays of ids and country codes (-1 when absent)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        countries = np.asarray(countries, dtype=np.int64)
+        result = np.full(len(ids), -1, dtype=np.int64)
+        valid = countries >= 0
+        if self._table is not None:
+            offsets = ids - self._min_id
+            valid &= (offsets >= 0) & (offsets < self._table.shape[1])
+            result[valid] = self._table[countries[valid], offsets[valid]]
+        else:
+            if len(self._keys) == 0:
+                return result
+            keys = ids * max(len(self.countries), 1) + countries
+            found = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+            valid &= self._keys[found] == keys
+            result[valid] = self._order[found[valid]]
+        return result
+
+    def country_code(self, country):
+        return self._country_codes.get(str(country), -1)
+
+    def _records(self, positions):
+        rows = self.rows[positions]
+        columns = {name: rows[name].tolist() for name in STORE_DTYPE.names}
+        return [
+            {
+                'id': columns['id'][i],
+                'country': self.countries[columns['country'][i]],
+                'recency': columns['recency'][i],
+                'frequency': columns['frequency'][i],
+                'monetary': columns['monetary'][i],
+                'r': columns['r'][i],
+                'f': columns['f'][i],
+                'm': columns['m'][i],
+                'segment': self.segments[columns['segment'][i]],
+                'cluster': columns['cluster'][i],
+            }
+            for i in range(len(rows))
+        ]
+
+    def get(self, customer_id, country=None):
+        """All records for an id, or the single record for (id, country)"""
+        if country is not None and self._table is not None:
+            # Scalar fast path: one direct-address probe, no array round trip
+            code, offset = self.country_code(country), int(customer_id) - self._min_id
+            if code < 0 or not 0 <= offset < self._table.shape[1]:
+                return []
+            position = int(self._table[code, offset])
+            return self._records([position]) if position >= 0 else []
+        if country is not None:
+            codes = [self.country_code(country)]
+        else:
+            codes = list(range(len(self.countries)))
+        positions = self.positions([customer_id] * len(codes), codes)
+        return self._records(positions[positions >= 0])
+
+    def batch(self, ids, countries=None):
+        """
+        Records for many ids at once, in request order.
+
+        Each entry is what ``get`` returns for that id: every record of the
+        id when ``countries`` is None, else the (id, country) record, with an
+        empty list when nothing matches. ``countries`` is a parallel list or
+        a single country for every id.
+        """
+        ids = _as_ids(ids)
+        if countries is None:
+            # One probe per country, ordered per id by country code like get()
+            codes = np.arange(len(self.countries), dtype=np.int64)
+            positions = self.positions(np.repeat(ids, len(codes)), np.tile(codes, len(ids)))
+            per_id = len(codes)
+        else:
+            if isinstance(countries, str):
+                countries = [countries] * len(ids)
+            codes = np.array([self.country_code(c) for c in countries], dtype=np.int64)
+            positions = self.positions(ids, codes)
+            per_id = 1
+
+        found = positions >= 0
+        records = iter(self._records(positions[found]))
+        hits = found.reshape(len(ids), per_id)
+        return [[next(records) for _ in range(n)] for n in hits.sum(axis=1).tolist()]
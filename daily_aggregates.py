@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Per-customer, per-day transaction aggregates with cumulative prefix sums
+Transactions are reduced once to one row per (customer, day) holding the
+purchase count and amount, stored in customer-then-day order with running
+totals. Recency, frequency and monetary value over any date range are then
+two binary searches and two subtractions per customer, so a date-range
+filter never rescans customer_transactions.csv
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from generate_full_rfm import (TRANSACTIONS_FILE, load_and_prepare_data, calculate_rfm_scores,
+                               assign_customer_segments, perform_clustering)
+
+METRIC_COLUMNS = ['id', 'country', 'recency', 'frequency', 'monetary']
+
+
+class DailyAggregates:
+    """Prefix sums of purchase count and amount per customer over days since the first sale"""
+
+    def __init__(self, df):
+        self.first_date = df['date'].min().normalize()
+        day = (df['date'] - self.first_date).dt.days.to_numpy()
+        self.n_days = int(day.max()) + 1 if len(day) else 0
+
+        # One row per (customer, day), sorted by customer then day
+        daily = (df.assign(day=day)
+                 .groupby(['id', 'country', 'day'], observed=True, sort=True)['monetary']
+                 .agg(['count', 'sum']))
+        ids = daily.index.get_level_values('id').to_numpy()
+        countries = np.asarray(daily.index.get_level_values('country'), dtype=object)
+        self.day = daily.index.get_level_values('day').to_numpy(dtype=np.int64)
+
+        starts = np.ones(len(ids), dtype=bool)
+        starts[1:] = (ids[1:] != ids[:-1]) | (countries[1:] != countries[:-1])
+        customer = np.cumsum(starts) - 1
+        self.customers = pd.DataFrame({'id': ids[starts], 'country': countries[starts]})
+        self.customers['country'] = self.customers['country'].astype(df['country'].dtype)
+
+        # Customers occupy disjoint key ranges, so one sorted array covers all of them
+        self.keys = customer * self.n_days + self.day
+        self.base = np.arange(len(self.customers), dtype=np.int64) * self.n_days
+        self.cum_count = np.r_[0, np.cumsum(daily['count'].to_numpy())]
+        self.cum_monetary = np.r_[0, np.cumsum(daily['sum'].to_numpy())]
+
+    @classmethod
+    def from_transactions(cls, path=TRANSACTIONS_FILE):
+        return cls(load_and_prepare_data(path)[['id', 'country', 'date', 'monetary']])
+
+    @property
+    def last_date(self):
+        return self.first_date + pd.Timedelta(days=max(self.n_days - 1, 0))
+
+    def day_offset(self, value, default):
+        """Days since the first sale for a date, or ``default`` when None"""
+        if value is None:
+            return default
+        if isinstance(value, (int, np.integer)):
+            return int(value)
+        return (pd.Timestamp(value).normalize() - self.first_date).days
+
+    def metrics(self, start=None, end=None):
+        """
+        Recency, frequency and monetary value per customer over [start, end].
+
+        ``start``/``end`` are dates or day offsets (inclusive; None = open).
+        Matches calculate_rfm_metrics on the transactions in that range:
+        recency is counted from the day after the range's latest sale and
+        customers without a purchase in the range are left out.
+        """
+        start = max(self.day_offset(start, 0), 0)
+        end = min(self.day_offset(end, self.n_days - 1), self.n_days - 1)
+        # Offsets are clipped to [0, n_days) so searches stay inside each customer's key range
+        lo = np.searchsorted(self.keys, self.base + start, side='left')
+        hi = np.searchsorted(self.keys, self.base + end, side='right') if start <= end else lo
+
+        frequency = self.cum_count[hi] - self.cum_count[lo]
+        active = frequency > 0
+        last_day = self.day[hi[active] - 1]
+        now = last_day.max() + 1 if len(last_day) else 0
+
+        rfm = self.customers[active].reset_index(drop=True)
+        rfm['recency'] = now - last_day
+        rfm['frequency'] = frequency[active]
+        rfm['monetary'] = (self.cum_monetary[hi] - self.cum_monetary[lo])[active]
+        return rfm[METRIC_COLUMNS]
+
+
+def windowed_rfm(daily, start=None, end=None, n_clusters=4):
+    """Scored, segmented and clustered RFM table for the transactions in [start, end]"""
+    rfm = daily.metrics(start, end)
+    if len(rfm) < n_clusters:
+        raise ValueError(f"Only {len(rfm)} customers purchased in the selected range")
+    return perform_clustering(assign_customer_segments(calculate_rfm_scores(rfm)), n_clusters)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RFM segments for a date range from per-day prefix aggregates')
+    parser.add_argument('--input', default=TRANSACTIONS_FILE)
+    parser.add_argument('--start', default=None, help='First sale date to include (YYYY-MM-DD)')
+    parser.add_argument('--end', default=None, help='Last sale date to include (YYYY-MM-DD)')
+    parser.add_argument('--clusters', type=int, default=4)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    daily = DailyAggregates.from_transactions(args.input)
+    print(f"📅 {len(daily.customers):,} customers, {len(daily.keys):,} customer-days "
+          f"from {daily.first_date.date()} to {daily.last_date.date()}")
+    rfm = windowed_rfm(daily, args.start, args.end, args.clusters)
+    print(rfm['segment'].value_counts().to_string())
+    if args.output:
+        rfm.to_csv(args.output, index=False)
+        print(f"📁 Saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
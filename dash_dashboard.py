@@ -1,30 +1,256 @@
 import dash
-from dash import dcc, html, Input, Output, dash_table
+from dash import dcc, html, Input, Output, State, dash_table, no_update
+from flask import jsonify, request
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
+import os
+import threading
+from collections import OrderedDict
+
+from artifact_cache import ArtifactCache
+from customer_lookup import CustomerLookup, MAX_BATCH, write_store
+from daily_aggregates import DailyAggregates, windowed_rfm
+from figure_cache import FigureCache
+from filter_index import FilterIndex
+from generate_full_rfm import TRANSACTIONS_FILE, load_and_prepare_data, perform_clustering
+from job_runner import JobRunner, ACTIVE_STATES
+from rfm_aggregates import DashboardAggregates
+from snapshot_store import SnapshotStore
+from sql_backend import SQLBackend
+from summary_engine import build_summary, load_summary
+
+artifact_cache = ArtifactCache()
+job_runner = JobRunner(max_workers=1)
+snapshot_store = SnapshotStore()
+
+# 'sql' serves the published table's filters, counts and summary cards as
+# queries on the embedded SQL backend instead of the in-memory bitmap index
+DASH_BACKEND = os.environ.get('RFM_DASH_BACKEND', 'memory')
+if DASH_BACKEND not in ('memory', 'sql'):
+    raise ValueError(f"RFM_DASH_BACKEND must be 'memory' or 'sql', got '{DASH_BACKEND}'")
+
+def load_rfm_table(path):
+    """Load an RFM output table, reusing the cached frame while the file is unchanged"""
+    key = artifact_cache.key('dashboard_table', {}, [path], code=[pd])
+    return artifact_cache.get_or_compute(key, 'dashboard_table', lambda: pd.read_csv(path))
+
+def load_daily_aggregates(path=TRANSACTIONS_FILE):
+    """Per-customer, per-day prefix aggregates of the transaction file (None if it is missing)"""
+    if not os.path.exists(path):
+        return None, None
+    key = artifact_cache.key('daily_aggregates', {}, [path], code=[DailyAggregates, load_and_prepare_data])
+    daily = artifact_cache.get_or_compute(key, 'daily_aggregates', lambda: DailyAggregates.from_transactions(path))
+    return daily, key
+
+def load_windowed_table(start, end, n_clusters=4):
+    """RFM table for a date range (day offsets), derived from the daily aggregates and cached"""
+    params = {'start': start, 'end': end, 'n_clusters': n_clusters}
+    key = artifact_cache.key('windowed_rfm', params, [daily_key], code=[windowed_rfm, perform_clustering])
+    return artifact_cache.get_or_compute(key, 'windowed_rfm',
+                                         lambda: windowed_rfm(daily, start, end, n_clusters), params)
+
+def load_snapshot_table(run_date):
+    """RFM table of a past run from the snapshot store, cached while its Parquet file is unchanged"""
+    table_path = snapshot_store.table_path(run_date)
+    key = artifact_cache.key('snapshot_table', {'run_date': run_date}, [table_path], code=[SnapshotStore])
+    return artifact_cache.get_or_compute(key, 'snapshot_table', lambda: snapshot_store.read(run_date),
+                                         {'run_date': run_date})
+
+def date_marks(daily, max_marks=12):
+    """Range slider marks (day offset -> label) at quarter starts, thinned to ``max_marks``"""
+    quarters = pd.date_range(daily.first_date, daily.last_date, freq='QS')
+    step = max(1, -(-len(quarters) // max_marks))
+    return {int((date - daily.first_date).days): date.strftime('%Y-%m') for date in quarters[::step]}
+
+def load_summary_table(summary_path, table_path, df):
+    """The pipeline's flat summary table if it is at least as new as the RFM table, else build one"""
+    try:
+        if os.path.getmtime(summary_path) >= os.path.getmtime(table_path):
+            return load_summary(summary_path)
+    except (OSError, ValueError):
+        pass
+    return build_summary(df)
 
 # Load the RFM data
 try:
     # Try to load the full dataset first, fallback to original if not available
     try:
-        rfm = pd.read_csv('rfm_segments_output_full.csv')
+        rfm_path, summary_path = 'rfm_segments_output_full.csv', 'rfm_segment_summary_full.csv'
+        rfm = load_rfm_table(rfm_path)
         print(f"Loaded {len(rfm)} customer records (FULL DATASET)")
     except FileNotFoundError:
-        rfm = pd.read_csv('rfm_segments_output.csv')
+        rfm_path, summary_path = 'rfm_segments_output.csv', 'rfm_segment_summary.csv'
+        rfm = load_rfm_table(rfm_path)
         print(f"Loaded {len(rfm)} customer records (ORIGINAL DATASET)")
 except FileNotFoundError:
     print("Error: No RFM data files found. Please run the analysis first.")
     exit(1)
 
+# Version of the published table; a recompute job on any worker publishes a
+# new one through .rfm_jobs/published.json and charts refresh on change
+DATA_VERSION = 0
+
+def open_sql_backend(df):
+    """In-process SQL copy of an RFM table when queries are pushed down, else None"""
+    if DASH_BACKEND != 'sql':
+        return None
+    return SQLBackend().load_rfm_frame(df)
+
+# Segment/cluster/country bitmaps, rebuilt whenever the table changes
+rfm_index = FilterIndex(rfm)
+active_dataset = (rfm, rfm_index,
+                  DashboardAggregates(rfm, rfm_index, load_summary_table(summary_path, rfm_path, rfm)))
+published_sql = open_sql_backend(rfm)
+
+def open_customer_lookup(df):
+    """Memory-mapped (id, country) lookup store for an RFM table, shared across workers"""
+    # Keyed by table content and evicted with the other cached artifacts
+    key = artifact_cache.key('customer_lookup', {}, [df], code=[CustomerLookup])
+    path = artifact_cache.file_artifact(key, 'customer_lookup', lambda path: write_store(df, path), '.npy')
+    return CustomerLookup(path)
+
+# The CRM API always serves the batch (or last published) table, never a UI view
+customer_lookup = open_customer_lookup(rfm)
+
+# Per-day prefix sums behind the date-range slider
+daily, daily_key = load_daily_aggregates()
+date_range_max = daily.n_days - 1 if daily is not None else 0
+
+def install_dataset(df, version=None, summary=None):
+    """Swap in a new RFM table for all callbacks and set (or bump) the data version"""
+    global rfm, rfm_index, active_dataset, published_sql, DATA_VERSION
+    index = FilterIndex(df)
+    published_sql = open_sql_backend(df)
+    # Table, index and aggregates are swapped together so callbacks never see a mismatch
+    active_dataset = (df, index, DashboardAggregates(df, index, summary))
+    rfm, rfm_index = df, index
+    DATA_VERSION = DATA_VERSION + 1 if version is None else version
+    figure_cache.clear()
+    prewarm_figures()
+    return DATA_VERSION
+
+published_lock = threading.Lock()
+published_version = None
+
+def refresh_published():
+    """Reload the published table if a recompute job (on any worker) replaced it; returns DATA_VERSION"""
+    global published_version, customer_lookup
+    state = job_runner.published()
+    if state is None or state['version'] == published_version or not os.path.exists(state['table']):
+        return DATA_VERSION
+    with published_lock:
+        if state['version'] != published_version:
+            df = pd.read_csv(state['table'])
+            summary = load_summary_table(state['summary'], state['table'], df) if state.get('summary') else None
+            install_dataset(df, state['version'], summary)
+            customer_lookup = open_customer_lookup(df)
+            published_version = state['version']
+            print(f"Loaded {len(df)} customer records (published by {state.get('job_id') or 'recompute'})")
+    return DATA_VERSION
+
+def current_dataset():
+    """(table, index, aggregates) of the published table, reloaded after a recompute"""
+    refresh_published()
+    return active_dataset
+
+# Figure dicts keyed on (DATA_VERSION, callback, selection)
+figure_cache = FigureCache(refresh_published,
+                           max_mb=float(os.environ.get('RFM_FIGURE_CACHE_MB', 64)))
+refresh_published()
+
+# Per-client views ('window:START:END:K' or 'snapshot:RUN_DATE') live in a
+# dcc.Store; their tables, indexes and aggregates are kept per worker in a
+# small LRU, never installed
+VIEW_CACHE_SIZE = int(os.environ.get('RFM_VIEW_CACHE', 8))
+view_datasets = OrderedDict()
+view_lock = threading.Lock()
+
+def window_view(start, end, n_clusters=4):
+    """View id of the RFM table derived for a range of day offsets"""
+    return f'window:{int(start)}:{int(end)}:{int(n_clusters)}'
+
+def load_view_table(view):
+    """RFM table behind a view id other than 'latest'"""
+    kind, _, spec = view.partition(':')
+    if kind == 'window':
+        start, end, n_clusters = (int(part) for part in spec.split(':'))
+        return load_windowed_table(start, end, n_clusters)
+    if kind == 'snapshot':
+        return load_snapshot_table(snapshot_store.resolve(spec))
+    raise ValueError(f"Unknown view '{view}'")
+
+def dataset_for(view='latest'):
+    """(table, index, aggregates) of a client's view; 'latest' is the published table"""
+    if view in (None, 'latest'):
+        return current_dataset()
+    with view_lock:
+        dataset = view_datasets.get(view)
+        if dataset is not None:
+            view_datasets.move_to_end(view)
+            return dataset
+    df = load_view_table(view)
+    index = FilterIndex(df)
+    dataset = (df, index, DashboardAggregates(df, index))
+    with view_lock:
+        view_datasets[view] = dataset
+        while len(view_datasets) > VIEW_CACHE_SIZE:
+            view_datasets.popitem(last=False)
+    return dataset
+
+def prewarm_figures():
+    """Build every figure for every dropdown combination when RFM_PREWARM_FIGURES is set"""
+    if os.environ.get('RFM_PREWARM_FIGURES', '') not in ('1', 'true', 'yes'):
+        return None
+    _, index, _ = active_dataset
+    return figure_cache.prewarm(['all'] + index.values['segment'],
+                                ['all'] + index.values['cluster'],
+                                ['all'] + index.values['country'])
+
+def sql_backend_for(view='latest'):
+    """The SQL backend answering a view's queries, or None when they run in memory"""
+    # Only the shared published table is pushed down; per-client views stay in memory
+    if published_sql is None or view not in (None, 'latest'):
+        return None
+    refresh_published()
+    return published_sql
+
+def filter_rfm(segment='all', cluster='all', country='all', view='latest'):
+    """Rows of a view's RFM table matching the dropdown selections"""
+    backend = sql_backend_for(view)
+    if backend is not None:
+        return backend.rows(segment=segment, cluster=cluster, country=country)
+    df, index, _ = dataset_for(view)
+    return index.take(df, segment=segment, cluster=cluster, country=country)
+
+def count_rfm(dim, segment='all', cluster='all', country='all', view='latest'):
+    """Customer count per value of ``dim`` for the dropdown selections in a view"""
+    backend = sql_backend_for(view)
+    if backend is not None:
+        return backend.counts(dim, segment=segment, cluster=cluster, country=country)
+    _, index, _ = dataset_for(view)
+    return index.counts(dim, segment=segment, cluster=cluster, country=country)
+
+def dropdown_options(df):
+    """Segment, cluster and country dropdown options for an RFM table"""
+    return (
+        [{'label': 'All Segments', 'value': 'all'}] +
+        [{'label': seg, 'value': seg} for seg in sorted(df['segment'].unique())],
+        [{'label': 'All Clusters', 'value': 'all'}] +
+        [{'label': f'Cluster {i}', 'value': i} for i in sorted(df['cluster'].unique())],
+        [{'label': 'All Countries', 'value': 'all'}] +
+        [{'label': country, 'value': country} for country in sorted(df['country'].unique())],
+    )
+
 # Initialize the Dash app
 # Initialize the Dash app
 app = dash.Dash(__name__)
 server = app.server  # Expose Flask server for gunicorn
 app.title = "Customer Segmentation Dashboard"
 
+segment_options, cluster_options, country_options = dropdown_options(rfm)
 
 # Define the layout
 app.layout = html.Div([
@@ -44,8 +270,7 @@ app.layout = html.Div([
             html.Label("Select Segment:", style={'fontWeight': 'bold', 'marginBottom': '10px'}),
             dcc.Dropdown(
                 id='segment-dropdown',
-                options=[{'label': 'All Segments', 'value': 'all'}] + 
-                        [{'label': seg, 'value': seg} for seg in sorted(rfm['segment'].unique())],
+                options=segment_options,
                 value='all',
                 style={'width': '100%'}
             )
@@ -55,8 +280,7 @@ app.layout = html.Div([
             html.Label("Select Cluster:", style={'fontWeight': 'bold', 'marginBottom': '10px'}),
             dcc.Dropdown(
                 id='cluster-dropdown',
-                options=[{'label': 'All Clusters', 'value': 'all'}] + 
-                        [{'label': f'Cluster {i}', 'value': i} for i in sorted(rfm['cluster'].unique())],
+                options=cluster_options,
                 value='all',
                 style={'width': '100%'}
             )
@@ -66,12 +290,56 @@ app.layout = html.Div([
             html.Label("Select Country:", style={'fontWeight': 'bold', 'marginBottom': '10px'}),
             dcc.Dropdown(
                 id='country-dropdown',
-                options=[{'label': 'All Countries', 'value': 'all'}] + 
-                        [{'label': country, 'value': country} for country in sorted(rfm['country'].unique())],
+                options=country_options,
                 value='all',
                 style={'width': '100%'}
             )
-        ], style={'width': '30%', 'display': 'inline-block'})
+        ], style={'width': '30%', 'display': 'inline-block'}),
+        
+        html.Div([
+            html.Label("Date Range:", style={'fontWeight': 'bold', 'marginRight': '10px'}),
+            html.Span(id='date-range-label', style={'color': '#7f8c8d'}),
+            dcc.RangeSlider(
+                id='date-range',
+                min=0,
+                max=date_range_max,
+                step=1,
+                value=[0, date_range_max],
+                marks=date_marks(daily) if daily is not None else {},
+                allowCross=False,
+                disabled=daily is None
+            )
+        ], style={'marginTop': '20px'}),
+        
+        html.Div([
+            html.Label("Snapshot:", style={'fontWeight': 'bold', 'marginRight': '10px'}),
+            dcc.Dropdown(
+                id='snapshot-dropdown',
+                options=[{'label': 'Latest output', 'value': 'latest'}] +
+                        [{'label': f'Run of {run_date}', 'value': run_date}
+                         for run_date in reversed(snapshot_store.run_dates())],
+                value='latest',
+                clearable=False,
+                style={'width': '250px', 'display': 'inline-block', 'verticalAlign': 'middle'}
+            ),
+            html.Span(id='snapshot-label', style={'color': '#7f8c8d', 'marginLeft': '10px'})
+        ], style={'marginTop': '20px'})
+    ], style={'marginBottom': '30px', 'padding': '20px', 'backgroundColor': '#f8f9fa', 'borderRadius': '10px'}),
+    
+    # Recompute Row
+    html.Div([
+        html.Label("Window (days, blank = all):", style={'fontWeight': 'bold', 'marginRight': '10px'}),
+        dcc.Input(id='window-days', type='number', min=1, placeholder='all', style={'width': '100px', 'marginRight': '20px'}),
+        html.Label("Clusters:", style={'fontWeight': 'bold', 'marginRight': '10px'}),
+        dcc.Input(id='n-clusters', type='number', min=2, max=12, value=4, style={'width': '70px', 'marginRight': '20px'}),
+        html.Button("Recompute", id='recompute-button', n_clicks=0, style={'marginRight': '20px'}),
+        html.Span(id='job-status', style={'color': '#7f8c8d'}),
+        dcc.Store(id='job-id'),
+        # This client's view: 'latest' (the published table), a date window or a snapshot
+        dcc.Store(id='view', data='latest'),
+        dcc.Store(id='data-version', data=DATA_VERSION),
+        # Only ticks while this client has a job queued or running
+        dcc.Interval(id='job-poll', interval=2000, disabled=True)
     ], style={'marginBottom': '30px', 'padding': '20px', 'backgroundColor': '#f8f9fa', 'borderRadius': '10px'}),
     
     # Summary Cards
@@ -126,10 +394,41 @@ app.layout = html.Div([
     # RFM Analysis Charts
     html.Div([
         html.Div([
+            html.Div([
+                dcc.Dropdown(
+                    id='heatmap-axes',
+                    options=[{'label': 'Recency x Frequency', 'value': 'rf'},
+                             {'label': 'Recency x Monetary', 'value': 'rm'},
+                             {'label': 'Frequency x Monetary', 'value': 'fm'}],
+                    value='rf',
+                    clearable=False,
+                    style={'width': '48%', 'display': 'inline-block', 'marginRight': '4%'}
+                ),
+                dcc.Dropdown(
+                    id='heatmap-metric',
+                    options=[{'label': 'Average remaining score', 'value': 'score'},
+                             {'label': 'Customer count', 'value': 'count'},
+                             {'label': 'Average monetary', 'value': 'monetary'},
+                             {'label': 'Average recency', 'value': 'recency'},
+                             {'label': 'Average frequency', 'value': 'frequency'}],
+                    value='score',
+                    clearable=False,
+                    style={'width': '48%', 'display': 'inline-block'}
+                )
+            ]),
             dcc.Graph(id='rfm-heatmap')
         ], style={'width': '50%', 'display': 'inline-block', 'padding': '10px'}),
         
         html.Div([
+            dcc.RadioItems(
+                id='monetary-bins',
+                options=[{'label': 'Linear bins', 'value': 'linear'},
+                         {'label': 'Log bins', 'value': 'log'},
+                         {'label': 'Quantile bins', 'value': 'quantile'}],
+                value='linear',
+                inline=True,
+                style={'textAlign': 'center'}
+            ),
             dcc.Graph(id='monetary-distribution')
         ], style={'width': '50%', 'display': 'inline-block', 'padding': '10px'})
     ]),
@@ -157,25 +456,24 @@ app.layout = html.Div([
      Output('avg-monetary', 'children')],
     [Input('segment-dropdown', 'value'),
      Input('cluster-dropdown', 'value'),
-     Input('country-dropdown', 'value')]
+     Input('country-dropdown', 'value'),
+     Input('view', 'data'),
+     Input('data-version', 'data')]
 )
-def update_summary_cards(selected_segment, selected_cluster, selected_country):
-    # Filter data based on selections
-    filtered_df = rfm.copy()
-    
-    if selected_segment != 'all':
-        filtered_df = filtered_df[filtered_df['segment'] == selected_segment]
-    
-    if selected_cluster != 'all':
-        filtered_df = filtered_df[filtered_df['cluster'] == selected_cluster]
-    
-    if selected_country != 'all':
-        filtered_df = filtered_df[filtered_df['country'] == selected_country]
-    
-    total_customers = len(filtered_df)
-    avg_recency = round(filtered_df['recency'].mean(), 1) if len(filtered_df) > 0 else 0
-    avg_frequency = round(filtered_df['frequency'].mean(), 1) if len(filtered_df) > 0 else 0
-    avg_monetary = round(filtered_df['monetary'].mean(), 0) if len(filtered_df) > 0 else 0
+def update_summary_cards(selected_segment, selected_cluster, selected_country,
+                         view='latest', data_version=None):
+    # Totals and means come from the summary table's partition rows, or one SQL aggregate
+    backend = sql_backend_for(view)
+    if backend is not None:
+        stats = backend.summary(segment=selected_segment, cluster=selected_cluster, country=selected_country)
+    else:
+        _, _, aggregates = dataset_for(view)
+        stats = aggregates.summary.select(selected_segment, selected_cluster, selected_country)
+    
+    total_customers = stats['count']
+    avg_recency = round(stats['recency_mean'], 1) if total_customers > 0 else 0
+    avg_frequency = round(stats['frequency_mean'], 1) if total_customers > 0 else 0
+    avg_monetary = round(stats['monetary_mean'], 0) if total_customers > 0 else 0
     
     return total_customers, avg_recency, avg_frequency, f"${avg_monetary:,.0f}"
 
@@ -184,19 +482,16 @@ def update_summary_cards(selected_segment, selected_cluster, selected_country):
     Output('segment-distribution', 'figure'),
     [Input('segment-dropdown', 'value'),
      Input('cluster-dropdown', 'value'),
-     Input('country-dropdown', 'value')]
+     Input('country-dropdown', 'value'),
+     Input('view', 'data'),
+     Input('data-version', 'data')]
 )
-def update_segment_distribution(selected_segment, selected_cluster, selected_country):
-    # Filter data
-    filtered_df = rfm.copy()
-    
-    if selected_cluster != 'all':
-        filtered_df = filtered_df[filtered_df['cluster'] == selected_cluster]
-    
-    if selected_country != 'all':
-        filtered_df = filtered_df[filtered_df['country'] == selected_country]
-    
-    segment_counts = filtered_df['segment'].value_counts()
+@figure_cache.cached('segment-distribution')
+def update_segment_distribution(selected_segment, selected_cluster, selected_country,
+                                view='latest', data_version=None):
+    # Count customers per segment from the bitmap index
+    segment_counts = count_rfm('segment', 'all', selected_cluster, selected_country, view)
+    segment_counts = segment_counts.sort_values(ascending=False)
     
     fig = px.bar(
         x=segment_counts.index, 
@@ -221,19 +516,15 @@ def update_segment_distribution(selected_segment, selected_cluster, selected_cou
     Output('cluster-distribution', 'figure'),
     [Input('segment-dropdown', 'value'),
      Input('cluster-dropdown', 'value'),
-     Input('country-dropdown', 'value')]
+     Input('country-dropdown', 'value'),
+     Input('view', 'data'),
+     Input('data-version', 'data')]
 )
-def update_cluster_distribution(selected_segment, selected_cluster, selected_country):
-    # Filter data
-    filtered_df = rfm.copy()
-    
-    if selected_segment != 'all':
-        filtered_df = filtered_df[filtered_df['segment'] == selected_segment]
-    
-    if selected_country != 'all':
-        filtered_df = filtered_df[filtered_df['country'] == selected_country]
-    
-    cluster_counts = filtered_df['cluster'].value_counts().sort_index()
+@figure_cache.cached('cluster-distribution')
+def update_cluster_distribution(selected_segment, selected_cluster, selected_country,
+                                view='latest', data_version=None):
+    # Count customers per cluster from the bitmap index
+    cluster_counts = count_rfm('cluster', selected_segment, 'all', selected_country, view).sort_index()
     
     fig = px.pie(
         values=cluster_counts.values,
@@ -254,20 +545,15 @@ def update_cluster_distribution(selected_segment, selected_cluster, selected_cou
     Output('rfm-scatter', 'figure'),
     [Input('segment-dropdown', 'value'),
      Input('cluster-dropdown', 'value'),
-     Input('country-dropdown', 'value')]
+     Input('country-dropdown', 'value'),
+     Input('view', 'data'),
+     Input('data-version', 'data')]
 )
-def update_rfm_scatter(selected_segment, selected_cluster, selected_country):
+@figure_cache.cached('rfm-scatter')
+def update_rfm_scatter(selected_segment, selected_cluster, selected_country,
+                       view='latest', data_version=None):
     # Filter data
-    filtered_df = rfm.copy()
-    
-    if selected_segment != 'all':
-        filtered_df = filtered_df[filtered_df['segment'] == selected_segment]
-    
-    if selected_cluster != 'all':
-        filtered_df = filtered_df[filtered_df['cluster'] == selected_cluster]
-    
-    if selected_country != 'all':
-        filtered_df = filtered_df[filtered_df['country'] == selected_country]
+    filtered_df = filter_rfm(selected_segment, selected_cluster, selected_country, view)
     
     fig = px.scatter(
         filtered_df,
@@ -292,19 +578,16 @@ def update_rfm_scatter(selected_segment, selected_cluster, selected_country):
     Output('country-distribution', 'figure'),
     [Input('segment-dropdown', 'value'),
      Input('cluster-dropdown', 'value'),
-     Input('country-dropdown', 'value')]
+     Input('country-dropdown', 'value'),
+     Input('view', 'data'),
+     Input('data-version', 'data')]
 )
-def update_country_distribution(selected_segment, selected_cluster, selected_country):
-    # Filter data
-    filtered_df = rfm.copy()
-    
-    if selected_segment != 'all':
-        filtered_df = filtered_df[filtered_df['segment'] == selected_segment]
-    
-    if selected_cluster != 'all':
-        filtered_df = filtered_df[filtered_df['cluster'] == selected_cluster]
-    
-    country_counts = filtered_df['country'].value_counts()
+@figure_cache.cached('country-distribution')
+def update_country_distribution(selected_segment, selected_cluster, selected_country,
+                                view='latest', data_version=None):
+    # Count customers per country from the bitmap index
+    country_counts = count_rfm('country', selected_segment, selected_cluster, 'all', view)
+    country_counts = country_counts.sort_values(ascending=False)
     
     fig = px.bar(
         x=country_counts.index,
@@ -328,35 +611,36 @@ def update_country_distribution(selected_segment, selected_cluster, selected_cou
     Output('rfm-heatmap', 'figure'),
     [Input('segment-dropdown', 'value'),
      Input('cluster-dropdown', 'value'),
-     Input('country-dropdown', 'value')]
+     Input('country-dropdown', 'value'),
+     Input('heatmap-axes', 'value'),
+     Input('heatmap-metric', 'value'),
+     Input('view', 'data'),
+     Input('data-version', 'data')]
 )
-def update_rfm_heatmap(selected_segment, selected_cluster, selected_country):
-    # Filter data
-    filtered_df = rfm.copy()
-    
-    if selected_segment != 'all':
-        filtered_df = filtered_df[filtered_df['segment'] == selected_segment]
-    
-    if selected_cluster != 'all':
-        filtered_df = filtered_df[filtered_df['cluster'] == selected_cluster]
-    
-    if selected_country != 'all':
-        filtered_df = filtered_df[filtered_df['country'] == selected_country]
-    
-    # Create RFM score heatmap
-    rfm_scores = filtered_df.groupby(['r', 'f']).agg({
-        'm': 'mean',
-        'id': 'count'
-    }).reset_index()
-    
-    # Pivot for heatmap
-    heatmap_data = rfm_scores.pivot(index='r', columns='f', values='m').fillna(0)
+@figure_cache.cached('rfm-heatmap')
+def update_rfm_heatmap(selected_segment, selected_cluster, selected_country,
+                       axes='rf', metric='score', view='latest', data_version=None):
+    # Reduce the precomputed R/F/M score cube to a 5x5 grid for the selection
+    _, _, aggregates = dataset_for(view)
+    axes, metric = axes or 'rf', metric or 'score'
+    heatmap_data = aggregates.scores.heatmap(axes, metric, segment=selected_segment,
+                                             cluster=selected_cluster, country=selected_country)
+    
+    other = next(score for score in 'rfm' if score not in axes).upper()
+    titles = {
+        'score': f"Average {other} Score",
+        'count': "Customer Count",
+        'monetary': "Average Monetary Value",
+        'recency': "Average Recency",
+        'frequency': "Average Frequency",
+    }
+    levels = range(1, heatmap_data.shape[0] + 1)
     
     fig = px.imshow(
-        heatmap_data.values,
-        x=[f'F{i}' for i in heatmap_data.columns],
-        y=[f'R{i}' for i in heatmap_data.index],
-        title="RFM Score Heatmap (Average Monetary Value)",
+        heatmap_data,
+        x=[f'{axes[1].upper()}{i}' for i in levels],
+        y=[f'{axes[0].upper()}{i}' for i in levels],
+        title=f"RFM Score Heatmap ({titles[metric]})",
         color_continuous_scale='RdYlBu_r',
         aspect="auto"
     )
@@ -373,31 +657,45 @@ def update_rfm_heatmap(selected_segment, selected_cluster, selected_country):
     Output('monetary-distribution', 'figure'),
     [Input('segment-dropdown', 'value'),
      Input('cluster-dropdown', 'value'),
-     Input('country-dropdown', 'value')]
+     Input('country-dropdown', 'value'),
+     Input('monetary-bins', 'value'),
+     Input('view', 'data'),
+     Input('data-version', 'data')]
 )
-def update_monetary_distribution(selected_segment, selected_cluster, selected_country):
-    # Filter data
-    filtered_df = rfm.copy()
-    
-    if selected_segment != 'all':
-        filtered_df = filtered_df[filtered_df['segment'] == selected_segment]
-    
-    if selected_cluster != 'all':
-        filtered_df = filtered_df[filtered_df['cluster'] == selected_cluster]
-    
-    if selected_country != 'all':
-        filtered_df = filtered_df[filtered_df['country'] == selected_country]
-    
-    fig = px.histogram(
-        filtered_df,
-        x='monetary',
-        nbins=30,
-        title="Monetary Value Distribution",
-        labels={'monetary': 'Monetary Value', 'count': 'Number of Customers'},
-        color_discrete_sequence=['#3498db']
-    )
+@figure_cache.cached('monetary-distribution')
+def update_monetary_distribution(selected_segment, selected_cluster, selected_country,
+                                 bin_mode='linear', view='latest', data_version=None):
+    # Reduce the precomputed per-partition histogram to ~30 bars
+    _, _, aggregates = dataset_for(view)
+    edges, counts = aggregates.monetary.counts(bin_mode or 'linear', segment=selected_segment,
+                                               cluster=selected_cluster, country=selected_country)
+    widths = np.diff(edges)
+    
+    if bin_mode == 'quantile':
+        # Equal-count bins: plot density so bar heights stay comparable
+        y = counts / widths
+        y_title = 'Customers per Monetary Unit'
+    else:
+        y = counts
+        y_title = 'Number of Customers'
+    
+    # Bars span [left edge, right edge] in data units, which also holds on a log axis
+    fig = go.Figure(go.Bar(
+        x=edges[:-1],
+        y=y,
+        width=widths,
+        offset=0,
+        customdata=np.column_stack([edges[:-1], edges[1:], counts]),
+        hovertemplate='%{customdata[0]:,.0f} - %{customdata[1]:,.0f}<br>Customers: %{customdata[2]}<extra></extra>',
+        marker_color='#3498db'
+    ))
     
     fig.update_layout(
+        title="Monetary Value Distribution",
+        xaxis_title='Monetary Value',
+        yaxis_title=y_title,
+        xaxis_type='log' if bin_mode == 'log' else 'linear',
+        bargap=0,
         plot_bgcolor='rgba(0,0,0,0)',
         paper_bgcolor='rgba(0,0,0,0)',
         showlegend=False
@@ -411,23 +709,17 @@ def update_monetary_distribution(selected_segment, selected_cluster, selected_co
     [Input('segment-dropdown', 'value'),
      Input('cluster-dropdown', 'value'),
      Input('country-dropdown', 'value'),
-     Input('show-raw-data', 'value')]
+     Input('show-raw-data', 'value'),
+     Input('view', 'data'),
+     Input('data-version', 'data')]
 )
-def update_data_table(selected_segment, selected_cluster, selected_country, show_raw):
+def update_data_table(selected_segment, selected_cluster, selected_country, show_raw,
+                      view='latest', data_version=None):
     if 'show' not in show_raw:
         return html.Div()
     
     # Filter data
-    filtered_df = rfm.copy()
-    
-    if selected_segment != 'all':
-        filtered_df = filtered_df[filtered_df['segment'] == selected_segment]
-    
-    if selected_cluster != 'all':
-        filtered_df = filtered_df[filtered_df['cluster'] == selected_cluster]
-    
-    if selected_country != 'all':
-        filtered_df = filtered_df[filtered_df['country'] == selected_country]
+    filtered_df = filter_rfm(selected_segment, selected_cluster, selected_country, view)
     
     # Create data table
     table = dash_table.DataTable(
@@ -448,5 +740,130 @@ def update_data_table(selected_segment, selected_cluster, selected_country, show
     
     return table
 
+# Callback for triggering a background recomputation
+@app.callback(
+    [Output('job-id', 'data'),
+     Output('job-status', 'children', allow_duplicate=True),
+     Output('job-poll', 'disabled', allow_duplicate=True)],
+    Input('recompute-button', 'n_clicks'),
+    [State('window-days', 'value'),
+     State('n-clusters', 'value')],
+    prevent_initial_call=True
+)
+def start_recompute(n_clicks, window_days, n_clusters):
+    job_id = job_runner.submit(window_days=int(window_days) if window_days else None,
+                               n_clusters=int(n_clusters or 4))
+    return job_id, "Recompute queued...", False
+
+# Callback for polling the background job and picking up the table it published
+@app.callback(
+    [Output('job-status', 'children'),
+     Output('data-version', 'data'),
+     Output('segment-dropdown', 'options'),
+     Output('cluster-dropdown', 'options'),
+     Output('country-dropdown', 'options'),
+     Output('job-poll', 'disabled')],
+    Input('job-poll', 'n_intervals'),
+    [State('job-id', 'data'),
+     State('data-version', 'data'),
+     State('view', 'data')],
+    prevent_initial_call=True
+)
+def poll_recompute(n_intervals, job_id, client_version, view='latest'):
+    # Job state and the published table are on disk, so any worker can answer
+    status = job_runner.status(job_id) if job_id else None
+    version = refresh_published()
+    if status is None:
+        message = no_update
+    elif status['state'] == 'failed':
+        message = f"Recompute failed: {status['message']}"
+    elif status['state'] == 'done':
+        message = f"Recompute finished ({len(rfm)} customers)"
+    else:
+        message = f"Recompute {status['state']}: {status['progress']:.0%} ({status['message']})"
+    stop_polling = status is None or status['state'] not in ACTIVE_STATES
+    
+    if client_version == version:
+        return message, no_update, no_update, no_update, no_update, stop_polling
+    # A client looking at a date window or snapshot keeps that view's dropdown options
+    options = dropdown_options(rfm) if view in (None, 'latest') else (no_update,) * 3
+    return (message, version) + options + (stop_polling,)
+
+# Callback for choosing this client's view: a past snapshot, a date window or the latest table
+@app.callback(
+    [Output('date-range-label', 'children'),
+     Output('snapshot-label', 'children'),
+     Output('view', 'data'),
+     Output('segment-dropdown', 'options', allow_duplicate=True),
+     Output('cluster-dropdown', 'options', allow_duplicate=True),
+     Output('country-dropdown', 'options', allow_duplicate=True),
+     Output('date-range', 'disabled')],
+    [Input('date-range', 'value'),
+     Input('snapshot-dropdown', 'value')],
+    State('n-clusters', 'value'),
+    prevent_initial_call=True
+)
+def update_view(day_range, run_date='latest', n_clusters=4):
+    range_label, slider_disabled = no_update, daily is None
+    if run_date not in (None, 'latest'):
+        # A snapshot is a whole past run, so the date window does not apply to it
+        view, slider_disabled = f'snapshot:{run_date}', True
+    elif daily is None or not day_range:
+        view = 'latest'
+    else:
+        start, end = (int(day) for day in day_range)
+        dates = [(daily.first_date + pd.Timedelta(days=day)).strftime('%Y-%m-%d') for day in (start, end)]
+        range_label = f"{dates[0]} to {dates[1]}"
+        # Windowed RFM comes from the prefix sums, not from the transaction file
+        view = 'latest' if (start, end) == (0, date_range_max) else window_view(start, end, n_clusters or 4)
+    try:
+        df, _, _ = dataset_for(view)
+    except (FileNotFoundError, ValueError) as e:
+        if view.startswith('snapshot:'):
+            return (no_update, str(e)) + (no_update,) * 5
+        return (f"{range_label}: {e}",) + (no_update,) * 6
+    
+    count = f"({len(df)} customers)"
+    if view.startswith('snapshot:'):
+        labels = (no_update, f"Run of {run_date} {count}")
+    else:
+        labels = (no_update if range_label is no_update else f"{range_label} {count}",
+                  "Latest output" if view == 'latest' else "")
+    return labels + (view,) + dropdown_options(df) + (slider_disabled,)
+
+# Customer lookup API for CRM integrations
+@server.route('/api/customers/<int:customer_id>')
+def get_customer(customer_id):
+    records = customer_lookup.get(customer_id, request.args.get('country'))
+    if not records:
+        return jsonify({'error': f'customer {customer_id} not found'}), 404
+    return jsonify({'customers': records})
+
+@server.route('/api/customers/<int:customer_id>/history')
+def get_customer_history(customer_id):
+    history = snapshot_store.customer_history(customer_id, request.args.get('country'))
+    if history.empty:
+        return jsonify({'error': f'customer {customer_id} has no snapshot history'}), 404
+    return jsonify({'history': history.to_dict('records')})
+
+@server.route('/api/customers/batch', methods=['POST'])
+def get_customers_batch():
+    payload = request.get_json(silent=True) or {}
+    ids = payload.get('ids')
+    if not isinstance(ids, list):
+        return jsonify({'error': "expected a JSON body with an 'ids' list"}), 400
+    if len(ids) > MAX_BATCH:
+        return jsonify({'error': f'at most {MAX_BATCH} ids per request'}), 400
+    countries = payload.get('countries', payload.get('country'))
+    if isinstance(countries, list) and len(countries) != len(ids):
+        return jsonify({'error': "'countries' must be as long as 'ids'"}), 400
+    try:
+        records = customer_lookup.batch(ids, countries)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'customers': records, 'found': sum(bool(r) for r in records)})
+
+prewarm_figures()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8050)
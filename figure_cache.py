@@ -0,0 +1,112 @@
+"""
+Memoized Plotly figures for the Dash callbacks
+Figures are serialized to JSON once, when built, and kept as the decoded
+figure dicts keyed on (dataset version, callback, selection), so a hit
+returns the stored dict without re-parsing. Entries are evicted least
+recently used under a budget on their serialized size, and every dropdown
+combination can optionally be pre-warmed
+"""
+
+import functools
+import inspect
+import itertools
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+DEFAULT_MAX_MB = 64
+
+
+class FigureCache:
+    """Bounded LRU cache of figure dicts, similar to ETag-style memoization"""
+
+    def __init__(self, version, max_mb=DEFAULT_MAX_MB):
+        self.version = version
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._callbacks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """The stored figure for ``key`` (shared between callers, do not mutate) or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, figure, n_bytes):
+        """Store a figure dict, counting ``n_bytes`` (its serialized size) against the budget"""
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (figure, n_bytes)
+            self._size += n_bytes
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._size -= evicted_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size,
+                    'hits': self.hits, 'misses': self.misses}
+
+    def cached(self, name):
+        """
+        Decorate a figure callback so repeat selections skip figure construction.
+
+        The key uses the server-side dataset version rather than the
+        ``data_version`` argument, so every client shares the same entries.
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                selection = tuple(value for param, value in bound.arguments.items()
+                                  if param != 'data_version')
+                key = (self.version(), name, json.dumps(selection, default=str))
+                figure = self.get(key)
+                if figure is None:
+                    # One round trip through JSON turns arrays and numpy scalars into plain values
+                    payload = pio.to_json(func(*args, **kwargs), validate=False)
+                    figure = json.loads(payload)
+                    self.put(key, figure, len(payload))
+                return figure
+
+            self._callbacks[name] = wrapper
+            return wrapper
+        return decorator
+
+    def prewarm(self, segments, clusters, countries, background=True):
+        """Build every registered figure for every dropdown combination"""
+        def run():
+            for func in self._callbacks.values():
+                for selection in itertools.product(segments, clusters, countries):
+                    try:
+                        func(*selection)
+                    except Exception:
+                        # Combinations a callback cannot draw are built on demand instead
+                        continue
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name='figure-prewarm', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,139 @@
+"""
+Bitmap indexes over the RFM table for dashboard filtering
+Each segment, cluster and country value gets a packed row bitmap built once
+at load time, so any filter combination resolves by bitmap intersection.
+Per-partition accumulators (segment x cluster x country x bins) can be
+built over the same codes and reduced for any selection without row scans
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ('segment', 'cluster', 'country')
+ALL = 'all'
+MAX_CACHED_SELECTIONS = 64
+
+
+def _native(value):
+    """Convert numpy scalars to plain Python values for dict lookups"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+class FilterIndex:
+    """Per-value packed row bitmaps for the segment, cluster and country columns"""
+
+    def __init__(self, df, dimensions=DIMENSIONS):
+        self.n_rows = len(df)
+        self.dimensions = tuple(dimensions)
+        self.codes = {}
+        self.values = {}
+        self.bitmaps = {}
+        for dim in self.dimensions:
+            uniques, codes = np.unique(df[dim].to_numpy(), return_inverse=True)
+            uniques = [_native(v) for v in uniques]
+            self.codes[dim] = codes.astype(np.int32)
+            self.values[dim] = uniques
+            self.bitmaps[dim] = {
+                value: np.packbits(self.codes[dim] == code)
+                for code, value in enumerate(uniques)
+            }
+        self._all_bits = np.packbits(np.ones(self.n_rows, dtype=bool))
+        self._positions = {}
+        # Dash serves callbacks from several threads; the memo is shared between them
+        self._positions_lock = threading.Lock()
+
+    def code(self, dim, value):
+        """Integer code of a value in one dimension (None for 'all', -1 if absent)"""
+        if value == ALL or value is None:
+            return None
+        try:
+            return self.values[dim].index(_native(value))
+        except ValueError:
+            return -1
+
+    def bitmap(self, **selection):
+        """Packed bitmap of the rows matching every non-'all' selection"""
+        bits = self._all_bits
+        for dim, value in selection.items():
+            if value == ALL or value is None:
+                continue
+            dim_bits = self.bitmaps[dim].get(_native(value))
+            if dim_bits is None:
+                return np.zeros_like(self._all_bits)
+            bits = np.bitwise_and(bits, dim_bits)
+        return bits
+
+    def mask(self, **selection):
+        """Boolean row mask for a selection such as segment='champions', cluster=2"""
+        return np.unpackbits(self.bitmap(**selection), count=self.n_rows).astype(bool)
+
+    def positions(self, **selection):
+        """Row positions matching a selection, memoized per selection"""
+        key = tuple((dim, _native(selection.get(dim, ALL))) for dim in self.dimensions)
+        with self._positions_lock:
+            positions = self._positions.get(key)
+        if positions is not None:
+            return positions
+        # Built outside the lock: two threads racing on one selection build equal arrays
+        positions = np.flatnonzero(self.mask(**selection))
+        positions.flags.writeable = False
+        with self._positions_lock:
+            if key not in self._positions and len(self._positions) >= MAX_CACHED_SELECTIONS:
+                self._positions.pop(next(iter(self._positions)))
+            self._positions[key] = positions
+        return positions
+
+    def counts(self, dim, **selection):
+        """
+        Row count per value of ``dim`` within a selection.
+
+        Values appear in order of first occurrence, like an unsorted
+        ``value_counts``; values with no rows are left out.
+        """
+        codes = self.codes[dim][self.positions(**selection)]
+        present, first = np.unique(codes, return_index=True)
+        present = present[np.argsort(first, kind='stable')]
+        counts = np.bincount(codes, minlength=len(self.values[dim]))[present]
+        index = pd.Index([self.values[dim][code] for code in present], name=dim)
+        return pd.Series(counts.astype('int64'), index=index, name='count')
+
+    @property
+    def shape(self):
+        """Number of distinct values per dimension"""
+        return tuple(len(self.values[dim]) for dim in self.dimensions)
+
+    def accumulate(self, bin_codes, n_bins, weights=None):
+        """
+        Sum ``weights`` (or count rows) per partition and bin in one pass.
+
+        Returns an array of shape ``self.shape + (n_bins,)``; ``bin_codes``
+        holds each row's bin in ``[0, n_bins)``.
+        """
+        partition = np.zeros(self.n_rows, dtype=np.int64)
+        for dim, size in zip(self.dimensions, self.shape):
+            partition = partition * size + self.codes[dim]
+        flat = partition * n_bins + np.asarray(bin_codes, dtype=np.int64)
+        size = int(np.prod(self.shape)) * n_bins
+        return np.bincount(flat, weights=weights, minlength=size).reshape(self.shape + (n_bins,))
+
+    def reduce(self, cube, **selection):
+        """Collapse a partition accumulator to the bins of one selection"""
+        # Peel dimensions off from the last partition axis so earlier axes keep their position
+        for axis in reversed(range(len(self.dimensions))):
+            code = self.code(self.dimensions[axis], selection.get(self.dimensions[axis], ALL))
+            if code is None:
+                cube = cube.sum(axis=axis)
+            elif code < 0:
+                return np.zeros(cube.shape[axis + 1:], dtype=cube.dtype)
+            else:
+                cube = np.take(cube, code, axis=axis)
+        return cube
+
+    def take(self, df, **selection):
+        """Rows of ``df`` (the indexed table) matching a selection"""
+        positions = self.positions(**selection)
+        if len(positions) == self.n_rows:
+            return df
+        return df.iloc[positions]
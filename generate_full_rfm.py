@@ -7,25 +7,52 @@ This will create a comprehensive customer segmentation with all 1000 transaction
 import pandas as pd
 import numpy as np
 from datetime import timedelta
+import json
 import math
+import os
+from scipy import sparse
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 
-def load_and_prepare_data():
+from artifact_cache import ArtifactCache
+from segment_transitions import track_transitions
+from snapshot_store import SnapshotStore
+from summary_engine import build_summary, level, write_summary
+from transaction_ingest import read_transactions
+
+TRANSACTIONS_FILE = 'customer_transactions.csv'
+PREVIOUS_OUTPUT_FILE = 'rfm_segments_output_full.prev.csv'
+RFM_MODEL_FILE = 'rfm_model.json'
+RFM_FEATURES = ['recency', 'frequency', 'monetary']
+QUINTILES = [0.2, 0.4, 0.6, 0.8]
+
+# Segment mapping on the combined r + fm score
+SEGMENT_MAP = {
+    r'22': 'hibernating',
+    r'[1-2][1-2]': 'lost',
+    r'15': "can't lose",
+    r'[1-2][3-5]': 'at risk',
+    r'3[1-2]': 'about to sleep',
+    r'33': 'need attention',
+    r'55': 'champions',
+    r'[3-5][4-5]': 'loyal customers',
+    r'41': 'promising',
+    r'51': 'new customers',
+    r'[4-5][2-3]': 'potential loyalists'
+}
+
+def load_and_prepare_data(path=TRANSACTIONS_FILE, engine='auto'):
     """Load and prepare the customer transaction data"""
     print("Loading customer transaction data...")
     
-    # Load the original transaction data
-    df = pd.read_csv('customer_transactions.csv')
-    
-    # Convert date column to datetime
-    df['Sale_Date'] = pd.to_datetime(df['Sale_Date'], errors='coerce')
+    # Load only the RFM columns with an explicit schema; Sale_Date is parsed
+    # with a fixed format and invalid dates become NaT
+    df = read_transactions(path, engine=engine)
     
     # Rename columns for RFM processing
     df.rename(columns={
         'Customer_ID': 'id',
         'Sales_Amount': 'monetary',
-        'Quantity_Sold': 'units',
         'Sale_Date': 'date',
         'Region': 'country'
     }, inplace=True)
@@ -39,6 +66,16 @@ def load_and_prepare_data():
     
     return df
 
+def filter_time_window(df, window_days=None):
+    """Keep only transactions from the last ``window_days`` days (all when None)"""
+    if window_days is None:
+        return df
+    
+    cutoff = df['date'].max() - timedelta(days=window_days)
+    df = df[df['date'] > cutoff]
+    print(f"Kept {len(df)} transactions from the last {window_days} days")
+    return df
+
 def calculate_rfm_metrics(df):
     """Calculate RFM metrics for all customers"""
     print("Calculating RFM metrics...")
@@ -59,7 +96,7 @@ def calculate_rfm_metrics(df):
     }
     
     # Group by customer to get RFM metrics
-    rfm = df.groupby(['id', 'id+', 'country']).agg(agg_funcs).reset_index()
+    rfm = df.groupby(['id', 'id+', 'country'], observed=True).agg(agg_funcs).reset_index()
     
     # Rename columns
     rfm.rename(columns={
@@ -74,6 +111,9 @@ def calculate_rfm_metrics(df):
     # Drop the temporary id+ column
     rfm.drop(columns=['id+'], inplace=True)
     
+    # Keep the reference date so the frozen model can score new purchases
+    rfm.attrs['reference_date'] = NOW
+    
     print(f"RFM analysis completed for {len(rfm)} unique customers")
     return rfm
 
@@ -82,7 +122,8 @@ def calculate_rfm_scores(rfm):
     print("Calculating RFM scores...")
     
     # Compute quintiles for R, F, and M
-    quintiles = rfm[['recency', 'frequency', 'monetary']].quantile([0.2, 0.4, 0.6, 0.8]).to_dict()
+    quintiles = rfm[RFM_FEATURES].quantile(QUINTILES).to_dict()
+    rfm.attrs['quintiles'] = {col: [quintiles[col][q] for q in QUINTILES] for col in RFM_FEATURES}
     
     # Define scoring functions
     def r_score(x):
@@ -126,67 +167,149 @@ def assign_customer_segments(rfm):
     # Calculate combined FM score
     rfm['fm'] = ((rfm['f'] + rfm['m']) / 2).apply(math.trunc)
     
-    # Segment mapping
-    segment_map = {
-        r'22': 'hibernating',
-        r'[1-2][1-2]': 'lost',
-        r'15': "can't lose",
-        r'[1-2][3-5]': 'at risk',
-        r'3[1-2]': 'about to sleep',
-        r'33': 'need attention',
-        r'55': 'champions',
-        r'[3-5][4-5]': 'loyal customers',
-        r'41': 'promising',
-        r'51': 'new customers',
-        r'[4-5][2-3]': 'potential loyalists'
-    }
-    
     # Assign segments
-    rfm['segment'] = (rfm['r'].astype(str) + rfm['fm'].astype(str)).replace(segment_map, regex=True)
+    rfm['segment'] = (rfm['r'].astype(str) + rfm['fm'].astype(str)).replace(SEGMENT_MAP, regex=True)
     
     return rfm
 
-def perform_clustering(rfm):
-    """Perform K-means clustering on RFM data"""
+def perform_clustering(rfm, n_clusters=4, extra_features=None):
+    """
+    Perform K-means clustering on RFM data.
+
+    ``extra_features`` is an optional (sparse) matrix with one row per
+    customer, e.g. rfm_enrichment's share-of-spend features; it is appended
+    to the scaled RFM columns and the clustering runs on the sparse matrix.
+    """
     print("Performing K-means clustering...")
     
     # Scale RFM features
     scaler = StandardScaler()
-    rfm_scaled = scaler.fit_transform(rfm[['recency', 'frequency', 'monetary']])
+    rfm_scaled = scaler.fit_transform(rfm[RFM_FEATURES])
+    if extra_features is not None:
+        rfm_scaled = sparse.hstack([sparse.csr_matrix(rfm_scaled), sparse.csr_matrix(extra_features)], format='csr')
     
-    # Use 4 clusters (you can adjust this)
-    kmeans = KMeans(n_clusters=4, random_state=42)
+    # Use 4 clusters by default (you can adjust this)
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
     rfm['cluster'] = kmeans.fit_predict(rfm_scaled)
     
+    # Keep the fitted scaler and centroids for online reassignment, which
+    # only sees recency, frequency and monetary
+    rfm.attrs['scaler_mean'] = scaler.mean_.tolist()
+    rfm.attrs['scaler_scale'] = scaler.scale_.tolist()
+    if extra_features is None:
+        rfm.attrs['centroids'] = kmeans.cluster_centers_.tolist()
+    else:
+        rfm.attrs.pop('centroids', None)
+    
     return rfm
 
+def segment_lookup():
+    """Segment name for every (r, fm) score pair, as a 5x5 table indexed [r-1][fm-1]"""
+    codes = pd.Series([f'{r}{fm}' for r in range(1, 6) for fm in range(1, 6)])
+    names = codes.replace(SEGMENT_MAP, regex=True).tolist()
+    return [names[i:i + 5] for i in range(0, 25, 5)]
+
+def build_rfm_model(rfm):
+    """
+    The frozen batch model: reference date, quintile edges, scaler and KMeans
+    centroids, plus the segment lookup. Lets online_ingest.py score new
+    purchases exactly as this run scored the batch.
+    """
+    missing = [key for key in ('reference_date', 'quintiles', 'centroids') if key not in rfm.attrs]
+    if missing:
+        raise ValueError(f"RFM table has no fitted model attributes: {', '.join(missing)}")
+    return {
+        'reference_date': rfm.attrs['reference_date'].strftime('%Y-%m-%d'),
+        'features': RFM_FEATURES,
+        'quintiles': rfm.attrs['quintiles'],
+        'scaler': {'mean': rfm.attrs['scaler_mean'], 'scale': rfm.attrs['scaler_scale']},
+        'centroids': rfm.attrs['centroids'],
+        'segments': segment_lookup(),
+    }
+
+def save_rfm_model(rfm, path=RFM_MODEL_FILE):
+    """Write the frozen batch model as JSON"""
+    with open(path, 'w') as f:
+        json.dump(build_rfm_model(rfm), f, indent=2)
+
 def generate_summary_stats(rfm):
     """Generate summary statistics"""
     print("Generating summary statistics...")
     
-    # Segment summary
-    segment_summary = rfm.groupby('segment').agg({
-        'recency': 'mean',
-        'frequency': 'mean', 
-        'monetary': ['mean', 'sum'],
-        'id': 'count'
-    }).rename(columns={'id': 'count'})
+    # Segment, cluster, country and segment x cluster rollups from one pass
+    summary = build_summary(rfm)
     
     print("\n=== SEGMENT SUMMARY ===")
-    print(segment_summary)
-    
-    # Cluster summary
-    cluster_summary = rfm.groupby('cluster').agg({
-        'recency': 'mean',
-        'frequency': 'mean',
-        'monetary': 'mean',
-        'id': 'count'
-    }).rename(columns={'id': 'count'})
+    print(level(summary, 'segment')[['recency_mean', 'frequency_mean', 'monetary_mean', 'monetary_sum', 'count']].to_string())
     
     print("\n=== CLUSTER SUMMARY ===")
-    print(cluster_summary)
+    print(level(summary, 'cluster')[['recency_mean', 'frequency_mean', 'monetary_mean', 'count']].to_string())
+    
+    return summary
+
+PIPELINE_STAGES = ['transactions', 'rfm_metrics', 'rfm_scores', 'segments', 'clusters', 'summary']
+
+def run_pipeline(input_path=TRANSACTIONS_FILE, n_clusters=4, window_days=None, cache=None, progress=None):
+    """
+    Run the RFM stages, reusing cached artifacts whose inputs are unchanged.
+
+    Each stage is addressed by the content hash of the transaction file plus
+    the parameters of that stage and every stage before it, so a stage (and
+    everything upstream of it) is skipped when a matching artifact exists.
+    ``progress(fraction, message)`` is called as each stage completes.
+    Returns the customer-level table and the flat summary table.
+    """
+    cache = cache or ArtifactCache()
+    window = {'window_days': window_days}
+    
+    # Every key hashes in the source of the code that builds its stage
+    keys = {'transactions': cache.key('transactions', {}, [input_path],
+                                      code=[load_and_prepare_data, read_transactions])}
+    keys['rfm_metrics'] = cache.key('rfm_metrics', window, [keys['transactions']], code=[calculate_rfm_metrics])
+    keys['rfm_scores'] = cache.key('rfm_scores', {}, [keys['rfm_metrics']], code=[calculate_rfm_scores])
+    keys['segments'] = cache.key('segments', {}, [keys['rfm_scores']], code=[assign_customer_segments])
+    keys['clusters'] = cache.key('clusters', {'n_clusters': n_clusters}, [keys['segments']],
+                                 code=[perform_clustering])
+    keys['summary'] = cache.key('summary', {'format': 'flat', 'groups': 'observed'}, [keys['clusters']],
+                                code=[generate_summary_stats, build_summary])
+    
+    def report(name):
+        if progress is not None:
+            done = PIPELINE_STAGES.index(name) + 1
+            progress(done / len(PIPELINE_STAGES), f"{name} ready")
+    
+    def stage(name, compute, params=None):
+        def run():
+            value = cache.get_or_compute(keys[name], name, compute, params)
+            report(name)
+            return value
+        return run
+    
+    # Steps 1-5: load, RFM metrics (optionally over a time window), scores,
+    # segments, clustering
+    transactions = stage('transactions', lambda: load_and_prepare_data(input_path))
+    metrics = stage('rfm_metrics', lambda: calculate_rfm_metrics(filter_time_window(transactions(), window_days)),
+                    window)
+    scores = stage('rfm_scores', lambda: calculate_rfm_scores(metrics()))
+    segments = stage('segments', lambda: assign_customer_segments(scores()))
+    clusters = stage('clusters', lambda: perform_clustering(segments(), n_clusters),
+                     {'n_clusters': n_clusters})
+    rfm = clusters()
+    
+    # Step 6: Generate summary statistics
+    summary = cache.get_or_compute(keys['summary'], 'summary', lambda: generate_summary_stats(rfm))
+    report('summary')
     
-    return segment_summary, cluster_summary
+    return rfm, summary
+
+def save_results(rfm, summary, output_path='rfm_segments_output_full.csv',
+                 summary_path='rfm_segment_summary_full.csv', model_path=None):
+    """Write the customer-level RFM table, the flat summary table and optionally the frozen model"""
+    # Sorted on the customer key so transition tracking can stream-merge runs
+    rfm.sort_values(['id', 'country'], kind='stable').to_csv(output_path, index=False)
+    write_summary(summary, summary_path)
+    if model_path is not None:
+        save_rfm_model(rfm, model_path)
 
 def main():
     """Main function to generate complete RFM analysis"""
@@ -195,33 +318,30 @@ def main():
     print("Processing ALL customer records (no time filter)")
     print("=" * 60)
     
-    # Step 1: Load and prepare data
-    df = load_and_prepare_data()
+    # Steps 1-6: run the (cached) pipeline stages
+    rfm, summary = run_pipeline()
     
-    # Step 2: Calculate RFM metrics
-    rfm = calculate_rfm_metrics(df)
-    
-    # Step 3: Calculate RFM scores
-    rfm = calculate_rfm_scores(rfm)
-    
-    # Step 4: Assign customer segments
-    rfm = assign_customer_segments(rfm)
-    
-    # Step 5: Perform clustering
-    rfm = perform_clustering(rfm)
-    
-    # Step 6: Generate summary statistics
-    segment_summary, cluster_summary = generate_summary_stats(rfm)
-    
-    # Step 7: Save results
+    # Step 7: Save results, keeping the previous run's table for comparison
     print("\nSaving results...")
-    rfm.to_csv('rfm_segments_output_full.csv', index=False)
-    segment_summary.to_csv('rfm_segment_summary_full.csv')
+    output_path = 'rfm_segments_output_full.csv'
+    previous_path = PREVIOUS_OUTPUT_FILE
+    if os.path.exists(output_path):
+        os.replace(output_path, previous_path)
+    save_results(rfm, summary, output_path, model_path=RFM_MODEL_FILE)
+    # Compressed, run-date partitioned history of every run's outputs
+    snapshots = SnapshotStore()
+    run_date = snapshots.write(rfm, summary)
     
     print(f"\n✅ Analysis complete!")
     print(f"📊 Processed {len(rfm)} unique customers")
     print(f"📁 Saved: rfm_segments_output_full.csv")
     print(f"📁 Saved: rfm_segment_summary_full.csv")
+    print(f"📁 Saved: {RFM_MODEL_FILE}")
+    print(f"📁 Saved snapshot: {snapshots.partition_path(run_date)}")
+    
+    # Step 8: Segment transitions since the previous run
+    if os.path.exists(previous_path):
+        track_transitions(previous_path, output_path)
     
     # Display segment distribution
     print(f"\n=== SEGMENT DISTRIBUTION ===")
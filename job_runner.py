@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Background job runner for RFM pipeline recomputation
+Runs generate_full_rfm.run_pipeline in a local process pool so the dashboard
+can trigger recomputation without blocking its request threads. Job state
+and the published result live as JSON files in .rfm_jobs/, so any web worker
+can poll a job another worker started and pick up the table it published.
+State updates are serialized by a lock file, and finished jobs beyond the
+retention count are removed with their output tables
+"""
+
+import contextlib
+import fcntl
+import glob
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+JOBS_DIR = '.rfm_jobs'
+PUBLISHED_FILE = 'published.json'
+LOCK_FILE = '.lock'
+ACTIVE_STATES = ('queued', 'running')
+# Finished jobs (and their output tables) kept for status polling; the
+# published table is kept regardless
+JOB_RETENTION = int(os.environ.get('RFM_JOB_RETENTION', 10))
+
+
+def _write_json(path, payload):
+    """Atomically replace ``path`` with a JSON document"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _job_path(jobs_dir, job_id):
+    return os.path.join(jobs_dir, f'{job_id}.json')
+
+
+@contextlib.contextmanager
+def _locked(jobs_dir):
+    """Hold the jobs directory's lock, shared by every worker and pool process"""
+    os.makedirs(jobs_dir, exist_ok=True)
+    with open(os.path.join(jobs_dir, LOCK_FILE), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _update_job(jobs_dir, job_id, **fields):
+    """Merge ``fields`` into a job's state file"""
+    path = _job_path(jobs_dir, job_id)
+    with _locked(jobs_dir):
+        job = _read_json(path) or {'id': job_id}
+        job.update(fields)
+        _write_json(path, job)
+    return job
+
+
+def _fail_if_active(jobs_dir, job_id, message):
+    """Mark a job failed unless it already recorded how it ended"""
+    path = _job_path(jobs_dir, job_id)
+    with _locked(jobs_dir):
+        job = _read_json(path) or {'id': job_id}
+        if job.get('state') not in (None,) + ACTIVE_STATES:
+            return job
+        job.update(state='failed', message=message, finished=time.time())
+        _write_json(path, job)
+    return job
+
+
+def cleanup_jobs(jobs_dir=JOBS_DIR, keep=JOB_RETENTION):
+    """
+    Remove all but the ``keep`` most recently finished jobs, state file and
+    output tables together. Active jobs and the job whose table is
+    published are never removed. Returns the removed job ids.
+    """
+    with _locked(jobs_dir):
+        published_job = (published(jobs_dir) or {}).get('job_id')
+        finished = []
+        for path in glob.glob(os.path.join(jobs_dir, 'job-*.json')):
+            job = _read_json(path)
+            if job is None or job.get('state') in ACTIVE_STATES or job.get('id') == published_job:
+                continue
+            finished.append((job.get('finished') or 0, job['id']))
+        finished.sort(reverse=True)
+        removed = [job_id for _, job_id in finished[max(keep, 0):]]
+        for job_id in removed:
+            for path in [_job_path(jobs_dir, job_id)] + glob.glob(os.path.join(jobs_dir, f'{job_id}_*')):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+    return removed
+
+
+def publish(table_path, summary_path=None, jobs_dir=JOBS_DIR, job_id=None):
+    """Make ``table_path`` the RFM table every dashboard worker serves"""
+    state = {'version': time.time_ns(), 'table': table_path, 'summary': summary_path,
+             'job_id': job_id, 'published': time.time()}
+    with _locked(jobs_dir):
+        _write_json(os.path.join(jobs_dir, PUBLISHED_FILE), state)
+    return state
+
+
+def published(jobs_dir=JOBS_DIR):
+    """The latest published table ({'version', 'table', 'summary', ...}), or None"""
+    return _read_json(os.path.join(jobs_dir, PUBLISHED_FILE))
+
+
+def _run_job(job_id, params, jobs_dir):
+    """Pool entry point: run the pipeline, write its output table and publish it"""
+    from generate_full_rfm import run_pipeline, save_results
+
+    def progress(fraction, message):
+        _update_job(jobs_dir, job_id, state='running', progress=fraction, message=message)
+
+    try:
+        progress(0.0, 'started')
+        rfm, summary = run_pipeline(
+            input_path=params.get('input_path', 'customer_transactions.csv'),
+            n_clusters=params.get('n_clusters', 4),
+            window_days=params.get('window_days'),
+            progress=progress,
+        )
+        output_path = os.path.join(jobs_dir, f'{job_id}_rfm_segments.csv')
+        summary_path = os.path.join(jobs_dir, f'{job_id}_segment_summary.csv')
+        save_results(rfm, summary, output_path, summary_path)
+        publish(output_path, summary_path, jobs_dir, job_id)
+    except BaseException as error:
+        _update_job(jobs_dir, job_id, state='failed', message=str(error), finished=time.time(),
+                    error=''.join(traceback.format_exception(error)))
+        raise
+    _update_job(jobs_dir, job_id, state='done', progress=1.0, message='finished',
+                finished=time.time(), result_path=output_path)
+    return output_path
+
+
+class JobRunner:
+    """Queue of pipeline jobs executed by a local process pool, with state shared on disk"""
+
+    def __init__(self, max_workers=1, jobs_dir=JOBS_DIR, keep=JOB_RETENTION):
+        self.max_workers = max_workers
+        self.jobs_dir = jobs_dir
+        self.keep = keep
+        self._executor = None
+
+    def _start(self):
+        # Spawned workers avoid forking a multithreaded web server
+        context = multiprocessing.get_context('spawn')
+        self._executor = ProcessPoolExecutor(self.max_workers, mp_context=context)
+
+    def _finished(self, job_id, future):
+        # A pool process that died without recording its failure still ends the job
+        error = future.exception()
+        if error is not None:
+            _fail_if_active(self.jobs_dir, job_id, str(error))
+        # Old jobs are pruned as each one ends, so .rfm_jobs stays bounded
+        self.cleanup()
+
+    def submit(self, **params):
+        """Queue a pipeline run and return its job id immediately"""
+        if self._executor is None:
+            self._start()
+        job_id = f'job-{uuid.uuid4().hex[:12]}'
+        with _locked(self.jobs_dir):
+            _write_json(_job_path(self.jobs_dir, job_id), {
+                'id': job_id, 'params': params, 'state': 'queued', 'progress': 0.0,
+                'message': 'queued', 'submitted': time.time(), 'result_path': None,
+            })
+        future = self._executor.submit(_run_job, job_id, params, self.jobs_dir)
+        future.add_done_callback(lambda f: self._finished(job_id, f))
+        return job_id
+
+    def status(self, job_id):
+        """Return a job's state from its state file, or None for an unknown id"""
+        if not job_id or os.sep in job_id or job_id.startswith('.'):
+            return None
+        return _read_json(_job_path(self.jobs_dir, job_id))
+
+    def published(self):
+        return published(self.jobs_dir)
+
+    def cleanup(self):
+        """Drop finished jobs beyond this runner's retention count"""
+        return cleanup_jobs(self.jobs_dir, self.keep)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
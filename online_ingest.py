@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Online ingestion of single transactions and micro-batches
+Each customer's last purchase day, frequency and monetary total are kept in
+memory, seeded from the last batch table. Every incoming transaction updates
+its customer and reassigns r/f/m, segment and nearest KMeans centroid
+against the frozen batch model (rfm_model.json), so a purchase shows up in
+the customer's segment without rerunning generate_full_rfm.py
+"""
+
+import argparse
+import csv
+import json
+import os
+import socket
+import time
+from bisect import bisect_left
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from assign_kernel import CentroidAssigner
+from generate_full_rfm import RFM_MODEL_FILE
+from transaction_ingest import RFM_COLUMNS
+
+TABLE_FILE = 'rfm_segments_output_full.csv'
+DEFAULT_BATCH_SIZE = 1000
+OUTPUT_COLUMNS = ['id', 'country', 'recency', 'frequency', 'monetary', 'r', 'f', 'm', 'segment', 'cluster']
+
+# Per-customer state: [last_day, frequency, monetary, r, f, m, segment, cluster]
+LAST_DAY, FREQUENCY, MONETARY, R, F, M, SEGMENT, CLUSTER = range(8)
+
+
+def day_number(value):
+    """Ordinal day of a 'YYYY-MM-DD' string (or date/Timestamp)"""
+    if isinstance(value, str):
+        return date.fromisoformat(value).toordinal()
+    return value.toordinal()
+
+
+class RFMModel:
+    """The quintile edges, scaler, centroids and segment lookup frozen by the last batch run"""
+
+    def __init__(self, model):
+        self.reference_day = day_number(model['reference_date'])
+        quintiles = model['quintiles']
+        self.recency_edges = [float(x) for x in quintiles['recency']]
+        self.frequency_edges = [float(x) for x in quintiles['frequency']]
+        self.monetary_edges = [float(x) for x in quintiles['monetary']]
+        self.mean = [float(x) for x in model['scaler']['mean']]
+        self.scale = [float(x) for x in model['scaler']['scale']]
+        self.centroids = [[float(x) for x in centroid] for centroid in model['centroids']]
+        self.segments = model['segments']
+        self.assigner = CentroidAssigner(self.mean, self.scale, self.centroids)
+
+    @classmethod
+    def load(cls, path=RFM_MODEL_FILE):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def score(self, recency, frequency, monetary):
+        """r, f, m scores (1-5), segment and nearest centroid for one customer"""
+        # bisect_left counts the edges strictly below x, matching the batch's x <= edge tests
+        r = 5 - bisect_left(self.recency_edges, recency)
+        f = 1 + bisect_left(self.frequency_edges, frequency)
+        m = 1 + bisect_left(self.monetary_edges, monetary)
+        segment = self.segments[r - 1][(f + m) // 2 - 1]
+
+        mean, scale = self.mean, self.scale
+        z0 = (recency - mean[0]) / scale[0]
+        z1 = (frequency - mean[1]) / scale[1]
+        z2 = (monetary - mean[2]) / scale[2]
+        cluster, best = 0, float('inf')
+        for i, (c0, c1, c2) in enumerate(self.centroids):
+            distance = (z0 - c0) ** 2 + (z1 - c1) ** 2 + (z2 - c2) ** 2
+            if distance < best:
+                cluster, best = i, distance
+        return r, f, m, segment, cluster
+
+    def score_table(self, recency, frequency, monetary):
+        """Vectorized score() over whole columns"""
+        r = 5 - np.searchsorted(self.recency_edges, recency, side='left')
+        f = 1 + np.searchsorted(self.frequency_edges, frequency, side='left')
+        m = 1 + np.searchsorted(self.monetary_edges, monetary, side='left')
+        segment = np.asarray(self.segments, dtype=object)[r - 1, (f + m) // 2 - 1]
+        cluster = self.assigner.assign(np.column_stack([recency, frequency, monetary]))
+        return r, f, m, segment, cluster
+
+
+class OnlineRFM:
+    """In-memory RFM state for every customer, updated one transaction at a time"""
+
+    def __init__(self, model):
+        self.model = model
+        self.reference_day = model.reference_day
+        self.customers = {}
+        self.processed = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_batch(cls, model_path=RFM_MODEL_FILE, table_path=TABLE_FILE):
+        """Seed the store from the batch output table and the model it was scored with"""
+        store = cls(RFMModel.load(model_path))
+        if table_path is not None and os.path.exists(table_path):
+            rfm = pd.read_csv(table_path, usecols=OUTPUT_COLUMNS)
+            last_day = store.reference_day - rfm['recency'].to_numpy()
+            for row in zip(rfm['id'].tolist(), rfm['country'].tolist(), last_day.tolist(),
+                           rfm['frequency'].tolist(), rfm['monetary'].astype(float).tolist(),
+                           rfm['r'].tolist(), rfm['f'].tolist(), rfm['m'].tolist(),
+                           rfm['segment'].tolist(), rfm['cluster'].tolist()):
+                store.customers[(row[0], row[1])] = list(row[2:])
+        return store
+
+    def update(self, customer_id, country, day, amount):
+        """
+        Apply one transaction and return the customer's new state.
+
+        The reference date advances to the day after the latest purchase seen,
+        as in the batch run; other customers' recency is only rescored by
+        refresh().
+        """
+        if day >= self.reference_day:
+            self.reference_day = day + 1
+        state = self.customers.get((customer_id, country))
+        if state is None:
+            state = [day, 1, float(amount), 0, 0, 0, None, 0]
+            self.customers[(customer_id, country)] = state
+        else:
+            if day > state[LAST_DAY]:
+                state[LAST_DAY] = day
+            state[FREQUENCY] += 1
+            state[MONETARY] += amount
+        state[R:] = self.model.score(self.reference_day - state[LAST_DAY], state[FREQUENCY], state[MONETARY])
+        self.processed += 1
+        return state
+
+    def ingest(self, rows):
+        """Apply a micro-batch of (customer_id, country, 'YYYY-MM-DD', amount) rows; returns the keys touched"""
+        touched = set()
+        for customer_id, country, sale_date, amount in rows:
+            try:
+                day = date.fromisoformat(sale_date).toordinal()
+                amount = float(amount)
+                customer_id = int(customer_id)
+            except (TypeError, ValueError):
+                # Invalid dates are dropped, as in the batch loader
+                self.rejected += 1
+                continue
+            self.update(customer_id, country, day, amount)
+            touched.add((customer_id, country))
+        return touched
+
+    def lookup(self, customer_id, country):
+        """Current RFM row of one customer, or None if unseen"""
+        state = self.customers.get((customer_id, country))
+        if state is None:
+            return None
+        return dict(zip(OUTPUT_COLUMNS, (customer_id, country, self.reference_day - state[LAST_DAY],
+                                         *state[FREQUENCY:])))
+
+    def refresh(self):
+        """Rescore every customer against the current reference date"""
+        table = self.to_frame()
+        r, f, m, segment, cluster = self.model.score_table(
+            table['recency'].to_numpy(float), table['frequency'].to_numpy(float), table['monetary'].to_numpy(float))
+        for state, *scores in zip(self.customers.values(), r.tolist(), f.tolist(), m.tolist(),
+                                  segment.tolist(), cluster.tolist()):
+            state[R:] = scores
+
+    def to_frame(self):
+        """All customers as an RFM table with the batch output's columns"""
+        keys = list(self.customers)
+        states = list(self.customers.values())
+        table = pd.DataFrame(states, columns=['last_day', 'frequency', 'monetary', 'r', 'f', 'm', 'segment', 'cluster'])
+        table.insert(0, 'id', [key[0] for key in keys])
+        table.insert(1, 'country', [key[1] for key in keys])
+        table.insert(2, 'recency', self.reference_day - table.pop('last_day'))
+        return table[OUTPUT_COLUMNS]
+
+
+# ------------------------------------------------------------------ readers
+class EventParser:
+    """Picks the RFM fields out of transaction CSV lines with a given header"""
+
+    def __init__(self, header):
+        header = next(csv.reader([header])) if isinstance(header, str) else list(header)
+        self.positions = [header.index(column) for column in RFM_COLUMNS]
+
+    def parse(self, lines):
+        """(customer_id, country, sale_date, amount) rows from raw CSV lines"""
+        customer, sale_date, country, amount = self.positions
+        rows = []
+        for fields in csv.reader(lines):
+            if len(fields) > max(self.positions):
+                rows.append((fields[customer], fields[country], fields[sale_date], fields[amount]))
+        return rows
+
+
+def tail_file(path, batch_size=DEFAULT_BATCH_SIZE, from_start=False, poll_interval=0.5, follow=True):
+    """
+    Yield micro-batches of lines appended to ``path`` (like ``tail -f``).
+
+    The first line is taken as the header and yielded alone first. With
+    ``follow=False`` the generator ends at the current end of the file.
+    """
+    with open(path) as f:
+        yield [f.readline()]
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        batch, partial = [], ''
+        while True:
+            line = f.readline()
+            if line:
+                partial += line
+                if partial.endswith('\n'):
+                    batch.append(partial)
+                    partial = ''
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+                continue
+            if batch:
+                yield batch
+                batch = []
+            if not follow:
+                return
+            time.sleep(poll_interval)
+
+
+def socket_lines(host='127.0.0.1', port=9009, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield micro-batches of CSV lines sent by clients to a local TCP socket.
+
+    A stand-in for a message queue: each client sends the header line, then
+    one transaction per line. The header of every connection is yielded
+    alone first.
+    """
+    with socket.create_server((host, port)) as server:
+        print(f"📡 Listening on {host}:{port}")
+        while True:
+            connection, _ = server.accept()
+            with connection, connection.makefile('r') as stream:
+                yield [stream.readline()]
+                batch = []
+                for line in stream:
+                    batch.append(line)
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+                if batch:
+                    yield batch
+
+
+def run(store, batches, progress=None):
+    """
+    Feed reader micro-batches into the store; returns (events, seconds).
+
+    ``progress(events, customers_updated)`` is called after every batch
+    when given; nothing is printed otherwise.
+    """
+    parser = None
+    start = time.perf_counter()
+    events = 0
+    for lines in batches:
+        if parser is None or (len(lines) == 1 and RFM_COLUMNS[0] in lines[0].split(',')):
+            parser = EventParser(lines[0])
+            continue
+        rows = parser.parse(lines)
+        touched = store.ingest(rows)
+        events += len(rows)
+        if progress is not None:
+            progress(events, len(touched))
+    return events, time.perf_counter() - start
+
+
+def print_progress(events, updated):
+    """Single-line console progress for run()"""
+    print(f"  {events:,} events, {updated:,} customers updated in last batch", end='\r', flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Update RFM segments online from a transaction stream')
+    parser.add_argument('--model', default=RFM_MODEL_FILE, help='Frozen model written by generate_full_rfm.py')
+    parser.add_argument('--table', default=TABLE_FILE, help='Batch RFM table to seed customer state from')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--output', default=None, help='Write the updated RFM table here on exit')
+    sources = parser.add_subparsers(dest='source', required=True)
+    tail = sources.add_parser('tail', help='Follow a transaction CSV file as it grows')
+    tail.add_argument('path')
+    tail.add_argument('--from-start', action='store_true', help='Replay the existing lines first')
+    tail.add_argument('--no-follow', action='store_true', help='Stop at the end of the file')
+    listen = sources.add_parser('socket', help='Accept transaction CSV lines on a local TCP socket')
+    listen.add_argument('--host', default='127.0.0.1')
+    listen.add_argument('--port', type=int, default=9009)
+    args = parser.parse_args()
+
+    store = OnlineRFM.from_batch(args.model, args.table)
+    print(f"🔄 Seeded {len(store.customers):,} customers from {args.table}")
+    if args.source == 'tail':
+        batches = tail_file(args.path, args.batch_size, args.from_start, follow=not args.no_follow)
+    else:
+        batches = socket_lines(args.host, args.port, args.batch_size)
+
+    try:
+        events, seconds = run(store, batches, progress=print_progress)
+        print(f"\n✅ {events:,} events in {seconds:.2f}s ({events / max(seconds, 1e-9):,.0f} events/s), "
+              f"{store.rejected} rejected")
+    except KeyboardInterrupt:
+        print(f"\n⏹️ Stopped after {store.processed:,} events")
+    if args.output:
+        store.to_frame().to_csv(args.output, index=False)
+        print(f"📁 Saved: {args.output}")
+    return store
+
+
+if __name__ == "__main__":
+    main()
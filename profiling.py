@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Wall-time and peak-memory measurement helpers
+Wall time is taken from runs without tracemalloc, which hooks every
+allocation and slows allocation-heavy code several times over, and peak
+traced memory is measured in a separate traced run
+"""
+
+import time
+import tracemalloc
+
+
+def time_call(func, *args, **kwargs):
+    """Run ``func`` untraced and return (result, wall seconds)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def peak_memory(func, *args, **kwargs):
+    """Run ``func`` under tracemalloc and return (result, peak traced memory in MB)"""
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        result = func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return result, peak / (1024 * 1024)
+
+
+def profile_call(func, *args, **kwargs):
+    """
+    Return (result, wall seconds, peak traced memory in MB) of ``func``.
+
+    ``func`` runs twice: once untraced for the time, then once traced for the
+    memory, so it must be safe to repeat (e.g. ``model.fit``). The result is
+    the untraced run's.
+    """
+    result, seconds = time_call(func, *args, **kwargs)
+    _, peak_mb = peak_memory(func, *args, **kwargs)
+    return result, seconds, peak_mb
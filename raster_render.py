@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Headless raster rendering of cluster scatter plots
+Points are binned onto a fixed pixel grid (majority label per pixel, shaded
+by density) and written straight to PNG, so the cost is one pass over the
+points no matter how many there are and no plotting library is needed
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+try:
+    from PIL import Image, ImageDraw
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+PANEL_WIDTH = 480
+PANEL_HEIGHT = 360
+TITLE_HEIGHT = 20
+PADDING = 8
+SPLAT_MAX_POINTS = 100_000
+
+# tab10 colours; noise (-1) is drawn grey
+PALETTE = np.array([
+    (31, 119, 180), (255, 127, 14), (44, 160, 44), (214, 39, 40), (148, 103, 189),
+    (140, 86, 75), (227, 119, 194), (127, 127, 127), (188, 189, 34), (23, 190, 207),
+], dtype=float)
+NOISE_COLOR = np.array((170, 170, 170), dtype=float)
+BACKGROUND = 255
+
+
+def padded_extent(x, y, margin=0.03):
+    """(xmin, xmax, ymin, ymax) with a small margin; constant axes get a unit range"""
+    extent = []
+    for values in (x, y):
+        low, high = float(np.min(values)), float(np.max(values))
+        pad = (high - low) * margin if high > low else 0.5
+        extent += [low - pad, high + pad]
+    return tuple(extent)
+
+
+def label_raster(x, y, labels, width=PANEL_WIDTH, height=PANEL_HEIGHT, extent=None, radius=None):
+    """
+    Bin points onto a width x height RGB image.
+
+    Each pixel takes the most frequent label among its points, blended
+    towards white where few points land. ``extent`` is (xmin, xmax, ymin,
+    ymax); ``radius`` spreads each point over a square of pixels and
+    defaults to 2 for small inputs (so sparse plots stay visible), else 0.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    xmin, xmax, ymin, ymax = extent if extent is not None else padded_extent(x, y)
+    if radius is None:
+        radius = 2 if len(x) <= SPLAT_MAX_POINTS else 0
+    cols = np.clip(((x - xmin) / (xmax - xmin) * (width - 1)).astype(np.int64), 0, width - 1)
+    rows = np.clip(((ymax - y) / (ymax - ymin) * (height - 1)).astype(np.int64), 0, height - 1)
+
+    values, codes = np.unique(np.asarray(labels), return_inverse=True)
+    counts = np.zeros(width * height * len(values), dtype=np.int64)
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            pixels = np.clip(rows + dy, 0, height - 1) * width + np.clip(cols + dx, 0, width - 1)
+            counts += np.bincount(pixels * len(values) + codes, minlength=len(counts))
+    counts = counts.reshape(width * height, len(values))
+    density = counts.sum(axis=1)
+    majority = counts.argmax(axis=1)
+
+    colors = np.array([NOISE_COLOR if value == -1 else PALETTE[i % len(PALETTE)]
+                       for i, value in enumerate(values)])
+    alpha = np.where(density > 0, 0.45 + 0.55 * np.log1p(density) / np.log1p(max(density.max(), 1)), 0.0)
+    image = BACKGROUND * (1 - alpha[:, None]) + colors[majority] * alpha[:, None]
+    return image.reshape(height, width, 3).round().astype(np.uint8)
+
+
+def _png_bytes(image):
+    """Encode an RGB uint8 array as PNG using only the standard library"""
+    height, width, _ = image.shape
+    # Every scanline starts with filter type 0 (none)
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), image.reshape(height, -1)], axis=1)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)) + chunk(b'IEND', b''))
+
+
+def render_label_panels(X2, label_sets, output_path, columns=2,
+                        width=PANEL_WIDTH, height=PANEL_HEIGHT):
+    """
+    Write a grid of raster scatter panels, one per labelling, to a PNG.
+
+    ``X2`` holds the two plotted coordinates per point and ``label_sets``
+    maps a panel title to that point's labels. Titles are drawn when
+    Pillow is available.
+    """
+    X2 = np.asarray(X2, dtype=float)
+    extent = padded_extent(X2[:, 0], X2[:, 1])
+    n_rows = -(-len(label_sets) // columns)
+    cell_w, cell_h = width + PADDING, height + TITLE_HEIGHT + PADDING
+    canvas = np.full((n_rows * cell_h + PADDING, columns * cell_w + PADDING, 3), BACKGROUND, dtype=np.uint8)
+
+    origins = []
+    for i, labels in enumerate(label_sets.values()):
+        top = PADDING + (i // columns) * cell_h + TITLE_HEIGHT
+        left = PADDING + (i % columns) * cell_w
+        canvas[top:top + height, left:left + width] = label_raster(X2[:, 0], X2[:, 1], labels,
+                                                                 width, height, extent)
+        origins.append((left, top - TITLE_HEIGHT))
+
+    if HAS_PIL:
+        image = Image.fromarray(canvas)
+        draw = ImageDraw.Draw(image)
+        for (left, top), (title, labels) in zip(origins, label_sets.items()):
+            n_clusters = len(np.unique(labels))
+            draw.text((left + 4, top + 4), f"{title} - clusters: {n_clusters}", fill=(0, 0, 0))
+        image.save(output_path)
+    else:
+        with open(output_path, 'wb') as f:
+            f.write(_png_bytes(canvas))
+    return output_path
@@ -0,0 +1,118 @@
+"""
+Precomputed dashboard aggregates over the RFM table
+Fixed-edge monetary histograms and a 5x5x5 R/F/M score cube are accumulated
+per filter partition when a table is loaded, so callbacks only reduce small
+arrays instead of grouping or binning customer rows
+"""
+
+import numpy as np
+
+from summary_engine import SummaryLookup, build_summary
+
+BIN_MODES = ('linear', 'log', 'quantile')
+N_BINS = 30
+
+
+def monetary_bin_edges(values, n_bins=N_BINS, mode='linear'):
+    """Bin edges for monetary values: equal width, log-spaced or equal count"""
+    values = np.asarray(values, dtype=float)
+    low, high = (values.min(), values.max()) if len(values) else (0.0, 1.0)
+    if high <= low:
+        high = low + 1.0
+    if mode == 'linear':
+        return np.linspace(low, high, n_bins + 1)
+    if mode == 'log':
+        # log1p spacing keeps zero-value customers in the first bin
+        low = max(low, 0.0)
+        edges = np.expm1(np.linspace(np.log1p(low), np.log1p(high), n_bins + 1))
+        # Pin the ends so rounding in expm1/log1p cannot leave the extremes outside
+        edges[0], edges[-1] = low, high
+        return edges
+    if mode == 'quantile':
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)))
+        return edges if len(edges) > 1 else np.array([low, high])
+    raise ValueError(f"Unknown bin mode '{mode}', expected one of {BIN_MODES}")
+
+
+def bin_codes(values, edges):
+    """Bin index of each value; the maximum falls in the last bin"""
+    codes = np.searchsorted(edges, values, side='right') - 1
+    return np.clip(codes, 0, len(edges) - 2)
+
+
+class MonetaryHistogram:
+    """Monetary histogram counts per segment x cluster x country partition"""
+
+    def __init__(self, df, index, n_bins=N_BINS, modes=BIN_MODES):
+        monetary = df['monetary'].to_numpy(dtype=float)
+        self.index = index
+        self.edges = {}
+        self.cubes = {}
+        for mode in modes:
+            edges = monetary_bin_edges(monetary, n_bins, mode)
+            self.edges[mode] = edges
+            self.cubes[mode] = index.accumulate(bin_codes(monetary, edges), len(edges) - 1)
+
+    def counts(self, mode='linear', **selection):
+        """Bin edges and per-bin customer counts for a selection"""
+        return self.edges[mode], self.index.reduce(self.cubes[mode], **selection)
+
+
+SCORES = ('r', 'f', 'm')
+SCORE_LEVELS = 5
+SCORE_METRICS = ('score', 'count', 'monetary', 'recency', 'frequency')
+
+
+class ScoreCube:
+    """Customer counts and metric sums per (r, f, m) cell for every filter partition"""
+
+    def __init__(self, df, index):
+        self.index = index
+        scores = np.clip(df[list(SCORES)].to_numpy(dtype=np.int64), 1, SCORE_LEVELS) - 1
+        cells = (scores[:, 0] * SCORE_LEVELS + scores[:, 1]) * SCORE_LEVELS + scores[:, 2]
+        n_cells = SCORE_LEVELS ** len(SCORES)
+        self.counts = index.accumulate(cells, n_cells)
+        self.sums = {
+            metric: index.accumulate(cells, n_cells, weights=df[metric].to_numpy(dtype=float))
+            for metric in ('monetary', 'recency', 'frequency')
+        }
+
+    def _cube(self, cube, selection):
+        return self.index.reduce(cube, **selection).reshape((SCORE_LEVELS,) * len(SCORES))
+
+    def heatmap(self, pair='rf', metric='score', **selection):
+        """
+        5x5 grid over two scores (``pair`` such as 'rf', 'rm' or 'fm').
+
+        ``metric`` is 'score' (mean of the remaining score), 'count', or the
+        mean of 'monetary', 'recency' or 'frequency'. Empty cells are 0.
+        """
+        axes = tuple(SCORES.index(score) for score in pair)
+        other = next(axis for axis in range(len(SCORES)) if axis not in axes)
+        counts = self._cube(self.counts, selection)
+
+        if metric == 'count':
+            totals = counts
+        elif metric == 'score':
+            levels = np.arange(1, SCORE_LEVELS + 1).reshape([-1 if axis == other else 1 for axis in range(3)])
+            totals = counts * levels
+        else:
+            totals = self._cube(self.sums[metric], selection)
+
+        grid_counts = counts.sum(axis=other)
+        grid = totals.sum(axis=other)
+        if axes[0] > axes[1]:
+            grid_counts, grid = grid_counts.T, grid.T
+        if metric == 'count':
+            return grid.astype(float)
+        return np.where(grid_counts > 0, grid / np.maximum(grid_counts, 1), 0.0)
+
+
+class DashboardAggregates:
+    """All precomputed aggregates for one installed RFM table"""
+
+    def __init__(self, df, index, summary=None):
+        self.monetary = MonetaryHistogram(df, index)
+        self.scores = ScoreCube(df, index)
+        # The pipeline's flat summary table when available, else built from the table
+        self.summary = SummaryLookup(summary if summary is not None else build_summary(df))
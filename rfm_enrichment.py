@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Share-of-spend enrichment of the RFM table
+Product category, sales channel and (optionally) payment method spend is
+accumulated per customer in one sparse aggregation over the transactions
+and divided by the customer's total spend, giving a CSR matrix with one
+column per dimension value. Only the (customer, value) pairs that occur
+are stored, so memory follows the transactions rather than customers x
+values
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from generate_full_rfm import TRANSACTIONS_FILE
+from transaction_ingest import RFM_COLUMNS, read_transactions
+
+ENRICHMENT_DIMENSIONS = ('Product_Category', 'Sales_Channel', 'Payment_Method')
+DEFAULT_DIMENSIONS = ('Product_Category', 'Sales_Channel')
+
+
+def load_enrichment_transactions(path=TRANSACTIONS_FILE, dimensions=DEFAULT_DIMENSIONS):
+    """Transactions with the RFM key, amount and the enrichment dimensions (invalid dates dropped)"""
+    unknown = [dim for dim in dimensions if dim not in ENRICHMENT_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown enrichment dimensions {unknown}, expected some of {list(ENRICHMENT_DIMENSIONS)}")
+    df = read_transactions(path, columns=RFM_COLUMNS + list(dimensions))
+    df = df.dropna(subset=['Sale_Date'])
+    return df.rename(columns={'Customer_ID': 'id', 'Region': 'country', 'Sales_Amount': 'monetary'})
+
+
+def share_of_spend(transactions, customers, dimensions=DEFAULT_DIMENSIONS):
+    """
+    Per-customer share of spend for every value of each dimension.
+
+    ``customers`` is the RFM table (its id/country rows define the matrix
+    rows); transactions of customers not in it are ignored. Returns a CSR
+    matrix (customers x values, each dimension's shares summing to 1 for a
+    customer with positive spend) and the column names.
+    """
+    keys = pd.MultiIndex.from_arrays([customers['id'], customers['country'].astype(str)])
+    rows = keys.get_indexer(pd.MultiIndex.from_arrays([transactions['id'],
+                                                       transactions['country'].astype(str)]))
+    known = rows >= 0
+    rows = rows[known]
+    amount = transactions['monetary'].to_numpy(dtype=float)[known]
+
+    # Every dimension's values get their own column block of one COO matrix;
+    # converting to CSR sums the duplicates, i.e. the groupby
+    columns, names, offset = [], [], 0
+    for dim in dimensions:
+        codes, values = pd.factorize(transactions[dim].to_numpy()[known], sort=True)
+        columns.append(np.where(codes >= 0, codes + offset, -1))
+        names.extend(f'{dim}={value}' for value in values)
+        offset += len(values)
+    all_rows = np.tile(rows, len(dimensions))
+    all_columns = np.concatenate(columns) if columns else np.array([], dtype=np.int64)
+    valid = all_columns >= 0
+    spend = sparse.coo_matrix((np.tile(amount, len(dimensions))[valid], (all_rows[valid], all_columns[valid])),
+                              shape=(len(customers), offset)).tocsr()
+
+    total = np.bincount(rows, weights=amount, minlength=len(customers))
+    scale = np.divide(1.0, total, out=np.zeros_like(total), where=total > 0)
+    return sparse.diags(scale).dot(spend).tocsr(), names
+
+
+def enrich(rfm, path=TRANSACTIONS_FILE, dimensions=DEFAULT_DIMENSIONS):
+    """Share-of-spend features aligned with the rows of an RFM table"""
+    return share_of_spend(load_enrichment_transactions(path, dimensions), rfm, dimensions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build sparse share-of-spend features for the RFM table')
+    parser.add_argument('--input', default=TRANSACTIONS_FILE)
+    parser.add_argument('--table', default='rfm_segments_output_full.csv')
+    parser.add_argument('--dimensions', nargs='+', choices=ENRICHMENT_DIMENSIONS, default=list(DEFAULT_DIMENSIONS))
+    parser.add_argument('--output', default=None, help='Save the matrix as a .npz file')
+    args = parser.parse_args()
+
+    rfm = pd.read_csv(args.table)
+    features, names = enrich(rfm, args.input, args.dimensions)
+    density = features.nnz / max(features.shape[0] * features.shape[1], 1)
+    print(f"🧮 {features.shape[0]:,} customers x {features.shape[1]} features, "
+          f"{features.nnz:,} stored values ({density:.1%} dense)")
+    for name, mean in zip(names, np.asarray(features.mean(axis=0)).ravel()):
+        print(f"  {name:35} mean share {mean:.3f}")
+    if args.output:
+        sparse.save_npz(args.output, features)
+        print(f"📁 Saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Scalable counterparts of the Gaussian Mixture and Agglomerative models
+Gaussian Mixture is fit on a random sample and predicts in batches, and
+Agglomerative clustering runs on compact summaries of the data (BIRCH
+subclusters or K-Means micro-clusters) instead of the full O(n^2) problem
+"""
+
+import numpy as np
+from scipy import sparse
+from sklearn.base import BaseEstimator, ClusterMixin
+from sklearn.cluster import AgglomerativeClustering, Birch, MiniBatchKMeans
+from sklearn.mixture import GaussianMixture
+from sklearn.neighbors import kneighbors_graph
+
+
+def _batched_predict(predict, X, batch_size):
+    """Apply ``predict`` over row batches so memory stays bounded on large inputs"""
+    X = X.tocsr() if sparse.issparse(X) else np.asarray(X)
+    n_rows = X.shape[0]
+    if n_rows <= batch_size:
+        return predict(X)
+    return np.concatenate([predict(X[start:start + batch_size]) for start in range(0, n_rows, batch_size)])
+
+
+class SampledGaussianMixture(ClusterMixin, BaseEstimator):
+    """Gaussian Mixture fit by EM on a uniform sample, then applied to every point in batches"""
+
+    def __init__(self, n_components=4, sample_size=20_000, batch_size=100_000,
+                 covariance_type='full', random_state=42):
+        self.n_components = n_components
+        self.sample_size = sample_size
+        self.batch_size = batch_size
+        self.covariance_type = covariance_type
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        if sparse.issparse(X):
+            raise TypeError("Gaussian Mixture needs dense input")
+        X = np.asarray(X)
+        if len(X) > self.sample_size:
+            rng = np.random.default_rng(self.random_state)
+            sample = X[rng.choice(len(X), self.sample_size, replace=False)]
+        else:
+            sample = X
+        self.mixture_ = GaussianMixture(n_components=self.n_components, covariance_type=self.covariance_type,
+                                        random_state=self.random_state).fit(sample)
+        self.n_fit_samples_ = len(sample)
+        return self
+
+    def predict(self, X):
+        return _batched_predict(self.mixture_.predict, X, self.batch_size)
+
+    def fit_predict(self, X, y=None):
+        return self.fit(X).predict(X)
+
+
+class MicroClusterAgglomerative(ClusterMixin, BaseEstimator):
+    """
+    Connectivity-constrained Agglomerative clustering of K-Means micro-clusters.
+
+    Points are summarized by ``n_micro_clusters`` mini-batch K-Means centers,
+    the centers are merged with a k-nearest-neighbor connectivity graph, and
+    every point takes the label of its micro-cluster.
+    """
+
+    def __init__(self, n_clusters=4, n_micro_clusters=256, n_neighbors=10, linkage='ward',
+                 batch_size=4096, random_state=42):
+        self.n_clusters = n_clusters
+        self.n_micro_clusters = n_micro_clusters
+        self.n_neighbors = n_neighbors
+        self.linkage = linkage
+        self.batch_size = batch_size
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        # Mini-batch K-Means takes sparse rows; only the micro-cluster centers are dense
+        X = X.tocsr() if sparse.issparse(X) else np.asarray(X)
+        n_micro = max(min(self.n_micro_clusters, X.shape[0]), self.n_clusters)
+        self.micro_ = MiniBatchKMeans(n_clusters=n_micro, batch_size=self.batch_size, n_init=3,
+                                      random_state=self.random_state).fit(X)
+        self.merge(self.n_clusters)
+        return self
+
+    def merge(self, n_clusters):
+        """Re-merge the fitted micro-clusters into ``n_clusters`` clusters and return point labels"""
+        centers = self.micro_.cluster_centers_
+        connectivity = kneighbors_graph(centers, min(self.n_neighbors, len(centers) - 1), include_self=False)
+        merge = AgglomerativeClustering(n_clusters=n_clusters, connectivity=connectivity,
+                                        linkage=self.linkage).fit(centers)
+        self.n_clusters = n_clusters
+        self.center_labels_ = merge.labels_
+        self.labels_ = self.center_labels_[self.micro_.labels_]
+        return self.labels_
+
+    def predict(self, X):
+        return self.center_labels_[_batched_predict(self.micro_.predict, X, self.batch_size)]
+
+    def fit_predict(self, X, y=None):
+        return self.fit(X).labels_
+
+
+def birch_agglomerative(n_clusters=4, threshold=0.5, branching_factor=50):
+    """BIRCH pre-clustering with Agglomerative clustering as the global step on its subclusters"""
+    return Birch(threshold=threshold, branching_factor=branching_factor,
+                 n_clusters=AgglomerativeClustering(n_clusters=n_clusters))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Segment transition tracking between two RFM snapshots
+Streams both snapshots in chunks and joins them with a sorted merge on
+(id, country), producing a segment transition matrix and a compact
+per-customer change log without loading either file in full
+"""
+
+import argparse
+import os
+
+import pandas as pd
+
+from snapshot_store import SnapshotStore
+
+KEY = ['id', 'country']
+NEW = '(new)'
+GONE = '(gone)'
+DEFAULT_CHUNKSIZE = 500_000
+
+
+def _read_sorted_chunks(path, chunksize, store=None):
+    """Yield (id, country, segment) chunks, checking the file is sorted on the key"""
+    last = None
+    if store is not None:
+        # ``path`` is a run date; snapshot row groups are already sorted on the key
+        reader = (chunk.astype({'country': str, 'segment': str})
+                  for chunk in store.row_groups(path, KEY + ['segment']))
+    else:
+        reader = pd.read_csv(path, usecols=KEY + ['segment'], chunksize=chunksize,
+                             dtype={'id': 'int64', 'country': str, 'segment': str})
+    for chunk in reader:
+        if chunk.empty:
+            continue
+        ids = chunk['id'].to_numpy()
+        countries = chunk['country'].to_numpy(dtype=str)
+        unsorted = (ids[1:] < ids[:-1]) | ((ids[1:] == ids[:-1]) & (countries[1:] < countries[:-1]))
+        if unsorted.any() or (last is not None and (ids[0], countries[0]) < last):
+            raise ValueError(f"{path} is not sorted by (id, country)")
+        last = (ids[-1], countries[-1])
+        yield chunk.reset_index(drop=True)
+
+
+def _upto(df, key):
+    """Mask of rows whose (id, country) is <= key"""
+    key_id, key_country = key
+    return (df['id'] < key_id) | ((df['id'] == key_id) & (df['country'] <= key_country))
+
+
+def merge_snapshots(previous_path, current_path, chunksize=DEFAULT_CHUNKSIZE, store=None):
+    """
+    Sorted merge of two snapshots, yielding joined blocks.
+
+    Each block has columns id, country, previous_segment and current_segment;
+    customers missing from one side get '(new)' or '(gone)'. With a
+    SnapshotStore, the two snapshots are run dates in it instead of CSV paths.
+    """
+    streams = [_read_sorted_chunks(previous_path, chunksize, store),
+               _read_sorted_chunks(current_path, chunksize, store)]
+    buffers = [None, None]
+    done = [False, False]
+
+    while True:
+        for side in (0, 1):
+            if (buffers[side] is None or buffers[side].empty) and not done[side]:
+                buffers[side] = next(streams[side], None)
+                done[side] = buffers[side] is None
+        if all(b is None or b.empty for b in buffers):
+            return
+
+        # Only rows up to the smaller of the two buffer tails are safe to join
+        tails = [tuple(b.iloc[-1][KEY]) for b, d in zip(buffers, done) if b is not None and not b.empty and not d]
+        bound = min(tails) if not any(done) else None
+
+        parts = []
+        for side in (0, 1):
+            buffer = buffers[side]
+            if buffer is None or buffer.empty:
+                parts.append(pd.DataFrame(columns=KEY + ['segment']).astype({'id': 'int64'}))
+                continue
+            mask = _upto(buffer, bound) if bound is not None else pd.Series(True, index=buffer.index)
+            parts.append(buffer[mask])
+            buffers[side] = buffer[~mask].reset_index(drop=True)
+
+        block = parts[0].merge(parts[1], on=KEY, how='outer', suffixes=('_previous', '_current'), sort=True)
+        block = block.rename(columns={'segment_previous': 'previous_segment',
+                                      'segment_current': 'current_segment'})
+        block['previous_segment'] = block['previous_segment'].fillna(NEW)
+        block['current_segment'] = block['current_segment'].fillna(GONE)
+        if not block.empty:
+            yield block
+
+
+def track_transitions(previous_path, current_path, matrix_path='segment_transition_matrix.csv',
+                      changes_path='segment_changes.csv', chunksize=DEFAULT_CHUNKSIZE, store=None):
+    """Write the transition matrix and change log between two snapshots"""
+    print("Tracking segment transitions...")
+    counts = None
+    n_changed = 0
+    header = True
+    tmp_changes = f'{changes_path}.tmp'
+    with open(tmp_changes, 'w') as changes:
+        for block in merge_snapshots(previous_path, current_path, chunksize, store):
+            block_counts = block.groupby(['previous_segment', 'current_segment']).size()
+            counts = block_counts if counts is None else counts.add(block_counts, fill_value=0)
+            changed = block[block['previous_segment'] != block['current_segment']]
+            changed.to_csv(changes, header=header, index=False)
+            header = False
+            n_changed += len(changed)
+        if header:
+            pd.DataFrame(columns=KEY + ['previous_segment', 'current_segment']).to_csv(changes, index=False)
+    os.replace(tmp_changes, changes_path)
+
+    if counts is None:
+        matrix = pd.DataFrame()
+    else:
+        matrix = counts.astype('int64').unstack(fill_value=0)
+    matrix.to_csv(matrix_path)
+
+    print(f"📁 Saved: {matrix_path}")
+    print(f"📁 Saved: {changes_path} ({n_changed} customers changed segment)")
+    return matrix, n_changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Track segment transitions between two RFM snapshots')
+    parser.add_argument('previous', help='Previous RFM snapshot CSV (sorted by id, country), or run date with --store')
+    parser.add_argument('current', help='Current RFM snapshot CSV (sorted by id, country), or run date with --store')
+    parser.add_argument('--store', default=None, metavar='DIR',
+                        help='Compare two run dates of this snapshot store instead of CSV files')
+    parser.add_argument('--matrix', default='segment_transition_matrix.csv')
+    parser.add_argument('--changes', default='segment_changes.csv')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.store) if args.store else None
+    matrix, _ = track_transitions(args.previous, args.current, args.matrix, args.changes, args.chunksize, store)
+    print("\n=== SEGMENT TRANSITIONS (rows: previous, columns: current) ===")
+    print(matrix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Partitioned snapshot history of the RFM outputs
+Every run is stored in its own run_date=YYYY-MM-DD partition as Parquet
+files (rfm.parquet, and summary.parquet when a summary is given), with the
+RFM table sorted by (id, country) and written in fixed-size row groups.
+Reads go through pyarrow.parquet with the filters pushed down, so row groups
+whose min/max statistics exclude a query are never decompressed: a past
+snapshot or one customer's history across runs never reads the whole archive
+"""
+
+import argparse
+import os
+import shutil
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SNAPSHOT_DIR = os.environ.get('RFM_SNAPSHOT_DIR', 'rfm_snapshots')
+PARTITION_PREFIX = 'run_date='
+TABLE_SUFFIX = '.parquet'
+DEFAULT_ROW_GROUP_ROWS = 100_000
+KEY = ['id', 'country']
+
+
+def _parquet_filters(filters):
+    """read() filters to pyarrow's [(column, op, value), ...] conjunction"""
+    predicates = []
+    for column, condition in (filters or {}).items():
+        if not isinstance(condition, tuple):
+            predicates.append((column, '==', condition))
+            continue
+        low, high = condition
+        if low is not None:
+            predicates.append((column, '>=', low))
+        if high is not None:
+            predicates.append((column, '<=', high))
+    return predicates or None
+
+
+def _write_table(df, path, row_group_rows):
+    """Write ``df`` to one Parquet file, keeping its pandas dtypes in the schema metadata"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(table, path, row_group_size=max(row_group_rows, 1), compression='zstd')
+
+
+class SnapshotStore:
+    """Run-date partitioned history of RFM tables (and their summary tables)"""
+
+    def __init__(self, root=SNAPSHOT_DIR, row_group_rows=DEFAULT_ROW_GROUP_ROWS):
+        self.root = root
+        self.row_group_rows = row_group_rows
+
+    def partition_path(self, run_date):
+        return os.path.join(self.root, f'{PARTITION_PREFIX}{run_date}')
+
+    def table_path(self, run_date, table='rfm'):
+        return os.path.join(self.partition_path(run_date), f'{table}{TABLE_SUFFIX}')
+
+    def run_dates(self):
+        """Run dates with a snapshot, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name[len(PARTITION_PREFIX):] for name in os.listdir(self.root)
+                      if name.startswith(PARTITION_PREFIX)
+                      and os.path.exists(os.path.join(self.root, name, f'rfm{TABLE_SUFFIX}')))
+
+    def resolve(self, run_date=None):
+        """Normalized run date of an existing snapshot (None = the latest)"""
+        dates = self.run_dates()
+        if not dates:
+            raise FileNotFoundError(f"No snapshots in {self.root}")
+        if run_date is None:
+            return dates[-1]
+        run_date = pd.Timestamp(run_date).strftime('%Y-%m-%d')
+        if run_date not in dates:
+            raise ValueError(f"No snapshot for run date {run_date} (have {dates[0]} to {dates[-1]})")
+        return run_date
+
+    def _table_file(self, run_date, table, columns=None, filters=None):
+        """Path of one snapshot table, checking the table and requested columns exist"""
+        path = self.table_path(run_date, table)
+        if not os.path.exists(path):
+            raise ValueError(f"Snapshot {run_date} has no {table} table")
+        names = pq.read_schema(path).names
+        unknown = [column for column in set(columns or []) | set(filters or {}) if column not in names]
+        if unknown:
+            raise ValueError(f"Unknown columns {sorted(unknown)}, expected some of {names}")
+        return path
+
+    def metadata(self, run_date=None, table='rfm'):
+        """Parquet footer (rows, row groups, column statistics) of one snapshot table"""
+        run_date = self.resolve(run_date)
+        return pq.ParquetFile(self._table_file(run_date, table)).metadata
+
+    def write(self, rfm, summary=None, run_date=None):
+        """Store a run's RFM table (and flat summary) as the partition for ``run_date`` (default today)"""
+        run_date = pd.Timestamp(run_date or date.today()).strftime('%Y-%m-%d')
+        partition = self.partition_path(run_date)
+        # The leading dot keeps a half-written partition out of run_dates()
+        tmp_partition = os.path.join(self.root, f'.tmp-{PARTITION_PREFIX}{run_date}')
+        shutil.rmtree(tmp_partition, ignore_errors=True)
+        os.makedirs(tmp_partition)
+
+        # Sorted on the customer key so row-group id ranges stay narrow for history reads
+        order = np.lexsort((rfm['country'].astype(str).to_numpy(), rfm['id'].to_numpy()))
+        _write_table(rfm.iloc[order].reset_index(drop=True),
+                     os.path.join(tmp_partition, f'rfm{TABLE_SUFFIX}'), self.row_group_rows)
+        if summary is not None:
+            _write_table(summary.reset_index(drop=True),
+                         os.path.join(tmp_partition, f'summary{TABLE_SUFFIX}'), len(summary))
+
+        # A rerun on the same day replaces that day's partition
+        shutil.rmtree(partition, ignore_errors=True)
+        os.replace(tmp_partition, partition)
+        return run_date
+
+    def row_groups(self, run_date=None, columns=None, table='rfm'):
+        """Yield one snapshot table a row group at a time, in stored (id, country) order"""
+        run_date = self.resolve(run_date)
+        parquet = pq.ParquetFile(self._table_file(run_date, table, columns))
+        for group in range(parquet.num_row_groups):
+            yield parquet.read_row_group(group, columns=columns).to_pandas()
+
+    def read(self, run_date=None, columns=None, filters=None, table='rfm'):
+        """
+        One snapshot's table (default the latest run's RFM table).
+
+        ``filters`` maps columns to a value or an inclusive (low, high)
+        tuple (None for an open end); they are pushed down to the Parquet
+        reader, which skips row groups whose statistics exclude them.
+        """
+        run_date = self.resolve(run_date)
+        path = self._table_file(run_date, table, columns, filters)
+        return pq.read_table(path, columns=columns, filters=_parquet_filters(filters)).to_pandas()
+
+    def read_summary(self, run_date=None):
+        """One snapshot's flat summary table"""
+        return self.read(run_date, table='summary')
+
+    def customer_history(self, customer_id, country=None, columns=None):
+        """One customer's rows across every snapshot, oldest first, with a run_date column"""
+        filters = {'id': int(customer_id)}
+        if country is not None:
+            filters['country'] = country
+        frames = [self.read(run_date, columns, filters).assign(run_date=run_date)
+                  for run_date in self.run_dates()]
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return pd.DataFrame(columns=['run_date'] + (columns or []))
+        history = pd.concat(frames, ignore_index=True)
+        return history[['run_date'] + [column for column in history.columns if column != 'run_date']]
+
+    def disk_bytes(self, run_date=None):
+        """Compressed size of one snapshot partition"""
+        partition = self.partition_path(self.resolve(run_date))
+        return sum(os.path.getsize(os.path.join(partition, name)) for name in os.listdir(partition))
+
+
+def parse_filters(expressions):
+    """``column=value`` or ``column=low..high`` expressions to read() filters"""
+    def parse_value(text):
+        if text == '':
+            return None
+        try:
+            return int(text)
+        except ValueError:
+            try:
+                return float(text)
+            except ValueError:
+                return text
+
+    filters = {}
+    for expression in expressions or []:
+        column, sep, value = expression.partition('=')
+        if not sep:
+            raise ValueError(f"Expected column=value or column=low..high, got {expression!r}")
+        low, dots, high = value.partition('..')
+        filters[column] = (parse_value(low), parse_value(high)) if dots else parse_value(value)
+    return filters
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Snapshot history of the RFM outputs')
+    parser.add_argument('--root', default=SNAPSHOT_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    write = commands.add_parser('write', help='Snapshot the current RFM output files')
+    write.add_argument('--table', default='rfm_segments_output_full.csv')
+    write.add_argument('--summary', default='rfm_segment_summary_full.csv')
+    write.add_argument('--run-date', default=None, help='Partition date (YYYY-MM-DD, default today)')
+
+    commands.add_parser('list', help='List the stored snapshots')
+
+    show = commands.add_parser('show', help='Read one snapshot')
+    show.add_argument('run_date', nargs='?', default=None, help='Run date (default the latest)')
+    show.add_argument('--where', nargs='+', default=[], metavar='FILTER',
+                      help='column=value or column=low..high (either end may be empty)')
+    show.add_argument('--columns', nargs='+', default=None)
+    show.add_argument('--summary', action='store_true', help='Read the summary table instead')
+    show.add_argument('--output', default=None, help='Write the rows to this CSV')
+
+    history = commands.add_parser('history', help="One customer's rows across all snapshots")
+    history.add_argument('customer_id', type=int)
+    history.add_argument('--country', default=None)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.root)
+    if args.command == 'write':
+        from summary_engine import load_summary
+        summary = load_summary(args.summary) if os.path.exists(args.summary) else None
+        run_date = store.write(pd.read_csv(args.table), summary, args.run_date)
+        print(f"📁 Saved snapshot {run_date} ({store.disk_bytes(run_date) / 1e6:.2f} MB)")
+    elif args.command == 'list':
+        for run_date in store.run_dates():
+            metadata = store.metadata(run_date)
+            print(f"{run_date}: {metadata.num_rows:,} customers, {metadata.num_row_groups} row groups, "
+                  f"{store.disk_bytes(run_date) / 1e6:.2f} MB")
+    elif args.command == 'show':
+        table = 'summary' if args.summary else 'rfm'
+        df = store.read(args.run_date, args.columns, parse_filters(args.where), table)
+        if args.output:
+            df.to_csv(args.output, index=False)
+            print(f"📁 Saved: {args.output} ({len(df):,} rows)")
+        else:
+            print(df.to_string(index=False, max_rows=50))
+    else:
+        print(store.customer_history(args.customer_id, args.country).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Embedded SQL backend for RFM computation and dashboard queries
+Runs in-process on DuckDB when installed (querying the CSV directly) or on
+the standard-library SQLite (after streaming the file into a table). RFM
+metrics, quintile scores and segments are computed with SQL aggregate and
+window functions. rows/counts/summary/rollup answer segment, cluster and
+country selections as SQL queries; the Dash app serves its filters, counts
+and summary cards through them when run with RFM_DASH_BACKEND=sql
+"""
+
+import argparse
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import duckdb
+    HAS_DUCKDB = True
+except ImportError:
+    HAS_DUCKDB = False
+
+from transaction_ingest import DATE_FORMAT, iter_transactions
+
+ENGINES = ('duckdb', 'sqlite')
+DIMENSIONS = ('segment', 'cluster', 'country')
+ALL = 'all'
+QUINTILES = (1, 2, 3, 4)
+INGEST_CHUNK_ROWS = 1_000_000
+
+# Same order as generate_full_rfm.assign_customer_segments: the first match wins
+SEGMENT_RULES = [
+    ("code = '22'", 'hibernating'),
+    ("r <= 2 AND fm <= 2", 'lost'),
+    ("code = '15'", "can't lose"),
+    ("r <= 2 AND fm >= 3", 'at risk'),
+    ("r = 3 AND fm <= 2", 'about to sleep'),
+    ("code = '33'", 'need attention'),
+    ("code = '55'", 'champions'),
+    ("r >= 3 AND fm >= 4", 'loyal customers'),
+    ("code = '41'", 'promising'),
+    ("code = '51'", 'new customers'),
+    ("r >= 4 AND fm IN (2, 3)", 'potential loyalists'),
+]
+
+
+def _quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class SQLBackend:
+    """In-process SQL engine holding a ``transactions`` relation and an ``rfm`` table"""
+
+    def __init__(self, database=':memory:', engine='auto'):
+        if engine == 'auto':
+            engine = 'duckdb' if HAS_DUCKDB else 'sqlite'
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+        if engine == 'duckdb' and not HAS_DUCKDB:
+            raise ImportError("duckdb is not installed; use engine='sqlite'")
+        self.engine = engine
+        # Shared by the dashboard's callback threads, one statement at a time
+        self.conn = (duckdb.connect(database) if engine == 'duckdb'
+                     else sqlite3.connect(database, check_same_thread=False))
+        self._lock = threading.RLock()
+        # Integer division differs: '/' is float division in DuckDB
+        self._idiv = '//' if engine == 'duckdb' else '/'
+
+    def execute(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params)
+
+    def query(self, sql, params=()):
+        """Run a query and return the result as a DataFrame"""
+        with self._lock:
+            cursor = self.conn.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+    def rfm_columns(self):
+        """Column names of the ``rfm`` table"""
+        with self._lock:
+            return [column[0] for column in self.conn.execute("SELECT * FROM rfm LIMIT 0").description]
+
+    def _check_columns(self, columns, allowed):
+        """Reject names that are not columns, since they are spliced into the SQL text"""
+        unknown = [column for column in columns if column not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown columns {unknown}, expected some of {list(allowed)}")
+
+    # ---------------------------------------------------------------- loading
+    def load_transactions(self, path):
+        """Expose the transaction file as ``transactions(id, country, day, monetary)``"""
+        if self.engine == 'duckdb':
+            # Queried in place: DuckDB scans only the projected CSV columns
+            self.execute(f"""
+                CREATE OR REPLACE VIEW transactions AS
+                SELECT * FROM (
+                    SELECT CAST(Customer_ID AS BIGINT) AS id,
+                           CAST(Region AS VARCHAR) AS country,
+                           date_diff('day', DATE '1970-01-01',
+                                     CAST(try_strptime(CAST(Sale_Date AS VARCHAR), '{DATE_FORMAT}') AS DATE)) AS day,
+                           CAST(Sales_Amount AS DOUBLE) AS monetary
+                    FROM read_csv({_quote(path)}, header = true)
+                ) WHERE day IS NOT NULL AND id IS NOT NULL AND monetary IS NOT NULL
+            """)
+            return self
+
+        self.execute("DROP TABLE IF EXISTS transactions")
+        self.execute("CREATE TABLE transactions (id INTEGER, country TEXT, day INTEGER, monetary REAL)")
+        # Same typing and row filtering as the pandas pipeline's read_transactions
+        for chunk in iter_transactions(path, INGEST_CHUNK_ROWS):
+            chunk = chunk.dropna(subset=['Sale_Date'])
+            days = chunk['Sale_Date'].to_numpy().astype('datetime64[D]').astype('int64')
+            rows = zip(chunk['Customer_ID'].astype('int64').tolist(), chunk['Region'].astype(str).tolist(),
+                       days.tolist(), chunk['Sales_Amount'].tolist())
+            with self._lock:
+                self.conn.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?)", rows)
+        with self._lock:
+            self.conn.commit()
+        return self
+
+    def load_rfm_table(self, path):
+        """Expose an RFM output CSV (e.g. rfm_segments_output_full.csv) as the ``rfm`` table"""
+        if self.engine == 'duckdb':
+            self.execute(f"CREATE OR REPLACE TABLE rfm AS SELECT * FROM read_csv({_quote(path)}, header = true)")
+        else:
+            with self._lock:
+                self.conn.execute("DROP TABLE IF EXISTS rfm")
+                for chunk in pd.read_csv(path, chunksize=INGEST_CHUNK_ROWS):
+                    chunk.to_sql('rfm', self.conn, if_exists='append', index=False)
+                self._index_rfm()
+        return self
+
+    def load_rfm_frame(self, df):
+        """Copy an in-memory RFM table (e.g. the dashboard's published one) into the ``rfm`` table"""
+        # Categorical columns are stored as their values
+        df = df.astype({column: str for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)})
+        with self._lock:
+            if self.engine == 'duckdb':
+                self.conn.register('rfm_frame', df)
+                self.conn.execute("CREATE OR REPLACE TABLE rfm AS SELECT * FROM rfm_frame")
+                self.conn.unregister('rfm_frame')
+            else:
+                df.to_sql('rfm', self.conn, if_exists='replace', index=False)
+                self._index_rfm()
+        return self
+
+    def _index_rfm(self):
+        if self.engine == 'sqlite':
+            columns = self.rfm_columns()
+            with self._lock:
+                for dim in DIMENSIONS:
+                    if dim in columns:
+                        self.conn.execute(f"CREATE INDEX IF NOT EXISTS rfm_{dim} ON rfm ({dim})")
+                self.conn.commit()
+
+    # ------------------------------------------------------------ computation
+    def _quantiles_sql(self, column):
+        """Linear-interpolation quintiles of one rfm_metrics column (pandas' default method)"""
+        d = self._idiv
+        selects = []
+        for k in QUINTILES:
+            low = f"((n - 1) * {k}) {d} 5"
+            fraction = f"(((n - 1) * {k}) % 5) / 5.0"
+            x_low = f"MAX(CASE WHEN rn = {low} THEN x END)"
+            x_high = f"MAX(CASE WHEN rn = {low} + 1 THEN x END)"
+            selects.append(f"{x_low} + {fraction} * (COALESCE({x_high}, {x_low}) - {x_low}) AS {column[0]}q{k}")
+        return f"""
+            SELECT {', '.join(selects)}
+            FROM (SELECT {column} AS x, ROW_NUMBER() OVER (ORDER BY {column}) - 1 AS rn,
+                         COUNT(*) OVER () AS n
+                  FROM rfm_metrics) ranked
+            GROUP BY n
+        """
+
+    def compute_rfm(self, window_days=None):
+        """
+        RFM metrics, 1-5 scores and segments for every (id, country), as the ``rfm`` table.
+
+        Matches calculate_rfm_metrics, calculate_rfm_scores and
+        assign_customer_segments on the same (optionally windowed) data.
+        """
+        # Rebuilt under the lock so concurrent queries never see a half-built rfm table
+        with self._lock:
+            window = "" if window_days is None else f"WHERE t.day > b.max_day - {int(window_days)}"
+            self.execute("DROP TABLE IF EXISTS rfm_metrics")
+            self.execute(f"""
+                CREATE TABLE rfm_metrics AS
+                WITH bounds AS (SELECT MAX(day) AS max_day FROM transactions)
+                SELECT t.id, t.country,
+                       MIN(b.max_day + 1 - t.day) AS recency,
+                       COUNT(*) AS frequency,
+                       SUM(t.monetary) AS monetary
+                FROM transactions t CROSS JOIN bounds b
+                {window}
+                GROUP BY t.id, t.country
+            """)
+
+            d = self._idiv
+            segment_case = ' '.join(f"WHEN {condition} THEN {_quote(name)}" for condition, name in SEGMENT_RULES)
+            self.execute("DROP TABLE IF EXISTS rfm")
+            self.execute(f"""
+                CREATE TABLE rfm AS
+                WITH rq AS ({self._quantiles_sql('recency')}),
+                     fq AS ({self._quantiles_sql('frequency')}),
+                     mq AS ({self._quantiles_sql('monetary')}),
+                scored AS (
+                    SELECT m.*,
+                           CASE WHEN recency <= rq1 THEN 5 WHEN recency <= rq2 THEN 4
+                                WHEN recency <= rq3 THEN 3 WHEN recency <= rq4 THEN 2 ELSE 1 END AS r,
+                           CASE WHEN frequency <= fq1 THEN 1 WHEN frequency <= fq2 THEN 2
+                                WHEN frequency <= fq3 THEN 3 WHEN frequency <= fq4 THEN 4 ELSE 5 END AS f,
+                           CASE WHEN monetary <= mq1 THEN 1 WHEN monetary <= mq2 THEN 2
+                                WHEN monetary <= mq3 THEN 3 WHEN monetary <= mq4 THEN 4 ELSE 5 END AS m
+                    FROM rfm_metrics m CROSS JOIN rq CROSS JOIN fq CROSS JOIN mq
+                ),
+                coded AS (
+                    SELECT *, (f + m) {d} 2 AS fm, CAST(r AS VARCHAR) || CAST((f + m) {d} 2 AS VARCHAR) AS code
+                    FROM scored
+                )
+                SELECT id, country, recency, frequency, monetary, r, f, m,
+                       CAST(r AS VARCHAR) || CAST(f AS VARCHAR) || CAST(m AS VARCHAR) AS rfm_score,
+                       fm, CASE {segment_case} ELSE code END AS segment
+                FROM coded
+            """)
+            self._index_rfm()
+            return self.query("SELECT * FROM rfm ORDER BY id, country")
+
+    # --------------------------------------------------- dashboard pushdown
+    def _where(self, selection):
+        clauses, params = [], []
+        for dim in DIMENSIONS:
+            value = selection.get(dim, ALL)
+            if value != ALL and value is not None:
+                clauses.append(f"{dim} = ?")
+                # numpy scalars are not bindable parameters
+                params.append(value.item() if hasattr(value, 'item') else value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def rows(self, columns=None, limit=None, **selection):
+        """RFM rows matching a segment/cluster/country selection"""
+        if columns:
+            self._check_columns(columns, self.rfm_columns())
+        where, params = self._where(selection)
+        sql = f"SELECT {', '.join(columns) if columns else '*'} FROM rfm{where} ORDER BY id, country"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self.query(sql, params)
+
+    def counts(self, dim, **selection):
+        """Customer count per value of ``dim`` within a selection, largest first"""
+        self._check_columns([dim], DIMENSIONS)
+        where, params = self._where(selection)
+        counts = self.query(f"SELECT {dim}, COUNT(*) AS count FROM rfm{where} GROUP BY {dim} "
+                            f"ORDER BY count DESC, {dim}", params)
+        return counts.set_index(dim)['count']
+
+    def summary(self, **selection):
+        """Customer count and mean recency, frequency and monetary for a selection"""
+        where, params = self._where(selection)
+        summary = self.query("SELECT COUNT(*) AS count, AVG(recency) AS recency_mean, "
+                             "AVG(frequency) AS frequency_mean, AVG(monetary) AS monetary_mean "
+                             f"FROM rfm{where}", params)
+        stats = summary.iloc[0].to_dict()
+        # The row is upcast to float alongside the means
+        stats['count'] = int(stats['count'])
+        return stats
+
+    def rollup(self, dims, **selection):
+        """Count and metric means grouped by ``dims`` (e.g. ['segment', 'cluster'])"""
+        self._check_columns(dims, DIMENSIONS)
+        where, params = self._where(selection)
+        group = ', '.join(dims)
+        return self.query(f"SELECT {group}, COUNT(*) AS count, AVG(recency) AS recency_mean, "
+                          f"AVG(frequency) AS frequency_mean, AVG(monetary) AS monetary_mean, "
+                          f"SUM(monetary) AS monetary_sum FROM rfm{where} GROUP BY {group} ORDER BY {group}",
+                          params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compute RFM segments with the embedded SQL backend')
+    parser.add_argument('input', nargs='?', default='customer_transactions.csv')
+    parser.add_argument('--engine', choices=('auto',) + ENGINES, default='auto')
+    parser.add_argument('--database', default=':memory:', help='Database file (default: in memory)')
+    parser.add_argument('--window-days', type=int, default=None)
+    parser.add_argument('--output', default=None, help='Optional CSV path for the RFM table')
+    args = parser.parse_args()
+
+    backend = SQLBackend(args.database, args.engine)
+    print(f"Computing RFM with {backend.engine}...")
+    start = time.perf_counter()
+    rfm = backend.load_transactions(args.input).compute_rfm(args.window_days)
+    print(f"✅ {len(rfm)} customers in {time.perf_counter() - start:.2f}s")
+    if args.output:
+        rfm.to_csv(args.output, index=False)
+        print(f"📁 Saved: {args.output}")
+
+    print(f"\n=== SEGMENT DISTRIBUTION ===")
+    print(backend.counts('segment').to_string())
+
+
+if __name__ == "__main__":
+    main()
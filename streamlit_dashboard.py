@@ -1,30 +1,32 @@
 import streamlit as st
-import pandas as pd
 
-# Load precomputed RFM with clusters
-rfm = pd.read_csv('rfm_segments_output.csv')
+from streamlit_data import load_dataset
+
+# Load precomputed RFM with clusters (read once per file version)
+data = load_dataset('rfm_segments_output.csv')
 
 st.title("Customer Segmentation Dashboard with Clusters")
 
 # Sidebar for cluster selection
-clusters = rfm['cluster'].unique()
+clusters = data.clusters
 selected_cluster = st.sidebar.selectbox('Select Cluster', clusters)
 
-# Filter data based on selected cluster
-filtered_data = rfm[rfm['cluster'] == selected_cluster]
+# Precomputed slice for the selected cluster
+filtered_data = data.by_cluster[selected_cluster]
 
 st.subheader(f"Cluster {selected_cluster} Summary")
 
 # Display summary stats for the cluster
-cluster_summary = filtered_data[['recency', 'frequency', 'monetary']].describe()
+cluster_summary = data.cluster_describe[selected_cluster]
 st.write(cluster_summary)
 
 # Show raw data if needed
 if st.checkbox('Show raw data'):
     st.write(filtered_data)
 
-# Optional: Display scatter plot
+# Optional: Display scatter plot (downsampled for large clusters)
 st.subheader("Recency vs Frequency")
-chart_data = filtered_data[['recency', 'frequency', 'monetary']]
+chart_data = data.cluster_scatter[selected_cluster]
+if len(chart_data) < len(filtered_data):
+    st.caption(f"Showing a sample of {len(chart_data):,} of {len(filtered_data):,} customers")
 st.scatter_chart(chart_data)
-
@@ -0,0 +1,58 @@
+"""
+Shared data layer for the Streamlit apps
+The RFM table is read once per file version (path, mtime and size) and kept
+with its per-segment and per-cluster slices, describe() summaries and
+downsampled scatter inputs, so widget reruns only look results up
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+DEFAULT_PATH = 'rfm_segments_output.csv'
+DESCRIBE_COLUMNS = ['recency', 'frequency', 'monetary']
+MAX_SCATTER_POINTS = 5_000
+
+
+def downsample(df, max_points=MAX_SCATTER_POINTS, random_state=0):
+    """At most ``max_points`` rows of ``df``, sampled uniformly and kept in table order"""
+    if len(df) <= max_points:
+        return df
+    rows = np.sort(np.random.default_rng(random_state).choice(len(df), max_points, replace=False))
+    return df.iloc[rows]
+
+
+class RFMDataset:
+    """An RFM table with its slices and summaries precomputed for the Streamlit pages"""
+
+    def __init__(self, rfm, max_scatter_points=MAX_SCATTER_POINTS):
+        self.rfm = rfm
+        # Selectbox options keep the table's first-occurrence order, like Series.unique()
+        self.segments = list(rfm['segment'].unique())
+        self.clusters = list(rfm['cluster'].unique())
+        self.by_segment = dict(tuple(rfm.groupby('segment', sort=False)))
+        self.by_cluster = dict(tuple(rfm.groupby('cluster', sort=False)))
+        self.segment_describe = {key: df[DESCRIBE_COLUMNS].describe() for key, df in self.by_segment.items()}
+        self.cluster_describe = {key: df[DESCRIBE_COLUMNS].describe() for key, df in self.by_cluster.items()}
+        self.cluster_scatter = {key: downsample(df[DESCRIBE_COLUMNS], max_scatter_points)
+                                for key, df in self.by_cluster.items()}
+
+
+def dataset_version(path):
+    """Changes whenever the file at ``path`` is rewritten"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+# cache_resource shares one read-only object across reruns and sessions
+# instead of unpickling a fresh copy of every slice on each interaction
+@st.cache_resource(show_spinner="Loading RFM data...", max_entries=4)
+def _load_dataset(path, version):
+    return RFMDataset(pd.read_csv(path))
+
+
+def load_dataset(path=DEFAULT_PATH):
+    """The cached dataset for the current version of ``path``"""
+    return _load_dataset(path, dataset_version(path))
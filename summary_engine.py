@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Summary statistics engine for the RFM table
+Counts and recency/frequency/monetary sums are accumulated once per
+(segment, cluster, country) partition; every rollup (segment, cluster,
+country, segment x cluster, total) is then reduced from that small table
+and written as one flat, typed CSV that loads back without header parsing
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ('segment', 'cluster', 'country')
+METRICS = ('recency', 'frequency', 'monetary')
+ALL = 'all'
+
+LEVELS = {
+    'total': (),
+    'segment': ('segment',),
+    'cluster': ('cluster',),
+    'country': ('country',),
+    'segment_cluster': ('segment', 'cluster'),
+    'partition': DIMENSIONS,
+}
+
+# Rolled-up dimensions are left empty (<NA>) on each row
+SUMMARY_DTYPES = {
+    'level': 'string',
+    'segment': 'string',
+    'cluster': 'Int64',
+    'country': 'string',
+    'count': 'int64',
+    'recency_sum': 'float64',
+    'recency_mean': 'float64',
+    'frequency_sum': 'float64',
+    'frequency_mean': 'float64',
+    'monetary_sum': 'float64',
+    'monetary_mean': 'float64',
+    'monetary_min': 'float64',
+    'monetary_max': 'float64',
+}
+SUMS = ['count'] + [f'{metric}_sum' for metric in METRICS]
+
+
+def partition_totals(rfm):
+    """Count, metric sums and monetary range per (segment, cluster, country) in one pass over the rows"""
+    group = np.zeros(len(rfm), dtype=np.int64)
+    uniques = []
+    for dim in DIMENSIONS:
+        codes, values = pd.factorize(rfm[dim], sort=True)
+        group = group * len(values) + codes
+        uniques.append(values)
+    size = int(np.prod([len(values) for values in uniques])) if len(rfm) else 0
+
+    counts = np.bincount(group, minlength=size)
+    totals = {'count': counts}
+    for metric in METRICS:
+        totals[f'{metric}_sum'] = np.bincount(group, weights=rfm[metric].to_numpy(dtype=float), minlength=size)
+    monetary = rfm['monetary'].to_numpy(dtype=float)
+    totals['monetary_min'] = np.full(size, np.inf)
+    totals['monetary_max'] = np.full(size, -np.inf)
+    np.minimum.at(totals['monetary_min'], group, monetary)
+    np.maximum.at(totals['monetary_max'], group, monetary)
+
+    present = np.flatnonzero(counts)
+    codes = np.unravel_index(present, [len(values) for values in uniques])
+    partitions = pd.DataFrame({dim: values[code] for dim, values, code in zip(DIMENSIONS, uniques, codes)})
+    for column, values in totals.items():
+        partitions[column] = values[present]
+    return partitions
+
+
+def rollup(partitions, dims):
+    """Reduce the partition totals to one row per combination of ``dims``"""
+    aggregations = {column: 'sum' for column in SUMS}
+    aggregations.update(monetary_min='min', monetary_max='max')
+    if dims:
+        table = partitions.groupby(list(dims), sort=True, observed=True).agg(aggregations).reset_index()
+    else:
+        table = partitions.agg(aggregations).to_frame().T
+    for metric in METRICS:
+        table[f'{metric}_mean'] = table[f'{metric}_sum'] / table['count']
+    return table
+
+
+def build_summary(rfm):
+    """Flat summary table with one row per group at every level in LEVELS"""
+    partitions = partition_totals(rfm)
+    tables = []
+    for level, dims in LEVELS.items():
+        table = rollup(partitions, dims)
+        table.insert(0, 'level', level)
+        tables.append(table)
+    summary = pd.concat(tables, ignore_index=True)
+    return summary.reindex(columns=list(SUMMARY_DTYPES)).astype(SUMMARY_DTYPES)
+
+
+def write_summary(summary, path):
+    """Write the flat summary table as a single-header CSV"""
+    summary.to_csv(path, index=False)
+
+
+def load_summary(path):
+    """Read a summary table written by write_summary with its column types"""
+    summary = pd.read_csv(path, dtype=SUMMARY_DTYPES, float_precision='round_trip')
+    if list(summary.columns) != list(SUMMARY_DTYPES):
+        raise ValueError(f"{path} is not a flat summary table")
+    return summary
+
+
+def level(summary, name):
+    """Rows of one rollup level, indexed by its dimensions"""
+    dims = list(LEVELS[name])
+    table = summary[summary['level'] == name].drop(columns='level')
+    table = table.drop(columns=[dim for dim in DIMENSIONS if dim not in dims])
+    return table.set_index(dims) if dims else table.reset_index(drop=True)
+
+
+class SummaryLookup:
+    """Totals and means for any segment/cluster/country selection, reduced from the partition rows"""
+
+    def __init__(self, summary):
+        partitions = level(summary, 'partition').reset_index()
+        self.keys = {dim: partitions[dim].astype(object).to_numpy() for dim in DIMENSIONS}
+        self.sums = partitions[SUMS].to_numpy(dtype=float)
+
+    def select(self, segment=ALL, cluster=ALL, country=ALL):
+        """Customer count and mean recency, frequency and monetary for a selection"""
+        mask = np.ones(len(self.sums), dtype=bool)
+        for dim, value in zip(DIMENSIONS, (segment, cluster, country)):
+            if value != ALL and value is not None:
+                mask &= self.keys[dim] == value
+        totals = self.sums[mask].sum(axis=0)
+        count = int(totals[0])
+        means = totals[1:] / count if count else np.zeros(len(METRICS))
+        return {'count': count, **{f'{metric}_mean': mean for metric, mean in zip(METRICS, means)}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the flat RFM summary table')
+    parser.add_argument('input', nargs='?', default='rfm_segments_output_full.csv')
+    parser.add_argument('--output', default='rfm_segment_summary_full.csv')
+    args = parser.parse_args()
+
+    summary = build_summary(pd.read_csv(args.input))
+    write_summary(summary, args.output)
+    print(f"📁 Saved: {args.output} ({len(summary)} rows)")
+    print(level(summary, 'segment')[['count', 'recency_mean', 'frequency_mean', 'monetary_mean', 'monetary_sum']])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Tests for the content-addressed artifact cache
+"""
+
+import importlib
+import os
+import sys
+
+from artifact_cache import ArtifactCache
+
+
+def test_keys_track_inputs_parameters_and_code(tmp_path, monkeypatch):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    module_path = tmp_path / 'cache_stage.py'
+    module_path.write_text("def stage(x):\n    return x + 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'cache_stage', raising=False)
+    stage = importlib.import_module('cache_stage').stage
+
+    key = cache.key('stage', {'a': 1}, [b'input'], code=[stage])
+    assert key == cache.key('stage', {'a': 1}, [b'input'], code=[stage])
+    assert key != cache.key('stage', {'a': 2}, [b'input'], code=[stage])
+    assert key != cache.key('stage', {'a': 1}, [b'other'], code=[stage])
+
+    cache.put(key, 41, 'stage')
+    assert cache.get_or_compute(key, 'stage', lambda: 0) == 41
+    module_path.write_text("def stage(x):\n    return x + 2  # changed\n")
+    assert cache.key('stage', {'a': 1}, [b'input'], code=[stage]) != key
+
+
+def test_no_temp_files_left(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'input.csv'
+    source.write_text('a\n1\n')
+    key = cache.key('stage', {}, [str(source)])
+    cache.put(key, [1], 'stage')
+    assert cache.get(key) == [1]
+    assert not [name for _, _, names in os.walk(tmp_path) for name in names if name.startswith('.tmp-')]
+
+
+def test_file_hash_memo_uses_a_unique_temp_file(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'input.csv'
+    source.write_text('a\n1\n')
+    os.makedirs(cache.root)
+    # A stale fixed-name temp file from another writer must not be reused or clobbered
+    stale = tmp_path / 'cache' / 'file_hashes.json.tmp'
+    stale.write_text('partial')
+    digest = cache.file_hash(str(source))
+    assert stale.read_text() == 'partial'
+    assert cache.file_hash(str(source)) == digest
+    assert not [name for name in os.listdir(cache.root) if name.startswith('.tmp-')]
+
+
+def test_get_survives_concurrent_eviction(tmp_path, monkeypatch):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    key = cache.key('stage', {}, [b'input'])
+    cache.put(key, [1], 'stage')
+
+    def evicted(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, 'utime', evicted)
+    assert cache.get(key) == [1]
@@ -0,0 +1,25 @@
+"""
+Tests for the float32 nearest-centroid assignment kernel
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+from assign_kernel import CentroidAssigner
+
+
+def test_saved_model_reproduces_batch_clusters():
+    rfm = pd.read_csv('rfm_segments_output_full.csv')
+    assert (CentroidAssigner.from_model('rfm_model.json').assign(rfm) == rfm['cluster'].values).all()
+
+
+def test_matches_kmeans_predict():
+    rfm = pd.read_csv('rfm_segments_output_full.csv')
+    X = rfm[['recency', 'frequency', 'monetary']].to_numpy(dtype=float)
+    scaler = StandardScaler().fit(X)
+    kmeans = KMeans(n_clusters=4, random_state=42).fit(scaler.transform(X))
+    batch = np.random.default_rng(0).uniform(X.min(axis=0), X.max(axis=0) * 2, (200_000, 3)).round()
+    assigner = CentroidAssigner(scaler.mean_, scaler.scale_, kmeans.cluster_centers_, block_rows=4096, n_threads=2)
+    assert (assigner.assign(batch) == kmeans.predict(scaler.transform(batch))).all()
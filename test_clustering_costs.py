@@ -0,0 +1,44 @@
+"""
+Tests for the clustering comparison's resource profiling
+"""
+
+import time
+
+from sklearn.base import BaseEstimator
+from sklearn.cluster import AgglomerativeClustering
+from sklearn.datasets import make_blobs
+
+from clustering_costs import measure_costs, profile_row_limit, MAX_QUADRATIC_PROFILE_ROWS
+from clustering_sweeps import sweep_kmeans, WarmStartKMeans
+
+
+class LinearFit(BaseEstimator):
+    """Estimator whose fit sleeps in proportion to the number of rows"""
+
+    def __init__(self, seconds_per_row=0.0):
+        self.seconds_per_row = seconds_per_row
+
+    def fit(self, X):
+        time.sleep(self.seconds_per_row * X.shape[0])
+        return self
+
+
+def test_linear_fit_scaling():
+    X, _ = make_blobs(800, centers=4, random_state=0)
+    costs = measure_costs(LinearFit(0.001), X, repeats=2)
+    assert costs['profile_rows'] == 800 and 0.8 <= costs['fit_seconds'] < 1.6
+    assert 0.8 < costs['scaling_exponent'] < 1.2 and costs['predict_seconds'] is None
+    # Overhead-bound fits give no exponent
+    assert measure_costs(LinearFit(), X, repeats=2)['scaling_exponent'] is None
+
+
+def test_quadratic_row_cap():
+    assert profile_row_limit(AgglomerativeClustering(), 50_000) == MAX_QUADRATIC_PROFILE_ROWS
+    assert profile_row_limit(LinearFit(), 50_000) == 50_000
+
+
+def test_profiled_kmeans_is_the_swept_model():
+    X, _ = make_blobs(800, centers=4, random_state=0)
+    sweep = sweep_kmeans(X, [3, 4])
+    model = WarmStartKMeans(n_clusters=4, init_centroids=sweep[4]['init_centroids']).fit(X)
+    assert (model.labels_ == sweep[4]['labels']).all()
@@ -0,0 +1,68 @@
+"""
+Tests for the cached k-sweep with warm-started K-Means and the shared-graph
+DBSCAN eps sweep
+"""
+
+import time
+
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN, KMeans
+
+import clustering_sweeps
+from artifact_cache import ArtifactCache
+from clustering_comparison import load_and_prepare_data
+from clustering_sweeps import sweep_dbscan_eps, sweep_k, sweep_kmeans, COLD_START_INITS
+
+K_VALUES = list(range(2, 11))
+# From all noise through many small clusters to a single one on the scaled RFM features
+EPS_VALUES = (0.03, 0.05, 0.08, 0.1, 0.15, 0.5)
+
+
+@pytest.fixture(scope='module')
+def X():
+    return load_and_prepare_data()[0]
+
+
+def best_time(func, repeats=3):
+    """(result, best wall time) of ``func()`` over ``repeats`` runs"""
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        seconds.append(time.perf_counter() - start)
+    return result, min(seconds)
+
+
+def test_warm_sweep_is_faster_than_cold_fits(X):
+    warm, warm_seconds = best_time(lambda: sweep_kmeans(X, K_VALUES))
+    cold, cold_seconds = best_time(
+        lambda: {k: KMeans(n_clusters=k, n_init=COLD_START_INITS, random_state=42).fit(X) for k in K_VALUES})
+
+    # One start per k after the first against ten for every k
+    assert warm_seconds < 0.5 * cold_seconds
+    for k in K_VALUES:
+        assert warm[k]['inertia'] <= 1.1 * cold[k].inertia_, k
+
+
+def test_sweep_is_served_from_cache(X, tmp_path, monkeypatch):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    first = sweep_k(X, 2, 5, cache=cache)
+
+    def refit(*args, **kwargs):
+        raise AssertionError("cached sweep was recomputed")
+
+    # A hit returns before any fit is scored
+    monkeypatch.setattr(clustering_sweeps, 'cluster_metrics', refit)
+    second = sweep_k(X, 2, 5, cache=cache)
+    assert second['curves'] == first['curves']
+    for k in second['k_values']:
+        assert (second['kmeans'][k]['labels'] == first['kmeans'][k]['labels']).all()
+
+
+@pytest.mark.parametrize('min_samples', [5, 10])
+def test_dbscan_sweep_matches_dbscan(X, min_samples):
+    sweep = sweep_dbscan_eps(X, EPS_VALUES, min_samples, cache=ArtifactCache(enabled=False))
+    for eps in EPS_VALUES:
+        expected = DBSCAN(eps=eps, min_samples=min_samples).fit_predict(X)
+        assert np.array_equal(sweep['dbscan'][eps]['labels'], expected), eps
@@ -0,0 +1,60 @@
+"""
+Tests for the memory-mapped customer lookup store
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from artifact_cache import ArtifactCache
+from customer_lookup import CustomerLookup, write_store, labels_path
+
+
+def test_point_and_batch_lookups(tmp_path):
+    rfm = pd.read_csv('rfm_segments_output.csv')
+    lookup = CustomerLookup.from_frame(rfm, str(tmp_path / 'customers.npy'))
+    row = rfm.iloc[10]
+    record = lookup.get(int(row['id']), row['country'])[0]
+    assert record['segment'] == row['segment'] and record['cluster'] == row['cluster']
+    assert record['monetary'] == row['monetary']
+
+    records = lookup.batch(rfm['id'].tolist() + [-1], rfm['country'].tolist() + ['East'])
+    assert records[-1] == []
+    assert [r[0]['id'] for r in records[:-1]] == rfm['id'].tolist()
+
+
+def test_batch_matches_get_for_every_country(tmp_path):
+    rfm = pd.read_csv('rfm_segments_output.csv')
+    # One id in several countries, plus a sparse id that forces the sorted-key index
+    extra = rfm.iloc[[0, 0, 1]].assign(country=['West', 'North', 'East'])
+    extra['id'] = [rfm['id'].iloc[0]] * 2 + [10 ** 12]
+    table = pd.concat([rfm, extra]).drop_duplicates(['id', 'country'])
+    for name, df in (('dense', table[table['id'] < 10 ** 12]), ('sparse', table)):
+        lookup = CustomerLookup.from_frame(df, str(tmp_path / f'{name}.npy'))
+        ids = df['id'].drop_duplicates().tolist() + [-1]
+        assert lookup.batch(ids) == [lookup.get(i) for i in ids]
+        assert lookup.batch(ids, 'East') == [lookup.get(i, 'East') for i in ids]
+        assert len(lookup.batch([int(rfm['id'].iloc[0])])[0]) == (df['id'] == rfm['id'].iloc[0]).sum()
+
+
+@pytest.mark.parametrize('ids', [[1, 2.5], [1, '2'], [True], np.array([1.0, 2.0]), [2 ** 70]])
+def test_batch_rejects_non_integer_ids(tmp_path, ids):
+    rfm = pd.read_csv('rfm_segments_output.csv')
+    lookup = CustomerLookup.from_frame(rfm, str(tmp_path / 'customers.npy'))
+    with pytest.raises((TypeError, ValueError)):
+        lookup.batch(ids)
+
+
+def test_cached_stores_are_evicted_with_their_labels(tmp_path):
+    rfm = pd.read_csv('rfm_segments_output.csv')
+    cache = ArtifactCache(str(tmp_path / 'cache'), budget_mb=0.02)
+    paths = []
+    for table in (rfm, rfm.iloc[:200]):
+        key = cache.key('customer_lookup', {}, [table])
+        paths.append(cache.file_artifact(key, 'customer_lookup', lambda p: write_store(table, p), '.npy'))
+    assert CustomerLookup(paths[1]).get(int(rfm['id'].iloc[0]))
+    assert not os.path.exists(paths[0]) and not os.path.exists(labels_path(paths[0]))
+    assert [e['path'] for e in cache.entries()] == [paths[1]]
+    assert not [name for _, _, names in os.walk(tmp_path) for name in names if name.startswith('.tmp-')]
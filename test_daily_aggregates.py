@@ -0,0 +1,28 @@
+"""
+Tests for date-range RFM from per-day prefix aggregates
+"""
+
+import pytest
+
+from daily_aggregates import DailyAggregates, METRIC_COLUMNS
+from generate_full_rfm import load_and_prepare_data, calculate_rfm_metrics
+
+
+@pytest.fixture(scope='module')
+def transactions():
+    return load_and_prepare_data()
+
+
+@pytest.mark.parametrize('start, end', [(None, None), ('2023-06-01', '2024-03-31'), ('2024-01-15', '2024-01-20')])
+def test_window_matches_recomputation(transactions, start, end):
+    daily = DailyAggregates(transactions[['id', 'country', 'date', 'monetary']])
+    window = transactions
+    if start is not None:
+        window = window[(window['date'] >= start) & (window['date'] <= end)]
+    expected = calculate_rfm_metrics(window.copy())[METRIC_COLUMNS].reset_index(drop=True)
+    assert daily.metrics(start, end).equals(expected)
+
+
+def test_empty_window(transactions):
+    daily = DailyAggregates(transactions[['id', 'country', 'date', 'monetary']])
+    assert len(daily.metrics('2030-01-01', None)) == 0
@@ -0,0 +1,101 @@
+"""
+Tests for the Dash dashboard's per-client views and figures
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+import dash_dashboard as dashboard
+from artifact_cache import ArtifactCache
+from daily_aggregates import windowed_rfm
+from filter_index import DIMENSIONS
+from snapshot_store import SnapshotStore
+from sql_backend import SQLBackend
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """API client, with view tables cached under tmp_path instead of the repo's .rfm_cache"""
+    monkeypatch.setattr(dashboard, 'artifact_cache', ArtifactCache(str(tmp_path / 'cache')))
+    monkeypatch.setattr(dashboard, 'view_datasets', OrderedDict())
+    return dashboard.server.test_client()
+
+
+def customer_api(client, row):
+    return client.get(f"/api/customers/{int(row['id'])}?country={row['country']}").get_json()
+
+
+def test_monetary_bars_span_their_edges():
+    edges, _ = dashboard.current_dataset()[2].monetary.counts('log')
+    bar = dashboard.update_monetary_distribution.__wrapped__('all', 'all', 'all', 'log').data[0]
+    assert bar.offset == 0 and np.allclose(bar.x, edges[:-1]) and np.allclose(bar.width, np.diff(edges))
+
+
+def test_date_window_stays_in_its_session(client):
+    if dashboard.daily is None:
+        pytest.skip("no transaction file for date-range views")
+    row = dashboard.rfm.iloc[0]
+    before_api = customer_api(client, row)
+    before_cards = dashboard.update_summary_cards('all', 'all', 'all')
+    version = dashboard.DATA_VERSION
+
+    span = dashboard.date_range_max
+    _, _, view, *options, _ = dashboard.update_view([span // 2, span], 'latest', 3)
+    expected = windowed_rfm(dashboard.daily, span // 2, span, 3)
+    assert view == dashboard.window_view(span // 2, span, 3)
+    assert dashboard.update_summary_cards('all', 'all', 'all', view)[0] == len(expected)
+    assert len(options[1]) == 1 + expected['cluster'].nunique()
+    assert dashboard.update_view([0, span], 'latest', 3)[2] == 'latest'
+
+    # Other sessions, the published version and the API are untouched
+    assert dashboard.DATA_VERSION == version
+    assert dashboard.update_summary_cards('all', 'all', 'all') == before_cards
+    assert customer_api(client, row) == before_api
+
+
+def test_snapshot_stays_in_its_session(client, tmp_path, monkeypatch):
+    rfm = dashboard.rfm.iloc[:300]
+    monkeypatch.setattr(dashboard, 'snapshot_store', SnapshotStore(str(tmp_path / 'snapshots')))
+    dashboard.snapshot_store.write(rfm, None, '2025-01-01')
+    row = dashboard.rfm.iloc[0]
+    before_api = customer_api(client, row)
+    before_cards = dashboard.update_summary_cards('all', 'all', 'all')
+    version = dashboard.DATA_VERSION
+
+    _, label, view, *_, slider_disabled = dashboard.update_view(None, '2025-01-01', 3)
+    assert view == 'snapshot:2025-01-01' and slider_disabled and '300 customers' in label
+    assert dashboard.update_summary_cards('all', 'all', 'all', view)[0] == len(rfm)
+    assert dashboard.DATA_VERSION == version
+    assert dashboard.update_summary_cards('all', 'all', 'all') == before_cards
+    assert customer_api(client, row) == before_api
+
+
+def test_sql_backend_serves_the_same_answers(monkeypatch):
+    row = dashboard.rfm.iloc[0]
+    selections = [('all', 'all', 'all'), (row['segment'], 'all', 'all'),
+                  ('all', int(row['cluster']), row['country']), (row['segment'], int(row['cluster']), row['country'])]
+    key = ['id', 'country']
+    for selection in selections:
+        rows = dashboard.filter_rfm(*selection)
+        counts = {dim: dashboard.count_rfm(dim, *selection) for dim in DIMENSIONS}
+        stats = dashboard.current_dataset()[2].summary.select(*selection)
+        with monkeypatch.context() as patch:
+            patch.setattr(dashboard, 'published_sql', SQLBackend().load_rfm_frame(dashboard.rfm))
+            sql_rows = dashboard.filter_rfm(*selection)
+            assert sql_rows.sort_values(key).values.tolist() == rows.sort_values(key).values.tolist()
+            for dim, expected in counts.items():
+                assert dashboard.count_rfm(dim, *selection).sort_index().equals(expected.sort_index()), dim
+            sql_stats = dashboard.published_sql.summary(**dict(zip(DIMENSIONS, selection)))
+            assert dashboard.update_summary_cards(*selection)[0] == stats['count'] == sql_stats['count']
+            for metric in ('recency_mean', 'frequency_mean', 'monetary_mean'):
+                assert np.isclose(sql_stats[metric], stats[metric]), metric
+
+
+def test_batch_api_matches_the_point_api(client):
+    row = dashboard.rfm.iloc[0]
+    response = client.post('/api/customers/batch', json={'ids': [int(row['id']), -1]}).get_json()
+    point = client.get(f"/api/customers/{int(row['id'])}").get_json()
+    assert response['customers'] == [point['customers'], []] and response['found'] == 1
+    assert client.post('/api/customers/batch', json={'ids': [1.5]}).status_code == 400
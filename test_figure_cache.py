@@ -0,0 +1,72 @@
+"""
+Tests for the memoized Dash figures
+"""
+
+import plotly.graph_objects as go
+
+from figure_cache import FigureCache
+
+
+def counting_figure(cache, name='bars'):
+    calls = []
+
+    @cache.cached(name)
+    def figure(segment, country='all', data_version=None):
+        calls.append((segment, country))
+        return go.Figure(go.Bar(x=[segment, country], y=[1, len(calls)]))
+
+    return figure, calls
+
+
+def test_miss_builds_and_hit_returns_the_stored_figure():
+    cache = FigureCache(lambda: 1)
+    figure, calls = counting_figure(cache)
+
+    first = figure('Champions')
+    assert calls == [('Champions', 'all')]
+    assert first['data'][0]['x'] == ['Champions', 'all']
+    assert cache.stats()['misses'] == 1
+
+    # A hit neither rebuilds nor re-parses: the stored dict comes back as is
+    assert figure('Champions', data_version=7) is first
+    assert calls == [('Champions', 'all')]
+    assert cache.stats()['hits'] == 1
+
+    figure('Champions', 'Canada')
+    assert calls[-1] == ('Champions', 'Canada')
+    assert cache.stats()['entries'] == 2
+
+
+def test_least_recently_used_figures_are_evicted_over_budget():
+    cache = FigureCache(lambda: 1)
+    figure, calls = counting_figure(cache)
+    figure('a')
+    # Room for two figures of this size but not three
+    cache.max_bytes = cache.stats()['bytes'] * 2 + 10
+    cache.clear()
+
+    figure('a')
+    figure('b')
+    figure('a')  # refresh 'a' so 'b' is the oldest
+    figure('c')
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['bytes'] <= cache.max_bytes
+
+    built = len(calls)
+    figure('a')
+    assert len(calls) == built
+    figure('b')
+    assert len(calls) == built + 1
+
+
+def test_new_dataset_version_invalidates_figures():
+    version = [1]
+    cache = FigureCache(lambda: version[0])
+    figure, calls = counting_figure(cache)
+
+    before = figure('Champions')
+    version[0] = 2
+    after = figure('Champions')
+    assert len(calls) == 2
+    assert after is not before
+    assert after['data'][0]['y'] == [1, 2]
@@ -0,0 +1,52 @@
+"""
+Tests for the bitmap filter index behind the dashboard callbacks
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import filter_index
+from filter_index import FilterIndex
+
+
+def test_mask_and_take_match_pandas():
+    rfm = pd.read_csv('rfm_segments_output.csv')
+    index = FilterIndex(rfm)
+    for segment in ['all'] + list(rfm['segment'].unique()):
+        for cluster in ['all'] + sorted(rfm['cluster'].unique()):
+            expected = np.ones(len(rfm), dtype=bool)
+            if segment != 'all':
+                expected &= (rfm['segment'] == segment).values
+            if cluster != 'all':
+                expected &= (rfm['cluster'] == cluster).values
+            assert (index.mask(segment=segment, cluster=cluster) == expected).all()
+            assert index.take(rfm, segment=segment, cluster=cluster).index.equals(rfm[expected].index)
+
+
+def test_counts_match_pandas():
+    rfm = pd.read_csv('rfm_segments_output.csv')
+    counts = FilterIndex(rfm).counts('segment', country='East')
+    assert counts.sum() == (rfm['country'] == 'East').sum()
+    expected = rfm[rfm['country'] == 'East']['segment'].value_counts()
+    assert counts[counts > 0].sort_index().equals(expected.sort_index().rename(counts.name))
+
+
+def test_positions_memo_is_thread_safe(monkeypatch):
+    monkeypatch.setattr(filter_index, 'MAX_CACHED_SELECTIONS', 4)
+    rfm = pd.read_csv('rfm_segments_output.csv')
+    index = FilterIndex(rfm)
+    selections = [{'segment': segment, 'cluster': cluster}
+                  for segment in ['all'] + list(rfm['segment'].unique())
+                  for cluster in ['all'] + sorted(rfm['cluster'].unique())]
+
+    def query(selection):
+        return index.positions(**selection)
+
+    # Far more selections than memo slots, so threads keep evicting under each other
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(query, selections * 20))
+    for selection, positions in zip(selections * 20, results):
+        assert np.array_equal(positions, np.flatnonzero(index.mask(**selection)))
+    assert len(index._positions) <= 4
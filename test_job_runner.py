@@ -0,0 +1,64 @@
+"""
+Tests for the background job runner's on-disk job state
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.bench_ingest import generate_transactions
+from job_runner import JobRunner, _run_job, _update_job, publish, published
+
+
+def test_state_and_published_table_are_shared(tmp_path, monkeypatch):
+    monkeypatch.setenv('RFM_CACHE_DISABLE', '1')
+    jobs_dir = str(tmp_path / 'jobs')
+    path = str(tmp_path / 'transactions.csv')
+    generate_transactions(path, 2000, n_customers=100)
+    _run_job('job-ok', {'input_path': path, 'n_clusters': 3}, jobs_dir)
+    with pytest.raises(FileNotFoundError):
+        _run_job('job-bad', {'input_path': str(tmp_path / 'missing.csv')}, jobs_dir)
+
+    # A runner in another worker sees the same jobs and published table
+    runner = JobRunner(jobs_dir=jobs_dir)
+    done = runner.status('job-ok')
+    assert done['state'] == 'done' and done['progress'] == 1.0
+    assert runner.status('job-bad')['state'] == 'failed'
+    assert runner.status('job-unknown') is None
+    assert runner.status('../job-ok') is None
+
+    state = published(jobs_dir)
+    assert state['job_id'] == 'job-ok' and os.path.exists(state['table'])
+    assert runner.published()['version'] == state['version']
+
+
+def test_concurrent_state_updates_are_not_lost(tmp_path):
+    jobs_dir = str(tmp_path / 'jobs')
+
+    def update(worker):
+        for step in range(25):
+            _update_job(jobs_dir, 'job-busy', **{f'w{worker}-{step}': step})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(update, range(8)))
+    job = JobRunner(jobs_dir=jobs_dir).status('job-busy')
+    assert len(job) == 1 + 8 * 25
+
+
+def test_finished_jobs_beyond_retention_are_removed(tmp_path):
+    jobs_dir = str(tmp_path / 'jobs')
+    for n in range(5):
+        _update_job(jobs_dir, f'job-{n}', state='done', finished=float(n))
+        (tmp_path / 'jobs' / f'job-{n}_rfm_segments.csv').write_text('id\n1\n')
+    _update_job(jobs_dir, 'job-live', state='running')
+    publish(str(tmp_path / 'jobs' / 'job-0_rfm_segments.csv'), jobs_dir=jobs_dir, job_id='job-0')
+
+    runner = JobRunner(jobs_dir=jobs_dir, keep=2)
+    assert sorted(runner.cleanup()) == ['job-1', 'job-2']
+    # The two newest, the running job and the published one survive
+    assert sorted(os.listdir(jobs_dir)) == sorted([
+        '.lock', 'published.json', 'job-live.json',
+        'job-0.json', 'job-0_rfm_segments.csv', 'job-3.json', 'job-3_rfm_segments.csv',
+        'job-4.json', 'job-4_rfm_segments.csv'])
+    assert runner.cleanup() == []
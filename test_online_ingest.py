@@ -0,0 +1,35 @@
+"""
+Tests for online per-transaction ingestion
+"""
+
+import pandas as pd
+
+from online_ingest import EventParser, OnlineRFM, RFMModel, OUTPUT_COLUMNS, run
+
+
+def test_replay_matches_batch_run():
+    store = OnlineRFM(RFMModel.load('rfm_model.json'))
+    with open('customer_transactions.csv') as f:
+        header, *lines = f.readlines()
+    store.ingest(EventParser(header).parse(lines))
+    store.refresh()
+
+    online = store.to_frame().sort_values(['id', 'country']).reset_index(drop=True)
+    batch = pd.read_csv('rfm_segments_output_full.csv')[OUTPUT_COLUMNS]
+    batch = batch.sort_values(['id', 'country']).reset_index(drop=True)
+    for column in ['recency', 'frequency', 'monetary', 'r', 'f', 'm', 'segment', 'cluster']:
+        assert (online[column].values == batch[column].values).all(), column
+
+
+def test_run_is_quiet_unless_progress_is_requested(capsys):
+    with open('customer_transactions.csv') as f:
+        header, *lines = f.readlines()
+    batches = [[header]] + [lines[start:start + 250] for start in range(0, 1000, 250)]
+
+    events, _ = run(OnlineRFM(RFMModel.load('rfm_model.json')), iter(batches))
+    assert events == 1000
+    assert capsys.readouterr().out == ''
+
+    seen = []
+    run(OnlineRFM(RFMModel.load('rfm_model.json')), iter(batches), progress=lambda n, _: seen.append(n))
+    assert seen == [250, 500, 750, 1000]
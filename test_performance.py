@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Performance regression tests
+Runs the generate_full_rfm stages, the clustering comparison and every
+dashboard callback on synthetic data of a fixed size, and fails when wall
+time or peak traced allocation (tracemalloc) exceeds the stored baseline in
+performance_baseline.json by more than the allowed tolerance. Wall times are
+stored as ratios to a fixed calibration workload timed in the same run, so
+the baseline carries over between faster and slower hosts.
+
+Re-record the baseline after an intended change with
+    RFM_PERF_UPDATE_BASELINE=1 python -m pytest test_performance.py
+"""
+
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from profiling import peak_memory, time_call
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'performance_baseline.json')
+UPDATE_BASELINE = os.environ.get('RFM_PERF_UPDATE_BASELINE', '') in ('1', 'true', 'yes')
+
+# Fixed synthetic workload
+N_TRANSACTIONS = 20_000
+N_CUSTOMERS = 500
+REPEATS = 3
+
+# Size of the calibration workload wall times are expressed in
+CALIBRATION_ROWS = 50_000
+
+# A measurement fails above baseline * factor + slack
+TIME_FACTOR = float(os.environ.get('RFM_PERF_TIME_FACTOR', 2.0))
+TIME_SLACK_SECONDS = 0.05
+MEMORY_FACTOR = float(os.environ.get('RFM_PERF_MEMORY_FACTOR', 1.25))
+MEMORY_SLACK_MB = 1.0
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_FILE):
+        return {'workload': {'transactions': N_TRANSACTIONS, 'customers': N_CUSTOMERS}, 'measurements': {}}
+    with open(BASELINE_FILE) as f:
+        return json.load(f)
+
+
+def record_baseline(name, ratio, peak_mb, calibration):
+    baseline = load_baseline()
+    baseline['measurements'][name] = {'time_ratio': round(ratio, 3), 'peak_mb': round(peak_mb, 2),
+                                      'calibration_seconds': round(calibration, 4)}
+    baseline['measurements'] = dict(sorted(baseline['measurements'].items()))
+    with open(BASELINE_FILE, 'w') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+
+
+def measure(func, setup=tuple, repeats=REPEATS, warmup=True):
+    """
+    Best untraced wall time of ``func(*setup())`` over ``repeats`` runs, and
+    its tracemalloc peak (MB) from one more, traced run
+    """
+    if warmup:
+        # Lazy imports and first-use caches (plotly templates, sklearn) are not timed
+        func(*setup())
+    seconds = [time_call(func, *setup())[1] for _ in range(repeats)]
+    return min(seconds), peak_memory(func, *setup())[1]
+
+
+def calibration_workload(rows=CALIBRATION_ROWS):
+    """Fixed numpy, pandas and pure-Python work, the same mix the measured code does"""
+    values = np.random.default_rng(0).random(rows)
+    np.sort(values)
+    frame = pd.DataFrame({'key': (values * 1000).astype(int), 'value': values})
+    frame.groupby('key')['value'].sum()
+    return sum(i * i for i in range(rows))
+
+
+def calibration_seconds():
+    """Best wall time of the calibration workload on this host, right now"""
+    return min(time_call(calibration_workload)[1] for _ in range(REPEATS))
+
+
+def check_budget(name, seconds, peak_mb):
+    """Fail when a measurement regresses past the baseline (or record it when updating)"""
+    # Timed next to each measurement so host speed and load cancel out of the ratio
+    calibration = calibration_seconds()
+    ratio = seconds / calibration
+    if UPDATE_BASELINE:
+        record_baseline(name, ratio, peak_mb, calibration)
+        return
+    baseline = load_baseline()['measurements'].get(name)
+    if baseline is None or 'time_ratio' not in baseline:
+        pytest.fail(f"No baseline for '{name}'; record one with RFM_PERF_UPDATE_BASELINE=1")
+
+    time_limit = baseline['time_ratio'] * TIME_FACTOR + TIME_SLACK_SECONDS / calibration
+    memory_limit = baseline['peak_mb'] * MEMORY_FACTOR + MEMORY_SLACK_MB
+    assert ratio <= time_limit, \
+        f"{name}: {seconds:.3f}s is {ratio:.1f}x calibration, over {time_limit:.1f}x " \
+        f"(baseline {baseline['time_ratio']:.1f}x)"
+    assert peak_mb <= memory_limit, \
+        f"{name}: peak {peak_mb:.1f}MB exceeds {memory_limit:.1f}MB (baseline {baseline['peak_mb']:.1f}MB)"
+
+
+# --------------------------------------------------------------------- data
+@pytest.fixture(scope='module')
+def synthetic(tmp_path_factory):
+    """Synthetic transaction file and every pipeline stage's output on it"""
+    from benchmarks.bench_ingest import generate_transactions
+    from generate_full_rfm import (load_and_prepare_data, calculate_rfm_metrics, calculate_rfm_scores,
+                                   assign_customer_segments, perform_clustering)
+
+    directory = tmp_path_factory.mktemp('perf')
+    path = str(directory / 'transactions.csv')
+    generate_transactions(path, N_TRANSACTIONS, n_customers=N_CUSTOMERS)
+
+    data = {'directory': directory, 'path': path, 'transactions': load_and_prepare_data(path)}
+    data['rfm_metrics'] = calculate_rfm_metrics(data['transactions'].copy())
+    data['rfm_scores'] = calculate_rfm_scores(data['rfm_metrics'].copy())
+    data['segments'] = assign_customer_segments(data['rfm_scores'].copy())
+    data['clusters'] = perform_clustering(data['segments'].copy())
+    return data
+
+
+# ----------------------------------------------------------------- pipeline
+PIPELINE_STAGES = [
+    ('load_and_prepare_data', 'path'),
+    ('calculate_rfm_metrics', 'transactions'),
+    ('calculate_rfm_scores', 'rfm_metrics'),
+    ('assign_customer_segments', 'rfm_scores'),
+    ('perform_clustering', 'segments'),
+    ('generate_summary_stats', 'clusters'),
+]
+
+
+@pytest.mark.parametrize('stage, source', PIPELINE_STAGES, ids=[stage for stage, _ in PIPELINE_STAGES])
+def test_pipeline_stage(synthetic, stage, source):
+    import generate_full_rfm
+
+    func = getattr(generate_full_rfm, stage)
+    value = synthetic[source]
+    # Stages modify their input table, so every run gets a fresh copy
+    setup = (lambda: (value,)) if isinstance(value, str) else (lambda: (value.copy(),))
+    check_budget(f'pipeline:{stage}', *measure(func, setup))
+
+
+# --------------------------------------------------------------- clustering
+def test_clustering_comparison(synthetic, monkeypatch):
+    from clustering_comparison import compare_clustering_algorithms
+
+    # The comparison reads the full RFM output from the working directory
+    synthetic['clusters'].to_csv(synthetic['directory'] / 'rfm_segments_output_full.csv', index=False)
+    monkeypatch.chdir(synthetic['directory'])
+    run = lambda: compare_clustering_algorithms(use_cache=False, profile_costs=False)
+    check_budget('clustering:compare_clustering_algorithms', *measure(run, repeats=1))
+
+
+# ---------------------------------------------------------------- dashboard
+@pytest.fixture(scope='module')
+def dashboard(synthetic, tmp_path_factory):
+    """The dashboard module serving the synthetic RFM table, with its caches and jobs in a temp dir"""
+    import dash_dashboard
+    from artifact_cache import ArtifactCache
+    from daily_aggregates import DailyAggregates
+    from filter_index import FilterIndex
+    from job_runner import JobRunner
+    from rfm_aggregates import DashboardAggregates
+
+    directory = tmp_path_factory.mktemp('dashboard')
+    df = synthetic['clusters'].copy()
+    index = FilterIndex(df)
+    daily = DailyAggregates(synthetic['transactions'][['id', 'country', 'date', 'monetary']])
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(dash_dashboard, 'artifact_cache', ArtifactCache(str(directory / 'cache')))
+        # No published table, so refresh_published() never swaps the synthetic one out
+        patch.setattr(dash_dashboard, 'job_runner', JobRunner(jobs_dir=str(directory / 'jobs')))
+        patch.setattr(dash_dashboard, 'rfm', df)
+        patch.setattr(dash_dashboard, 'rfm_index', index)
+        patch.setattr(dash_dashboard, 'active_dataset', (df, index, DashboardAggregates(df, index)))
+        # Figure cache keys carry the version, so these never mix with the real table's
+        patch.setattr(dash_dashboard, 'DATA_VERSION', 'perf-synthetic')
+        patch.setattr(dash_dashboard, 'view_datasets', OrderedDict())
+        patch.setattr(dash_dashboard, 'daily', daily)
+        patch.setattr(dash_dashboard, 'daily_key', 'perf-synthetic')
+        patch.setattr(dash_dashboard, 'date_range_max', daily.n_days - 1)
+        yield dash_dashboard
+    dash_dashboard.figure_cache.clear()
+
+
+DASHBOARD_CALLBACKS = [
+    ('update_summary_cards', ()),
+    ('update_segment_distribution', ()),
+    ('update_cluster_distribution', ()),
+    ('update_rfm_scatter', ()),
+    ('update_country_distribution', ()),
+    ('update_rfm_heatmap', ('rf', 'score')),
+    ('update_monetary_distribution', ('quantile',)),
+    ('update_data_table', (['show'],)),
+]
+
+
+@pytest.mark.parametrize('callback, extra', DASHBOARD_CALLBACKS, ids=[name for name, _ in DASHBOARD_CALLBACKS])
+def test_dashboard_callback(dashboard, callback, extra):
+    func = getattr(dashboard, callback)
+    row = dashboard.rfm.iloc[0]
+    # The unfiltered view and one non-empty segment/cluster/country selection
+    selections = [('all', 'all', 'all'), (row['segment'], int(row['cluster']), row['country'])]
+
+    def run():
+        for selection in selections:
+            func(*selection, *extra)
+
+    # Cleared before every run so figure callbacks build instead of hitting the cache
+    check_budget(f'dashboard:{callback}', *measure(run, setup=lambda: dashboard.figure_cache.clear() or ()))
+
+
+def test_dashboard_date_range(dashboard, monkeypatch):
+    # Windowed tables are normally cached on disk; measure the derivation itself
+    monkeypatch.setattr(dashboard.artifact_cache, 'enabled', False)
+    span = dashboard.daily.n_days - 1
+    run = lambda: dashboard.update_view([span // 4, span], 'latest', 4)
+    # The per-worker view LRU is emptied too, so every run derives the window
+    check_budget('dashboard:update_view', *measure(run, setup=lambda: dashboard.view_datasets.clear() or ()))
@@ -0,0 +1,29 @@
+"""
+Tests for the wall-time and peak-memory helpers
+"""
+
+import tracemalloc
+
+import numpy as np
+
+from profiling import peak_memory, profile_call, time_call
+
+
+def test_time_call_runs_untraced():
+    result, seconds = time_call(tracemalloc.is_tracing)
+    assert result is False
+    assert seconds >= 0
+
+
+def test_peak_memory_sees_allocations():
+    _, peak_mb = peak_memory(lambda: np.ones(4 * 1024 * 1024 // 8))
+    assert 3.9 < peak_mb < 8
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_call_times_and_traces_separate_runs():
+    calls = []
+    result, seconds, peak_mb = profile_call(lambda: calls.append(tracemalloc.is_tracing()) or len(calls))
+    assert calls == [False, True]
+    assert result == 1
+    assert seconds >= 0 and peak_mb >= 0
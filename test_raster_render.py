@@ -0,0 +1,41 @@
+"""
+Tests for majority-label rasterization and the standard-library PNG encoder
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+from raster_render import (label_raster, render_label_panels, _png_bytes, PALETTE,
+                           BACKGROUND, PANEL_WIDTH, PANEL_HEIGHT, TITLE_HEIGHT, PADDING)
+
+# Three label-0 points outvote one label-1 point in the top-left pixel; noise sits bottom-right
+X = np.array([0.0, 0.0, 0.0, 0.0, 1.0])
+Y = np.array([1.0, 1.0, 1.0, 1.0, 0.0])
+LABELS = np.array([0, 0, 0, 1, -1])
+
+
+def test_majority_label_per_pixel():
+    image = label_raster(X, Y, LABELS, width=4, height=3, extent=(0, 1, 0, 1), radius=0)
+    assert image.shape == (3, 4, 3) and image.dtype == np.uint8
+    assert (image[0, 0] == PALETTE[1].round()).all()
+    assert (image[2, 3] != BACKGROUND).any() and (image[1, 1] == BACKGROUND).all()
+
+
+def test_png_encoder_round_trips():
+    image = label_raster(X, Y, LABELS, width=4, height=3, extent=(0, 1, 0, 1), radius=0)
+    png = _png_bytes(image)
+    width, height = struct.unpack('>II', png[16:24])
+    data = png[png.index(b'IDAT') + 4:png.index(b'IEND') - 8]
+    rows = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(height, 1 + width * 3)
+    assert (width, height) == (4, 3) and (rows[:, 1:].reshape(image.shape) == image).all()
+
+
+def test_panel_grid_size(tmp_path):
+    path = render_label_panels(np.column_stack([X, Y]), {'a': LABELS, 'b': LABELS, 'c': LABELS},
+                               str(tmp_path / 'panels.png'))
+    with open(path, 'rb') as f:
+        header = f.read(24)
+    assert header.startswith(b'\x89PNG') and struct.unpack('>II', header[16:24]) == (
+        2 * (PANEL_WIDTH + PADDING) + PADDING, 2 * (PANEL_HEIGHT + TITLE_HEIGHT + PADDING) + PADDING)
@@ -0,0 +1,36 @@
+"""
+Tests for the precomputed monetary histogram and RFM score cube
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import FilterIndex
+from rfm_aggregates import MonetaryHistogram, ScoreCube, BIN_MODES, N_BINS
+
+
+@pytest.mark.parametrize('mode', BIN_MODES)
+def test_monetary_bins_match_numpy(mode):
+    rfm = pd.read_csv('rfm_segments_output.csv')
+    histogram = MonetaryHistogram(rfm, FilterIndex(rfm))
+    edges, counts = histogram.counts(mode)
+    assert np.all(np.diff(edges) > 0) and len(edges) <= N_BINS + 1
+    assert edges[0] <= rfm['monetary'].min() and edges[-1] >= rfm['monetary'].max()
+    assert (counts == np.histogram(rfm['monetary'], bins=edges)[0]).all()
+
+    _, east = histogram.counts(mode, country='East')
+    assert (east == np.histogram(rfm[rfm['country'] == 'East']['monetary'], bins=edges)[0]).all()
+
+
+@pytest.mark.parametrize('pair, other, metric, agg', [('rf', 'm', 'score', 'mean'), ('rm', 'f', 'count', 'size'),
+                                                      ('fm', 'r', 'monetary', 'mean')])
+@pytest.mark.parametrize('selection', [{}, {'cluster': 1}])
+def test_score_cube_matches_pivot_table(pair, other, metric, agg, selection):
+    rfm = pd.read_csv('rfm_segments_output.csv')
+    subset = rfm[rfm['cluster'] == selection['cluster']] if selection else rfm
+    levels = range(1, 6)
+    column = other if metric in ('score', 'count') else metric
+    expected = subset.pivot_table(index=pair[0], columns=pair[1], values=column, aggfunc=agg)
+    expected = expected.reindex(index=levels, columns=levels).fillna(0).to_numpy(dtype=float)
+    assert np.allclose(ScoreCube(rfm, FilterIndex(rfm)).heatmap(pair, metric, **selection), expected)
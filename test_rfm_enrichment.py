@@ -0,0 +1,30 @@
+"""
+Tests for the sparse share-of-spend features and sparse-aware cluster metrics
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score
+
+from clustering_sweeps import sparse_calinski_harabasz, sparse_davies_bouldin
+from rfm_enrichment import load_enrichment_transactions, share_of_spend
+
+
+def test_share_of_spend():
+    rfm = pd.read_csv('rfm_segments_output_full.csv')
+    transactions = load_enrichment_transactions()
+    features, names = share_of_spend(transactions, rfm)
+    assert sparse.issparse(features) and features.shape == (len(rfm), len(names))
+    assert np.allclose(features.sum(axis=1), 2)  # one share vector per dimension
+
+    spend = transactions.groupby(['id', 'country', 'Sales_Channel'], observed=True)['monetary'].sum()
+    row = rfm.iloc[0]
+    channel_share = spend.loc[(row['id'], row['country'])] / spend.loc[(row['id'], row['country'])].sum()
+    for channel, share in channel_share.items():
+        assert np.isclose(features[0, names.index(f'Sales_Channel={channel}')], share)
+
+    labels = rfm['cluster'].to_numpy()
+    dense = features.toarray()
+    assert np.isclose(sparse_calinski_harabasz(features, labels), calinski_harabasz_score(dense, labels))
+    assert np.isclose(sparse_davies_bouldin(features, labels), davies_bouldin_score(dense, labels))
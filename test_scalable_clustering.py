@@ -0,0 +1,42 @@
+"""
+Tests for the micro-cluster Agglomerative and sampled Gaussian Mixture variants
+"""
+
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.datasets import make_blobs
+from sklearn.metrics import adjusted_rand_score
+
+from clustering_sweeps import sweep_agglomerative
+from scalable_clustering import MicroClusterAgglomerative, SampledGaussianMixture
+
+
+@pytest.fixture(scope='module')
+def blobs():
+    return make_blobs(3000, centers=4, cluster_std=0.6, random_state=0)
+
+
+def test_micro_cluster_sweep_recovers_blobs(blobs):
+    X, truth = blobs
+    full = sweep_agglomerative(X, [3, 4, 5])
+    micro = sweep_agglomerative(X, [3, 4, 5], max_rows=1000)
+    assert full[4]['method'] == 'tree' and micro[4]['method'] == 'micro-cluster'
+    for k in (3, 4, 5):
+        assert len(np.unique(micro[k]['labels'])) == k
+    assert adjusted_rand_score(truth, micro[4]['labels']) > 0.95
+
+
+def test_merge_matches_fresh_fit(blobs):
+    X, truth = blobs
+    model = MicroClusterAgglomerative(n_clusters=3).fit(X)
+    assert (model.merge(4) == MicroClusterAgglomerative(n_clusters=4).fit_predict(X)).all()
+    # Sparse input stays sparse
+    sparse_labels = sweep_agglomerative(sparse.csr_matrix(X), [4], max_rows=1000)[4]['labels']
+    assert adjusted_rand_score(truth, sparse_labels) > 0.95
+
+
+def test_sampled_mixture(blobs):
+    X, _ = blobs
+    mixture = SampledGaussianMixture(n_components=4, sample_size=500, batch_size=700).fit(X)
+    assert (mixture.predict(X) == mixture.mixture_.predict(X)).all() and mixture.n_fit_samples_ == 500
@@ -0,0 +1,43 @@
+"""
+Tests for the streaming sorted merge between two RFM snapshots
+"""
+
+import pandas as pd
+import pytest
+
+from segment_transitions import track_transitions, NEW, GONE
+
+PREVIOUS = pd.DataFrame({'id': [1, 2, 2, 4, 5, 7], 'country': ['East', 'East', 'West', 'North', 'East', 'West'],
+                         'segment': ['lost', 'champions', 'promising', 'lost', 'at risk', 'lost']})
+CURRENT = pd.DataFrame({'id': [1, 2, 3, 4, 5, 6, 8], 'country': ['East', 'West', 'East', 'North', 'East', 'South', 'East'],
+                        'segment': ['lost', 'champions', 'new customers', 'hibernating', 'at risk', 'lost', 'lost']})
+
+
+@pytest.fixture
+def paths(tmp_path):
+    paths = {name: str(tmp_path / f'{name}.csv') for name in ('previous', 'current', 'matrix', 'changes')}
+    PREVIOUS.to_csv(paths['previous'], index=False)
+    CURRENT.to_csv(paths['current'], index=False)
+    return paths
+
+
+def test_merge_matches_outer_join(paths):
+    expected = PREVIOUS.merge(CURRENT, on=['id', 'country'], how='outer', suffixes=('_previous', '_current'))
+    expected = expected.fillna({'segment_previous': NEW, 'segment_current': GONE})
+    expected = expected[expected['segment_previous'] != expected['segment_current']]
+
+    # Two-row chunks put chunk boundaries inside runs of added and removed customers
+    matrix, n_changed = track_transitions(paths['previous'], paths['current'], paths['matrix'],
+                                          paths['changes'], chunksize=2)
+    changes = pd.read_csv(paths['changes'])
+    assert n_changed == len(expected) == 7
+    assert list(zip(changes['id'], changes['country'], changes['previous_segment'], changes['current_segment'])) == \
+        list(zip(expected['id'], expected['country'], expected['segment_previous'], expected['segment_current']))
+    assert matrix.loc[NEW, 'new customers'] == 1 and matrix.loc['champions', GONE] == 1
+    assert matrix.loc['lost', 'lost'] == 1 and matrix.to_numpy().sum() == len(PREVIOUS) + 3
+
+
+def test_unsorted_snapshot_is_rejected(paths):
+    PREVIOUS.iloc[::-1].to_csv(paths['previous'], index=False)
+    with pytest.raises(ValueError):
+        track_transitions(paths['previous'], paths['current'], paths['matrix'], paths['changes'], chunksize=2)
@@ -0,0 +1,47 @@
+"""
+Tests for the run-date partitioned Parquet snapshot store
+"""
+
+import pandas as pd
+import pytest
+
+from snapshot_store import SnapshotStore
+from summary_engine import load_summary
+
+
+@pytest.fixture
+def store(tmp_path):
+    rfm = pd.read_csv('rfm_segments_output_full.csv')
+    summary = load_summary('rfm_segment_summary_full.csv')
+    store = SnapshotStore(str(tmp_path), row_group_rows=128)
+    store.write(rfm, summary, '2025-01-01')
+    store.write(rfm.assign(segment='lost'), summary, '2025-02-01')
+    return store
+
+
+def test_round_trip(store):
+    rfm = pd.read_csv('rfm_segments_output_full.csv')
+    assert store.run_dates() == ['2025-01-01', '2025-02-01']
+    expected = rfm.sort_values(['id', 'country']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(store.read('2025-01-01'), expected)
+    pd.testing.assert_frame_equal(store.read_summary(), load_summary('rfm_segment_summary_full.csv'))
+    assert store.metadata().num_row_groups == -(-len(rfm) // 128)
+
+
+def test_filtered_read(store):
+    rfm = pd.read_csv('rfm_segments_output_full.csv')
+    filtered = store.read(filters={'id': (100, 199), 'country': 'North'}, columns=['id', 'country'])
+    assert filtered['id'].between(100, 199).all() and (filtered['country'] == 'North').all()
+    assert len(filtered) == ((rfm['id'] // 100 == 1) & (rfm['country'] == 'North')).sum()
+    with pytest.raises(ValueError):
+        store.read(columns=['missing'])
+    with pytest.raises(ValueError):
+        store.read('2024-12-31')
+
+
+def test_customer_history(store):
+    row = pd.read_csv('rfm_segments_output_full.csv').iloc[42]
+    history = store.customer_history(int(row['id']), row['country'])
+    assert history['run_date'].tolist() == ['2025-01-01', '2025-02-01']
+    assert history['segment'].tolist() == [row['segment'], 'lost']
+    assert store.customer_history(-1).empty
@@ -0,0 +1,60 @@
+"""
+Tests for the embedded SQL backend against the pandas pipeline
+"""
+
+import pytest
+
+from generate_full_rfm import (TRANSACTIONS_FILE, load_and_prepare_data, filter_time_window,
+                               calculate_rfm_metrics, calculate_rfm_scores, assign_customer_segments)
+from sql_backend import SQLBackend
+
+COLUMNS = ['id', 'country', 'recency', 'frequency', 'monetary', 'r', 'f', 'm', 'segment']
+
+
+@pytest.fixture(scope='module')
+def backend():
+    return SQLBackend(engine='sqlite').load_transactions(TRANSACTIONS_FILE)
+
+
+def expected_rfm(window_days):
+    window = filter_time_window(load_and_prepare_data(TRANSACTIONS_FILE), window_days)
+    expected = assign_customer_segments(calculate_rfm_scores(calculate_rfm_metrics(window.copy())))
+    return expected[COLUMNS].astype({'country': str}).sort_values(['id', 'country'])
+
+
+@pytest.mark.parametrize('window_days', [None, 365])
+def test_rfm_matches_pandas(backend, window_days):
+    expected = expected_rfm(window_days)
+    sql = backend.compute_rfm(window_days)[COLUMNS]
+    assert len(sql) == len(expected)
+    for column in COLUMNS:
+        assert (sql[column].to_numpy() == expected[column].to_numpy()).all(), column
+
+
+def test_counts(backend):
+    expected = expected_rfm(365)
+    backend.compute_rfm(365)
+    assert backend.counts('segment', country='East').sum() == (expected['country'] == 'East').sum()
+
+
+def test_names_are_checked_before_querying(backend):
+    backend.compute_rfm()
+    with pytest.raises(ValueError):
+        backend.counts('segment FROM rfm; DROP TABLE rfm; --')
+    with pytest.raises(ValueError):
+        backend.rows(columns=['id', 'bogus'])
+    with pytest.raises(ValueError):
+        backend.rollup(['segment', 'monetary'])
+    assert len(backend.rows(columns=['id', 'segment'], limit=5)) == 5
+
+
+def test_blank_and_decimal_cells_load_like_read_transactions(tmp_path):
+    path = tmp_path / 'transactions.csv'
+    path.write_text("Customer_ID,Sale_Date,Region,Sales_Amount\n"
+                    "1,2024-01-01,North,10.5\n"
+                    ",2024-01-02,South,20\n"
+                    "3,2024-01-03,East,\n"
+                    "4,not-a-date,West,5\n"
+                    "1,2024-01-04,North,2\n")
+    rfm = SQLBackend(engine='sqlite').load_transactions(str(path)).compute_rfm()
+    assert rfm[['id', 'country', 'frequency', 'monetary']].values.tolist() == [[1, 'North', 2, 12.5]]
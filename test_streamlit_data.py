@@ -0,0 +1,36 @@
+"""
+Tests for the shared Streamlit data layer
+"""
+
+import time
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('streamlit')
+
+from streamlit_data import RFMDataset, downsample, dataset_version, load_dataset, DESCRIBE_COLUMNS
+
+
+def test_slices_match_pandas():
+    rfm = pd.read_csv('rfm_segments_output.csv')
+    dataset = RFMDataset(rfm, max_scatter_points=50)
+    assert dataset.segments == list(rfm['segment'].unique())
+    for cluster, part in rfm.groupby('cluster'):
+        assert dataset.by_cluster[cluster].index.equals(part.index)
+        assert dataset.cluster_describe[cluster].equals(part[DESCRIBE_COLUMNS].describe())
+        scatter = dataset.cluster_scatter[cluster]
+        assert len(scatter) == min(len(part), 50) and scatter.index.is_monotonic_increasing
+    assert downsample(rfm, len(rfm)) is rfm
+
+
+def test_reloads_on_file_change(tmp_path):
+    rfm = pd.read_csv('rfm_segments_output.csv')
+    path = str(tmp_path / 'rfm.csv')
+    rfm.to_csv(path, index=False)
+    first = load_dataset(path)
+    assert load_dataset(path) is first
+    version = dataset_version(path)
+    time.sleep(0.01)
+    rfm.iloc[:100].to_csv(path, index=False)
+    assert dataset_version(path) != version and len(load_dataset(path).rfm) == 100
@@ -0,0 +1,40 @@
+"""
+Tests for the flat segment/cluster/country summary rollups
+"""
+
+import numpy as np
+import pandas as pd
+
+from summary_engine import build_summary, write_summary, load_summary, level, SummaryLookup
+
+
+def test_rollups_match_groupby():
+    rfm = pd.read_csv('rfm_segments_output.csv')
+    summary = build_summary(rfm)
+    expected = rfm.groupby(['segment', 'cluster']).agg(count=('id', 'count'), monetary_mean=('monetary', 'mean'))
+    rollup = level(summary, 'segment_cluster')
+    assert (rollup['count'].values == expected['count'].values).all()
+    assert np.allclose(rollup['monetary_mean'].values, expected['monetary_mean'].values)
+
+    stats = SummaryLookup(summary).select(cluster=1, country='East')
+    subset = rfm[(rfm['cluster'] == 1) & (rfm['country'] == 'East')]
+    assert stats['count'] == len(subset)
+    assert np.isclose(stats['recency_mean'], subset['recency'].mean())
+
+
+def test_summary_round_trips(tmp_path):
+    summary = build_summary(pd.read_csv('rfm_segments_output.csv'))
+    path = str(tmp_path / 'summary.csv')
+    write_summary(summary, path)
+    assert load_summary(path).equals(summary)
+
+
+def test_unobserved_categories_are_not_rows():
+    # The pipeline's table has a categorical country
+    rfm = pd.read_csv('rfm_segments_output.csv')
+    summary = build_summary(rfm)
+    categorical = rfm.astype({'country': pd.CategoricalDtype(sorted(rfm['country'].unique()) + ['Atlantis'])})
+    categorical_summary = build_summary(categorical)
+    assert len(categorical_summary) == len(summary)
+    assert (categorical_summary['count'] > 0).all()
+    assert (categorical_summary['count'].values == summary['count'].values).all()
@@ -0,0 +1,42 @@
+"""
+Tests for typed, projected transaction reads
+"""
+
+import pandas as pd
+import pytest
+
+from transaction_ingest import read_transactions, HAS_PYARROW
+
+ROWS = ("Customer_ID,Customer_Name,Sale_Date,Region,Sales_Amount\n"
+        "1,Ann,2024-01-01,North,10\n"
+        ",Bob,2024-01-02,South,20\n"
+        "3,Cy,2024-01-03,East,\n"
+        "4,Di,not-a-date,West,5\n")
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / 'transactions.csv'
+    path.write_text(ROWS)
+    return str(path)
+
+
+def test_blank_and_invalid_cells(path):
+    df = read_transactions(path, engine='c')
+    assert list(df.columns) == ['Customer_ID', 'Sale_Date', 'Region', 'Sales_Amount']
+    assert df['Customer_ID'].tolist() == [1, 4]
+    assert df['Customer_ID'].dtype == 'int64' and df['Sales_Amount'].dtype == 'float64'
+    assert df['Sale_Date'].isna().tolist() == [False, True]
+
+
+def test_decimal_amounts(tmp_path):
+    path = tmp_path / 'decimals.csv'
+    path.write_text("Customer_ID,Sale_Date,Region,Sales_Amount\n1,2024-01-01,North,10.5\n2,2024-01-02,South,3\n")
+    for engine in ['c', 'pyarrow'] if HAS_PYARROW else ['c']:
+        assert read_transactions(str(path), engine=engine)['Sales_Amount'].tolist() == [10.5, 3.0]
+
+
+def test_engines_agree(path):
+    if not HAS_PYARROW:
+        pytest.skip("pyarrow is not installed")
+    pd.testing.assert_frame_equal(read_transactions(path, engine='c'), read_transactions(path, engine='pyarrow'))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Typed ingestion of customer_transactions.csv
+Reads only the columns the RFM pipeline needs, with explicit dtypes and a
+fixed date format, optionally through the multithreaded pyarrow CSV engine
+"""
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+DATE_COLUMN = 'Sale_Date'
+DATE_FORMAT = '%Y-%m-%d'
+
+# Explicit schema of customer_transactions.csv (dates are parsed separately);
+# integers are nullable so blank cells load as <NA> instead of raising, and
+# amounts are floats so decimal amounts load like they always have
+TRANSACTION_SCHEMA = {
+    'Customer_ID': 'Int64',
+    'Customer_Name': 'string',
+    'Region': 'category',
+    'Sales_Amount': 'float64',
+    'Quantity_Sold': 'Int32',
+    'Product_Category': 'category',
+    'Unit_Cost': 'float64',
+    'Unit_Price': 'float64',
+    'Customer_Type': 'category',
+    'Discount': 'float64',
+    'Payment_Method': 'category',
+    'Sales_Channel': 'category',
+    'Segment': 'category',
+}
+
+# Columns needed to compute recency, frequency and monetary value
+RFM_COLUMNS = ['Customer_ID', 'Sale_Date', 'Region', 'Sales_Amount']
+
+# Rows missing any of these are dropped, like rows with an unparseable date
+REQUIRED_COLUMNS = ['Customer_ID', 'Sales_Amount']
+
+
+def _dtypes(columns, engine):
+    dtypes = {col: TRANSACTION_SCHEMA[col] for col in columns if col in TRANSACTION_SCHEMA}
+    if engine == 'pyarrow':
+        # The pyarrow reader does not accept the pandas string dtype
+        dtypes = {col: ('object' if dtype == 'string' else dtype) for col, dtype in dtypes.items()}
+    return dtypes
+
+
+def _clean(df, columns, dtypes):
+    """Drop rows missing a required value, narrow complete integer columns and parse dates"""
+    required = [col for col in REQUIRED_COLUMNS if col in df.columns]
+    if required:
+        df = df.dropna(subset=required)
+    for col, dtype in dtypes.items():
+        if dtype in ('Int64', 'Int32') and not df[col].hasnans:
+            df[col] = df[col].astype(dtype.lower())
+
+    if DATE_COLUMN in df.columns:
+        df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN], format=DATE_FORMAT, errors='coerce')
+    return df[columns]
+
+
+def read_transactions(path, columns=RFM_COLUMNS, engine='auto'):
+    """
+    Read the transaction file with column projection and explicit dtypes.
+
+    ``engine`` is 'c', 'pyarrow' or 'auto' (pyarrow when installed). Dates
+    are parsed with the fixed ``DATE_FORMAT``; unparseable dates become NaT.
+    Rows with a blank customer id or amount are dropped, and integer
+    columns without missing values come back as plain numpy integers.
+    """
+    if engine == 'auto':
+        engine = 'pyarrow' if HAS_PYARROW else 'c'
+    if engine == 'pyarrow' and not HAS_PYARROW:
+        raise ImportError("engine='pyarrow' requires the pyarrow package")
+
+    columns = list(columns)
+    dtypes = _dtypes(columns, engine)
+    return _clean(pd.read_csv(path, usecols=columns, dtype=dtypes, engine=engine), columns, dtypes)
+
+
+def iter_transactions(path, chunksize, columns=RFM_COLUMNS):
+    """read_transactions in chunks of ``chunksize`` rows, for files too large to load at once"""
+    columns = list(columns)
+    # pyarrow's reader cannot stream, so chunks always come from the C engine
+    dtypes = _dtypes(columns, 'c')
+    for chunk in pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunksize):
+        yield _clean(chunk, columns, dtypes)